@@ -0,0 +1,106 @@
+"""
+Benchmark CodePointStream against antlr4.InputStream on multi-megabyte files.
+
+antlr4.InputStream expands the source into a list with one int per
+character, and every token keeps the stream alive until the file has been
+parsed. CodePointStream holds the code points as bytes, or as a UTF-32
+memoryview if the source has characters beyond Latin-1. This measures the
+memory allocated by each stream and the time to lex the whole file with it,
+on large synthetic Java and Kotlin files, once in ASCII and once with
+non-Latin-1 comments, and checks that both streams give the same tokens.
+
+Run from the repository root:
+
+    python -m benchmarks.code_point_stream [--megabytes 2]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from antlr4 import CommonTokenStream, InputStream
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.kotlin_listener import synthetic_kotlin  # noqa: E402
+from benchmarks.pruned_walk import synthetic_java  # noqa: E402
+from parsers.code_point_stream import CodePointStream  # noqa: E402
+from parsers.java.JavaLexer import JavaLexer  # noqa: E402
+from parsers.kotlin.KotlinLexer import KotlinLexer  # noqa: E402
+
+LANGUAGES = {
+    "java": (JavaLexer, synthetic_java, "// Reloads", "// Lädt → 🔄 Reloads"),
+    "kotlin": (KotlinLexer, synthetic_kotlin, "/**", "/** Größe ≥ 📦"),
+}
+
+
+def synthetic_source(language, megabytes):
+    generate = LANGUAGES[language][1]
+    # Scale the number of classes from the size of a small sample
+    sample = generate(10)
+    return generate(max(1, int(megabytes * 1024 * 1024 * 10 / len(sample))))
+
+
+def stream_memory(stream_class, content):
+    """Return the bytes allocated by creating a stream over ``content``."""
+    tracemalloc.start()
+    stream = stream_class(content)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del stream
+    return allocated
+
+
+def lex(stream_class, lexer_class, content, repeat):
+    """Return the best time to lex ``content`` and the tokens found."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stream = CommonTokenStream(lexer_class(stream_class(content)))
+        stream.fill()
+        best = min(best, time.perf_counter() - start)
+    tokens = [
+        (token.type, token.channel, token.text, token.line, token.column)
+        for token in stream.tokens
+    ]
+    return best, tokens
+
+
+def measure(label, language, content, repeat):
+    lexer_class = LANGUAGES[language][0]
+    list_bytes = stream_memory(InputStream, content)
+    compact_bytes = stream_memory(CodePointStream, content)
+    list_time, list_tokens = lex(InputStream, lexer_class, content, repeat)
+    compact_time, compact_tokens = lex(CodePointStream, lexer_class, content, repeat)
+    assert list_tokens == compact_tokens, "streams disagree"
+
+    megabytes = len(content.encode("utf-8")) / 1024 / 1024
+    print(f"{label} ({megabytes:.1f} MB, {len(list_tokens)} tokens)")
+    print(
+        f"  InputStream      {list_bytes / 1024 / 1024:7.1f} MB, "
+        f"lexed in {list_time:6.2f} s"
+    )
+    print(
+        f"  CodePointStream  {compact_bytes / 1024 / 1024:7.1f} MB, "
+        f"lexed in {compact_time:6.2f} s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megabytes", type=float, default=2)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    for language, (_, _, comment, unicode_comment) in LANGUAGES.items():
+        content = synthetic_source(language, args.megabytes)
+        measure(f"synthetic {language}, ASCII", language, content, args.repeat)
+        content = content.replace(comment, unicode_comment)
+        measure(f"synthetic {language}, Unicode", language, content, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
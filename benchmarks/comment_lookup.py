@@ -0,0 +1,127 @@
+"""
+Benchmark find_nearest_comment on files with thousands of commented methods.
+
+Compares the bisect-based lookup against the previous reversed linear scan.
+Files are lexed once up front and only the token engine's extraction pass is
+timed, so the numbers reflect declaration and comment handling alone.
+
+Run from the repository root:
+
+    python -m benchmarks.comment_lookup [--methods 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from antlr4 import CommonTokenStream, InputStream
+from antlr4.Token import Token
+from loguru import logger
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+from parsers.java.JavaLexer import JavaLexer  # noqa: E402
+from parsers.java.token_extractor import JavaTokenExtractor  # noqa: E402
+from parsers.kotlin.KotlinLexer import KotlinLexer  # noqa: E402
+from parsers.kotlin.token_extractor import KotlinTokenExtractor  # noqa: E402
+
+
+def linear_find_nearest_comment(self, target_line):
+    """The lookup before line indexing: a reversed scan over every comment."""
+    nearest_comment = None
+    for comment, line in reversed(self.comments):
+        if self.last_processed_line < line < target_line:
+            nearest_comment = self._clean_comment(comment)
+            break
+    self.last_processed_line = target_line
+    return nearest_comment or "No Comment"
+
+
+def java_source(methods):
+    lines = ["/** Generated class */", "public class Generated {"]
+    for i in range(methods):
+        lines.append(f"    // Returns the value of field {i}")
+        lines.append(f"    public int method{i}() {{ return {i}; }}")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def kotlin_source(methods):
+    lines = ["/** Generated class */", "class Generated {"]
+    for i in range(methods):
+        lines.append(f"    // Value of field {i}")
+        lines.append(f"    val property{i}: Int = {i}")
+        lines.append(f"    // Returns the value of field {i}")
+        lines.append(f"    fun method{i}(): Int = {i}")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def lex(lexer_class, source, comment_types):
+    stream = CommonTokenStream(lexer_class(InputStream(source)))
+    stream.fill()
+    comments = [
+        (token.text.strip(), token.line)
+        for token in stream.tokens
+        if token.channel == Token.HIDDEN_CHANNEL and token.type in comment_types
+    ]
+    return stream.tokens, comments
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(label, extractor_class, tokens, comments, repeat):
+    def extract():
+        return extractor_class(None, comments).extract(tokens)
+
+    indexed_time, indexed = best_time(extract, repeat)
+
+    indexed_lookup = extractor_class.find_nearest_comment
+    extractor_class.find_nearest_comment = linear_find_nearest_comment
+    try:
+        linear_time, linear = best_time(extract, repeat)
+    finally:
+        extractor_class.find_nearest_comment = indexed_lookup
+
+    assert indexed == linear, f"{label}: lookups disagree"
+    print(
+        f"{label:<8} linear {linear_time * 1000:9.1f} ms   "
+        f"bisect {indexed_time * 1000:9.1f} ms   "
+        f"speedup {linear_time / indexed_time:6.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--methods", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    print(f"{args.methods} commented methods per file")
+    tokens, comments = lex(
+        JavaLexer,
+        java_source(args.methods),
+        (JavaLexer.COMMENT, JavaLexer.LINE_COMMENT),
+    )
+    compare("java", JavaTokenExtractor, tokens, comments, args.repeat)
+
+    tokens, comments = lex(
+        KotlinLexer,
+        kotlin_source(args.methods),
+        (KotlinLexer.DelimitedComment, KotlinLexer.LineComment),
+    )
+    compare("kotlin", KotlinTokenExtractor, tokens, comments, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
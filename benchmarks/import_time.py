@@ -0,0 +1,138 @@
+"""
+Benchmark process startup with lazily imported grammar modules.
+
+Importing a language's generated lexer and parser deserializes their ATNs,
+which used to happen for both languages whenever ``directory_processor`` was
+imported. Now ``load_language`` imports a language on first use. This
+measures, in fresh interpreters, the import of ``directory_processor`` and
+of the ``main`` entry point, which spawned workers import again as
+``__mp_main__``, and the first use of each language, both in a main process
+and in spawned pool workers (the start method on macOS and Windows, where
+every worker imports everything again). The eager cost is the import plus
+both languages.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time [--repeat 5]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+import directory_processor  # noqa: E402
+
+MAIN_PROCESS = """
+import json, time
+start = time.perf_counter()
+import directory_processor
+imported = time.perf_counter()
+directory_processor.load_language("java")
+java = time.perf_counter()
+directory_processor.load_language("kotlin")
+kotlin = time.perf_counter()
+print(json.dumps({
+    "import": imported - start, "java": java - imported, "kotlin": kotlin - java
+}))
+"""
+
+ENTRY_POINT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+grammars = sorted(
+    name
+    for name in sys.modules
+    if name.startswith("parsers.") and name.endswith(("Lexer", "Parser"))
+)
+print(json.dumps({"main": imported - start, "grammars": grammars}))
+"""
+
+
+def _run(script):
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=SRC_DIR,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def entry_point_time(repeat):
+    """Return the best time to import ``main`` and the grammars it imported."""
+    best = float("inf")
+    for _ in range(repeat):
+        result = _run(ENTRY_POINT)
+        best = min(best, result["main"])
+    return best, result["grammars"]
+
+
+def main_process_times(repeat):
+    best = {}
+    for _ in range(repeat):
+        for key, seconds in _run(MAIN_PROCESS).items():
+            best[key] = min(best.get(key, seconds), seconds)
+    return best
+
+
+def _first_use(language):
+    start = time.perf_counter()
+    directory_processor.load_language(language)
+    return time.perf_counter() - start
+
+
+def worker_times(language, repeat):
+    """Return the best (worker ready, first use of ``language``) times."""
+    context = multiprocessing.get_context("spawn")
+    best_ready = best_load = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with context.Pool(1) as pool:
+            pool.apply(time.perf_counter)
+            ready = time.perf_counter() - start
+            load = pool.apply(_first_use, (language,))
+        best_ready = min(best_ready, ready)
+        best_load = min(best_load, load)
+    return best_ready, best_load
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    times = main_process_times(args.repeat)
+    eager = times["import"] + times["java"] + times["kotlin"]
+    print("main process")
+    print(f"  import directory_processor  {times['import'] * 1000:7.1f} ms")
+    print(f"  first java file             {times['java'] * 1000:7.1f} ms")
+    print(f"  first kotlin file           {times['kotlin'] * 1000:7.1f} ms")
+    print(f"  eager import of both        {eager * 1000:7.1f} ms")
+
+    entry, grammars = entry_point_time(args.repeat)
+    print("entry point")
+    print(f"  import main                 {entry * 1000:7.1f} ms")
+    print(f"  grammar modules imported    {', '.join(grammars) or 'none'}")
+
+    print("spawned pool worker")
+    for language in ("java", "kotlin"):
+        ready, load = worker_times(language, args.repeat)
+        print(
+            f"  {language:<6} tree: ready {ready * 1000:7.1f} ms, "
+            f"grammar {load * 1000:6.1f} ms on first file"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Benchmark the Kotlin listener's tree walk with and without getText().
+
+The previous KotlinListener called getText() on every child of function,
+property, class and companion object declarations, which concatenates the
+text of whole function bodies, initializers and class bodies, so nested
+declarations were stringified once per enclosing declaration. The current
+listener decides by token types and context classes and only reads the
+text of identifiers. Both walk the same parse trees, of
+``GeneralSettings.kt`` and of a large synthetic Kotlin file.
+
+Companion objects without a name used to be named after the text of their
+body; they are now called "Companion", so names of companion objects are
+left out of the comparison.
+
+Run from the repository root:
+
+    python -m benchmarks.kotlin_listener [--classes 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+from antlr4.Token import Token
+from loguru import logger
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+from parsers.kotlin.KotlinLexer import KotlinLexer  # noqa: E402
+from parsers.kotlin.KotlinParser import KotlinParser  # noqa: E402
+from parsers.kotlin.kotlin_parser import KotlinListener  # noqa: E402
+from parsers.two_stage import parse_two_stage  # noqa: E402
+
+GENERAL_SETTINGS = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "src",
+    "parsers",
+    "kotlin",
+    "tests",
+    "test_data",
+    "GeneralSettings.kt",
+)
+
+CLASS_TEMPLATE = """
+/**
+ * Service number {i}, generated for the listener benchmark.
+ */
+@Service(Service.Level.APP)
+class GeneratedService{i}(private val project: Project) : Disposable {{
+    /** Number of entries kept. */
+    val capacity: Int = computeCapacity(listOf(1, 2, 3).map {{ it * {i} }}.sum())
+
+    var state: State = State(name = "service{i}", values = mutableMapOf())
+        private set
+
+    private val cache = HashMap<String, List<Int>>()
+
+    // Reloads the state from disk
+    fun reload(force: Boolean = false): Boolean {{
+        val files = project.files.filter {{ file -> file.name.endsWith(".kt") }}
+        for (file in files) {{
+            if (force || file.modified != state.timestamp) {{
+                val lines = file.readLines().mapIndexed {{ index, line ->
+                    when {{
+                        line.isBlank() -> index to ""
+                        line.startsWith("//") -> index to line.substring(2).trim()
+                        else -> index to line
+                    }}
+                }}
+                cache[file.name] = lines.map {{ (index, _) -> index * {i} }}
+            }}
+        }}
+        fun localHelper(value: Int): Int = value + cache.size
+        return localHelper(files.size) != 0
+    }}
+
+    fun <T : Comparable<T>> largest(items: List<T>): T? = items.maxOrNull()
+
+    override fun dispose() {{
+        cache.clear()
+        state = state.copy(values = mutableMapOf())
+    }}
+
+    inner class Listener{i} : StateListener {{
+        override fun stateChanged(event: StateEvent) {{
+            if (event.source == this@GeneratedService{i}) reload(force = true)
+        }}
+    }}
+
+    companion object {{
+        const val SERVICE_ID = "generated.service.{i}"
+        const val MAX_ENTRIES = {i} * 100
+
+        @JvmStatic
+        fun getInstance(project: Project): GeneratedService{i} =
+            project.getService(GeneratedService{i}::class.java)
+    }}
+}}
+
+data class GeneratedState{i}(val name: String, val count: Int = {i}, private val secret: String = "")
+
+enum class GeneratedKind{i}(val label: String) {{
+    FIRST("first"),
+    SECOND("second") {{
+        override fun describe(): String = label.uppercase()
+    }},
+    THIRD("third");
+
+    open fun describe(): String = label
+}}
+"""
+
+
+def synthetic_kotlin(classes: int) -> str:
+    return "package generated\n" + "".join(
+        CLASS_TEMPLATE.format(i=i) for i in range(classes)
+    )
+
+
+class GetTextKotlinListener(KotlinListener):
+    """KotlinListener with its previous getText()-based child inspection."""
+
+    def _extract_property_info(self, ctx):
+        is_const = False
+        is_val = False
+        is_private = False
+        name = None
+        for child in ctx.getChildren():
+            text = child.getText()
+            if isinstance(child, KotlinParser.ModifierListContext):
+                for modifier_child in child.getChildren():
+                    modifier_text = modifier_child.getText()
+                    if modifier_text == "private":
+                        is_private = True
+                    elif modifier_text == "const":
+                        is_const = True
+            elif text in ["var", "val"]:
+                is_val = True
+            elif isinstance(child, KotlinParser.VariableDeclarationContext):
+                for sibling_child in child.getChildren():
+                    if isinstance(sibling_child, KotlinParser.SimpleIdentifierContext):
+                        name = sibling_child.getText()
+                        break
+        return name, is_const, is_val, is_private
+
+    def _find_class_name_and_type(self, ctx):
+        found_type = False
+        is_interface = False
+        class_name = None
+        for child in ctx.getChildren():
+            text = child.getText()
+            if text in ["class", "interface"]:
+                found_type = True
+                is_interface = text == "interface"
+            elif found_type and isinstance(child, KotlinParser.SimpleIdentifierContext):
+                class_name = child.getText()
+                break
+        return class_name, is_interface
+
+    def enterCompanionObject(self, ctx):
+        if self.current_class:
+            name = None
+            for child in ctx.getChildren():
+                text = child.getText()
+                if text not in ["companion", "object"] and not text.startswith("@"):
+                    name = text
+                    break
+            self._add_companion_object(name, ctx.start.line)
+
+    def enterFunctionDeclaration(self, ctx):
+        if not self.current_class:
+            return
+        children = list(ctx.getChildren())
+        found_fun = False
+        name = None
+        for i, child in enumerate(children):
+            text = child.getText()
+            if text == "fun":
+                found_fun = True
+                continue
+            if not found_fun:
+                continue
+            if self._is_modifier_or_annotation(text) or text.startswith("<"):
+                continue
+            if name is None:
+                next_text = children[i + 1].getText() if i + 1 < len(children) else ""
+                next_next_text = (
+                    children[i + 2].getText() if i + 2 < len(children) else ""
+                )
+                if "." in text or (text and next_text == "."):
+                    name, _ = self._extract_extension_function_info(
+                        text, next_text, next_next_text
+                    )
+                    if name:
+                        break
+                elif self._is_valid_function_name(text):
+                    name = text
+                    break
+        self._add_method(name, ctx.start.line)
+
+    def _is_modifier_or_annotation(self, text):
+        return text.startswith("@") or text in [
+            "private",
+            "public",
+            "protected",
+            "internal",
+        ]
+
+    def _extract_extension_function_info(self, text, next_text, next_next_text):
+        name = None
+        if "." in text:
+            if next_text and not next_text.startswith("("):
+                name = next_text
+        elif next_next_text and not next_next_text.startswith("("):
+            name = next_next_text
+        return name, None
+
+    def _is_valid_function_name(self, text):
+        return not any(
+            [
+                text.startswith("("),
+                text.startswith("<"),
+                text.startswith("@"),
+                text in ["fun", ":"],
+            ]
+        )
+
+
+def parse_tree(content):
+    lexer = KotlinLexer(InputStream(content))
+    stream = CommonTokenStream(lexer)
+    stream.fill()
+    comments = [
+        (token.text.strip(), token.line)
+        for token in stream.tokens
+        if token.channel == Token.HIDDEN_CHANNEL
+        and token.type in (KotlinLexer.DelimitedComment, KotlinLexer.LineComment)
+    ]
+    tree = parse_two_stage(KotlinParser(stream), "kotlinFile", "kotlin")
+    return tree, comments
+
+
+def walk(listener_class, content, tree, comments, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        listener = listener_class(content, comments)
+        start = time.perf_counter()
+        ParseTreeWalker().walk(listener, tree)
+        best = min(best, time.perf_counter() - start)
+    return best, listener.class_info
+
+
+def without_companion_names(class_info):
+    return [
+        {
+            **class_data,
+            "companion_objects": [
+                companion["comment"] for companion in class_data["companion_objects"]
+            ],
+        }
+        for class_data in class_info
+    ]
+
+
+def measure(label, content, repeat):
+    # The first parse warms up the prediction DFA; time the second one
+    parse_tree(content)
+    start = time.perf_counter()
+    tree, comments = parse_tree(content)
+    parse_time = time.perf_counter() - start
+
+    old_time, old = walk(GetTextKotlinListener, content, tree, comments, repeat)
+    new_time, new = walk(KotlinListener, content, tree, comments, repeat)
+    assert without_companion_names(old) == without_companion_names(
+        new
+    ), "listeners disagree"
+
+    lines = content.count("\n") + 1
+    print(f"{label} ({lines} lines, {len(new)} classes)")
+    print(f"  warm parse           {parse_time * 1000:9.1f} ms")
+    print(f"  getText() walk       {old_time * 1000:9.1f} ms")
+    print(f"  token type walk      {new_time * 1000:9.1f} ms")
+    print(f"  speedup              {old_time / new_time:9.1f}x")
+    print(
+        f"  parse + walk         {(parse_time + old_time) * 1000:9.1f} ms -> "
+        f"{(parse_time + new_time) * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    with open(GENERAL_SETTINGS, encoding="utf-8") as f:
+        measure("GeneralSettings.kt", f.read(), args.repeat)
+    measure("synthetic", synthetic_kotlin(args.classes), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark rendering a Markdown section for a class with thousands of methods.
+
+Compares the previous assembly (``content +=`` per row, then splitting the
+section into lines and joining them again for the shard) with the current
+``render_class_section``, which joins a list of pieces once and counts lines
+while rendering. Both must produce the same bytes and line count.
+
+Run from the repository root:
+
+    python -m benchmarks.markdown_render [--methods 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+from directory_processor import render_class_section  # noqa: E402
+from result_codec import encode_class_info  # noqa: E402
+
+
+def concatenating_render(class_path, class_info):
+    """The assembly before list accumulation, including the writer's split."""
+    content = f"\n## {class_path}\n\n"
+    for class_data in class_info:
+        content += f"### Class: {class_data['name']}\n\n"
+        if class_data["constants"]:
+            content += "| Constant | Comment |\n|----------|---------|\n"
+            for const in class_data["constants"]:
+                comment = const["comment"].replace("\n", " ").strip()
+                content += f"| {const['name']} | {comment} |\n"
+            content += "\n"
+        if class_data["methods"]:
+            content += "| Method | Comment |\n|---------|---------|\n"
+            for method in class_data["methods"]:
+                comment = method["comment"].replace("\n", " ").strip()
+                content += f"| {method['name']} | {comment} |\n"
+            content += "\n"
+    lines = content.split("\n")
+    return ("\n".join(lines) + "\n").encode("utf-8"), len(lines)
+
+
+def list_render(class_path, encoded):
+    content, line_count = render_class_section(class_path, encoded)
+    return "\n".join([content, ""]).encode("utf-8"), line_count
+
+
+def generated_class_info(methods):
+    return [
+        {
+            "name": "Generated",
+            "constants": [
+                {"name": f"CONSTANT_{i}", "comment": f"Constant {i}\nsecond line"}
+                for i in range(methods // 10)
+            ],
+            "methods": [
+                {"name": f"method{i}", "comment": f"Returns the value of field {i}"}
+                for i in range(methods)
+            ],
+            "comment": "Generated class",
+        }
+    ]
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--methods", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    class_path = "com.intellij.generated.Generated.java"
+    class_info = generated_class_info(args.methods)
+    encoded = encode_class_info(class_info)
+
+    old_time, old = best_time(
+        lambda: concatenating_render(class_path, class_info), args.repeat
+    )
+    new_time, new = best_time(lambda: list_render(class_path, encoded), args.repeat)
+    assert old == new, "renderers disagree"
+
+    print(f"{args.methods} methods, {new[1]} lines, {len(new[0])} bytes")
+    print(f"  concatenation  {old_time * 1000:8.2f} ms")
+    print(f"  list + join    {new_time * 1000:8.2f} ms")
+    print(f"  speedup        {old_time / new_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark the peak memory of a worker parsing a large file with each engine.
+
+The "antlr" engine keeps the whole parse tree of a file, with a context
+object per rule invocation and a node per token, until the listener has
+walked it, so a worker's peak RSS grows with its largest file. The
+"streaming" engine runs the listener as a parse listener with
+``buildParseTrees`` disabled and only keeps the contexts of the rules being
+parsed. Each (file, engine) pair is parsed in a fresh interpreter, like a
+pool worker's first file, and the peak RSS before and after the parse is
+read from ``getrusage``. The files are the largest Java and Kotlin files of
+``--source-dir`` or, by default, large synthetic files.
+
+Run from the repository root (Unix only):
+
+    python -m benchmarks.parse_memory [--source-dir DIR] [--files 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+ENGINES = ("antlr", "skeleton", "streaming")
+
+EXTENSIONS = {".java": "java", ".kt": "kotlin"}
+
+WORKER = """
+import json, resource, sys, time
+from loguru import logger
+# Run in REPO_DIR, with the top-level modules importable by name
+sys.path.insert(0, "src")
+from benchmarks.kotlin_listener import synthetic_kotlin
+from benchmarks.pruned_walk import synthetic_java
+from parsers.java.java_parser import parse_java_file
+from parsers.kotlin.kotlin_parser import parse_kotlin_file
+
+logger.remove()
+language, source, engine = sys.argv[1:]
+if source.startswith("synthetic:"):
+    classes = int(source.split(":")[1])
+    generate = synthetic_java if language == "java" else synthetic_kotlin
+    content = generate(classes)
+else:
+    with open(source, encoding="utf-8", errors="replace") as f:
+        content = f.read()
+parse = parse_java_file if language == "java" else parse_kotlin_file
+# Import the grammar before measuring
+parse("", engine=engine)
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+classes = parse(content, engine=engine)
+seconds = time.perf_counter() - start
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "before": before, "after": after, "seconds": seconds, "classes": classes
+}))
+"""
+
+
+def measure(language, source, engine):
+    """Parse ``source`` in a fresh interpreter and return its measurements."""
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER, language, source, engine],
+        cwd=REPO_DIR,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def largest_files(source_dir, count):
+    """Return the ``count`` largest (language, path) pairs per language."""
+    sizes = {language: [] for language in EXTENSIONS.values()}
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            language = EXTENSIONS.get(os.path.splitext(name)[1])
+            if language:
+                path = os.path.join(root, name)
+                sizes[language].append((os.path.getsize(path), path))
+    return [
+        (language, path)
+        for language, found in sizes.items()
+        for _, path in sorted(found, reverse=True)[:count]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source-dir")
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--classes", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.source_dir:
+        sources = largest_files(args.source_dir, args.files)
+    else:
+        sources = [
+            ("java", f"synthetic:{args.classes}"),
+            ("kotlin", f"synthetic:{args.classes}"),
+        ]
+
+    for language, source in sources:
+        results = {engine: measure(language, source, engine) for engine in ENGINES}
+        classes = results["antlr"]["classes"]
+        assert all(
+            r["classes"] == classes for r in results.values()
+        ), "engines disagree"
+
+        label = os.path.relpath(source) if os.path.exists(source) else source
+        print(f"{language} {label} ({len(classes)} classes)")
+        for engine, result in results.items():
+            # ru_maxrss is in kilobytes on Linux
+            growth = (result["after"] - result["before"]) / 1024
+            print(
+                f"  {engine:<10} peak RSS {result['after'] / 1024:7.1f} MB "
+                f"(+{growth:6.1f} MB while parsing), {result['seconds']:6.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark the pruned parse tree walk against the full ParseTreeWalker.
+
+The listeners only need declarations, yet ParseTreeWalker visits every
+statement and expression node of every method body. PrunedTreeWalker skips
+blocks and expressions that contain no token able to start a declaration
+the listeners record. This counts the nodes each walk visits and times
+both (the pruned one including its token scan) on ``GeneralSettings.kt``
+and on large synthetic Kotlin and Java files, and checks that the
+listeners extract the same classes.
+
+Run from the repository root:
+
+    python -m benchmarks.pruned_walk [--classes 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+from antlr4.Token import Token
+from antlr4.tree.Tree import TerminalNode
+from loguru import logger
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.kotlin_listener import GENERAL_SETTINGS, synthetic_kotlin  # noqa: E402
+from parsers.java import java_parser  # noqa: E402
+from parsers.kotlin import kotlin_parser  # noqa: E402
+from parsers.pruned_walker import PrunedTreeWalker  # noqa: E402
+from parsers.two_stage import parse_two_stage  # noqa: E402
+
+JAVA_CLASS_TEMPLATE = """
+/**
+ * Service number {i}, generated for the walk benchmark.
+ */
+public class GeneratedService{i} implements Disposable {{
+    private static final int CAPACITY = {i} * 100;
+    private final Map<String, List<Integer>> cache = new HashMap<>();
+    private final Runnable cleanup = () -> cache.clear();
+
+    public GeneratedService{i}(Project project) {{
+        this.project = project;
+        project.addListener(new StateListener() {{
+            @Override
+            public void stateChanged(StateEvent event) {{
+                reload(true);
+            }}
+        }});
+    }}
+
+    // Reloads the state from disk
+    public boolean reload(boolean force) {{
+        List<File> files = project.getFiles().stream()
+            .filter(file -> file.getName().endsWith(".java"))
+            .collect(Collectors.toList());
+        for (File file : files) {{
+            if (force || file.lastModified() != timestamp) {{
+                List<Integer> lines = new ArrayList<>();
+                int index = 0;
+                for (String line : file.readLines()) {{
+                    switch (line.length()) {{
+                        case 0:
+                            lines.add(-index);
+                            break;
+                        default:
+                            lines.add(line.startsWith("//") ? index * {i} : index);
+                    }}
+                    index++;
+                }}
+                cache.put(file.getName(), lines);
+            }}
+        }}
+        return !files.isEmpty();
+    }}
+
+    public <T extends Comparable<T>> T largest(List<T> items) {{
+        T best = null;
+        for (T item : items) {{
+            if (best == null || item.compareTo(best) != 0) {{
+                best = item;
+            }}
+        }}
+        return best;
+    }}
+
+    @Override
+    public void dispose() {{
+        try {{
+            cleanup.run();
+        }} catch (RuntimeException e) {{
+            LOG.warn("Cleanup failed: " + e.getMessage(), e);
+        }}
+    }}
+}}
+"""
+
+
+def synthetic_java(classes):
+    return "package generated;\n" + "".join(
+        JAVA_CLASS_TEMPLATE.format(i=i) for i in range(classes)
+    )
+
+
+LANGUAGES = {
+    "java": (
+        java_parser,
+        java_parser.JavaLexer,
+        java_parser.JavaParser,
+        java_parser.JavaListener,
+        "compilationUnit",
+        (java_parser.JavaLexer.COMMENT, java_parser.JavaLexer.LINE_COMMENT),
+    ),
+    "kotlin": (
+        kotlin_parser,
+        kotlin_parser.KotlinLexer,
+        kotlin_parser.KotlinParser,
+        kotlin_parser.KotlinListener,
+        "kotlinFile",
+        (
+            kotlin_parser.KotlinLexer.DelimitedComment,
+            kotlin_parser.KotlinLexer.LineComment,
+        ),
+    ),
+}
+
+
+def parse(language, content):
+    _, lexer, parser, _, start_rule, comment_types = LANGUAGES[language]
+    stream = CommonTokenStream(lexer(InputStream(content)))
+    stream.fill()
+    comments = [
+        (token.text.strip(), token.line)
+        for token in stream.tokens
+        if token.channel == Token.HIDDEN_CHANNEL and token.type in comment_types
+    ]
+    tree = parse_two_stage(parser(stream), start_rule, language)
+    return stream.tokens, comments, tree
+
+
+def count_nodes(tree):
+    if isinstance(tree, TerminalNode):
+        return 1
+    return 1 + sum(count_nodes(child) for child in tree.getChildren())
+
+
+def full_walk(language, content, tokens, comments, tree):
+    listener = LANGUAGES[language][3](content, comments)
+    ParseTreeWalker().walk(listener, tree)
+    return listener.class_info
+
+
+def pruned_walk(language, content, tokens, comments, tree):
+    module = LANGUAGES[language][0]
+    listener = LANGUAGES[language][3](content, comments)
+    walker = PrunedTreeWalker(module.prunable_subtrees(tokens))
+    walker.walk(listener, tree)
+    return listener.class_info, walker.visited, walker.pruned
+
+
+def best_time(func, repeat, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure(label, language, content, repeat):
+    # The first parse warms up the prediction DFA
+    parse(language, content)
+    tokens, comments, tree = parse(language, content)
+    args = (language, content, tokens, comments, tree)
+    full_time, full = best_time(full_walk, repeat, *args)
+    pruned_time, (pruned, visited, skipped) = best_time(pruned_walk, repeat, *args)
+    assert full == pruned, "walks disagree"
+
+    lines = content.count("\n") + 1
+    nodes = count_nodes(tree)
+    print(f"{label} ({lines} lines, {len(full)} classes)")
+    print(f"  nodes visited   {nodes:9d} -> {visited} ({skipped} subtrees skipped)")
+    print(f"  full walk       {full_time * 1000:9.1f} ms")
+    print(f"  pruned walk     {pruned_time * 1000:9.1f} ms")
+    print(f"  speedup         {full_time / pruned_time:9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    with open(GENERAL_SETTINGS, encoding="utf-8") as f:
+        measure("GeneralSettings.kt", "kotlin", f.read(), args.repeat)
+    measure("synthetic Kotlin", "kotlin", synthetic_kotlin(args.classes), args.repeat)
+    measure("synthetic Java", "java", synthetic_java(args.classes), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
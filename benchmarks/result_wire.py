@@ -0,0 +1,114 @@
+"""
+Benchmark the worker-to-parent wire format of parse results.
+
+Parses the parser test data with the token engine, then compares what the
+pool pipe carries per file with the plain pickled result tuples used before
+and with the packed ``result_codec`` payload: bytes sent, worker encode time
+and parent decode time. The parent reads the packed rows directly, so its
+cost is unpickling plus ``decode_results``.
+
+Run from the repository root:
+
+    python -m benchmarks.result_wire [--copies 200]
+"""
+
+import argparse
+import glob
+import os
+import pickle
+import sys
+import time
+from collections import Counter
+from multiprocessing.reduction import ForkingPickler
+from loguru import logger
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+from parsers.java.java_parser import parse_java_file  # noqa: E402
+from parsers.kotlin.kotlin_parser import parse_kotlin_file  # noqa: E402
+from result_codec import decode_class_info, decode_results, encode_results  # noqa: E402
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "src", "parsers")
+
+
+def parse_test_data():
+    results = []
+    pattern = os.path.join(TEST_DATA, "*", "tests", "test_data", "*")
+    for path in sorted(glob.glob(pattern)):
+        if path.endswith(".java"):
+            parse = parse_java_file
+        elif path.endswith(".kt"):
+            parse = parse_kotlin_file
+        else:
+            continue
+        with open(path, encoding="utf-8") as f:
+            class_info = parse(f.read(), engine="tokens")
+        stats = Counter({"java.token_engine": 1, "cache.miss": 1})
+        results.append((os.path.basename(path), class_info, "", stats))
+    return results
+
+
+def measure(label, results, chunk_size, copies):
+    # Independent copies, so pickle cannot share objects between files
+    files = [
+        copy for _ in range(copies) for copy in pickle.loads(pickle.dumps(results))
+    ]
+    chunks = [files[i : i + chunk_size] for i in range(0, len(files), chunk_size)]
+
+    start = time.perf_counter()
+    old_messages = [bytes(ForkingPickler.dumps((0, 0.0, chunk))) for chunk in chunks]
+    old_encode = time.perf_counter() - start
+    start = time.perf_counter()
+    for message in old_messages:
+        pickle.loads(message)
+    old_decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_messages = [
+        bytes(ForkingPickler.dumps((0, 0.0, encode_results(chunk)))) for chunk in chunks
+    ]
+    new_encode = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = []
+    for message in new_messages:
+        decoded.extend(decode_results(pickle.loads(message)[2]))
+    new_decode = time.perf_counter() - start
+
+    assert [
+        (path, decode_class_info(encoded), error, stats)
+        for path, encoded, error, stats in decoded
+    ] == files, "decoded results differ from the originals"
+
+    n = len(files)
+    old_bytes = sum(map(len, old_messages))
+    new_bytes = sum(map(len, new_messages))
+    print(f"{label} ({n} files)")
+    print(
+        f"  pickled dicts  {old_bytes / n:8.0f} B/file  "
+        f"worker {old_encode / n * 1e6:6.1f} us/file  "
+        f"parent {old_decode / n * 1e6:6.1f} us/file"
+    )
+    print(
+        f"  packed rows    {new_bytes / n:8.0f} B/file  "
+        f"worker {new_encode / n * 1e6:6.1f} us/file  "
+        f"parent {new_decode / n * 1e6:6.1f} us/file"
+    )
+    print(f"  bytes saved    {(1 - new_bytes / old_bytes) * 100:7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--copies", type=int, default=200)
+    parser.add_argument("--chunk", type=int, default=32)
+    args = parser.parse_args()
+
+    logger.remove()
+    results = parse_test_data()
+    measure("one file per task", results, 1, args.copies)
+    measure(f"{args.chunk} files per task", results, args.chunk, args.copies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark declaration-only parsing against parsing whole files.
+
+The listeners only record declarations, but the parser spends most of its
+time predicting the statements and expressions of method bodies. The
+"skeleton" engine drops the tokens inside each method and function body
+that cannot hold a local or anonymous class before parsing, so the parser
+sees empty bodies. This times both engines, after a warm-up parse each, on
+``GeneralSettings.kt`` and on large synthetic Kotlin and Java files, and
+checks that they extract the same classes.
+
+Run from the repository root:
+
+    python -m benchmarks.skeleton_parse [--classes 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from loguru import logger
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.kotlin_listener import GENERAL_SETTINGS, synthetic_kotlin  # noqa: E402
+from benchmarks.pruned_walk import synthetic_java  # noqa: E402
+from parsers.java.java_parser import parse_java_file  # noqa: E402
+from parsers.kotlin.kotlin_parser import parse_kotlin_file  # noqa: E402
+from parsers.parse_stats import parse_stats, reset_parse_stats  # noqa: E402
+
+PARSERS = {"java": parse_java_file, "kotlin": parse_kotlin_file}
+
+
+def best_time(language, content, engine, repeat):
+    parse = PARSERS[language]
+    # The first parse warms up the prediction DFA
+    parse(content, engine=engine)
+    best = float("inf")
+    for _ in range(repeat):
+        reset_parse_stats()
+        start = time.perf_counter()
+        result = parse(content, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best, result, dict(parse_stats)
+
+
+def measure(label, language, content, repeat):
+    full_time, full, full_stats = best_time(language, content, "antlr", repeat)
+    skeleton_time, skeleton, skeleton_stats = best_time(
+        language, content, "skeleton", repeat
+    )
+    assert full == skeleton, "engines disagree"
+
+    lines = content.count("\n") + 1
+    collapsed = skeleton_stats[f"{language}.bodies_collapsed"]
+    print(f"{label} ({lines} lines, {len(full)} classes, {collapsed} bodies)")
+    print(
+        f"  nodes walked    {full_stats[f'{language}.nodes_walked']:9d} -> "
+        f"{skeleton_stats[f'{language}.nodes_walked']}"
+    )
+    print(f"  full parse      {full_time * 1000:9.1f} ms")
+    print(f"  skeleton parse  {skeleton_time * 1000:9.1f} ms")
+    print(f"  speedup         {full_time / skeleton_time:9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    with open(GENERAL_SETTINGS, encoding="utf-8") as f:
+        measure("GeneralSettings.kt", "kotlin", f.read(), args.repeat)
+    measure("synthetic Kotlin", "kotlin", synthetic_kotlin(args.classes), args.repeat)
+    measure("synthetic Java", "java", synthetic_java(args.classes), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,170 +1,921 @@
+import glob
+import importlib
 import os
-from typing import List, Dict
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Dict, Optional
 from loguru import logger
 from multiprocessing import Pool
-from parsers.java.java_parser import parse_java_file
-from parsers.kotlin.kotlin_parser import parse_kotlin_file
+from output_writers import OUTPUT_FORMATS, OutputWriter, create_writers
+from parse_cache import ENGINES, ParseCache, content_hash, parser_fingerprint
+from parsers.dfa_cache import dfa_state_count, load_dfa_file, save_dfa_file
+from parsers.parse_stats import (
+    record_parse_stat,
+    reset_parse_stats,
+    snapshot_parse_stats,
+)
+from result_codec import (
+    decode_results,
+    encode_class_info,
+    encode_results,
+    iter_classes,
+    iter_members,
+)
+from shard_manifest import MANIFEST_VERSION, ShardManifest, save_shard_stats
+from task_scheduler import CHUNK_POLICIES, log_worker_balance, stream_chunks
 
+# Extraction module, parse function and parser class of every language; the
+# generated grammar modules behind them are only imported by load_language
+LANGUAGES = {
+    "java": ("parsers.java.java_parser", "parse_java_file", "JavaParser"),
+    "kotlin": ("parsers.kotlin.kotlin_parser", "parse_kotlin_file", "KotlinParser"),
+}
+OUTPUT_DIR = "output"
+# Files between progress reports while the total is still being discovered
+PROGRESS_COUNT_STEP = 1000
+# Rough size of an LLM token in UTF-8 bytes, used for shard token budgets
+BYTES_PER_TOKEN = 4
 
-def parse_file(args) -> tuple[str, List[Dict], str]:
+# Set in each pool worker by _init_worker
+_parse_cache: Optional[ParseCache] = None
+_engine = "antlr"
+_render_markdown = False
+_dfa_dir: Optional[str] = None
+
+
+def _init_worker(
+    cache_dir: Optional[str],
+    cache_max_bytes: int,
+    dfa_dir: Optional[str],
+    engine: str = "antlr",
+    render_markdown: bool = False,
+):
+    """Pool initializer: open the parse cache and note where warmed DFAs are."""
+    global _parse_cache, _engine, _render_markdown, _dfa_dir
+    _engine = engine
+    _render_markdown = render_markdown
+    _dfa_dir = dfa_dir
+    _parse_cache = ParseCache(cache_dir, cache_max_bytes, engine) if cache_dir else None
+
+
+@lru_cache(maxsize=None)
+def load_language(language: str) -> tuple:
+    """
+    Import the parser of a language on first use.
+
+    Importing a language deserializes the ATNs of its generated lexer and
+    parser, which dominates process startup, so every process only pays for
+    the languages it actually parses. In a pool worker, the DFA persisted in
+    ``dfa_dir`` is loaded right after the import, unless the worker was
+    forked from a parent that already loaded it.
+
+    Args:
+        language (str): A key of ``LANGUAGES``.
+
+    Returns:
+        tuple: (parse function, parser class).
+    """
+    module_name, function_name, class_name = LANGUAGES[language]
+    module = importlib.import_module(module_name)
+    parser_class = getattr(module, class_name)
+    if _dfa_dir and not dfa_state_count(parser_class):
+        load_dfa_file(parser_class, _dfa_path(_dfa_dir, language))
+    return getattr(module, function_name), parser_class
+
+
+def _source_language(full_path: str) -> str:
+    return "java" if full_path.endswith(".java") else "kotlin"
+
+
+def _dfa_path(dfa_dir: str, language: str) -> str:
+    return os.path.join(dfa_dir, f"{language}-{parser_fingerprint(language)}.dfa")
+
+
+def prepare_dfa(
+    dfa_dir: str,
+    files_to_process: Iterable[tuple],
+    warmup_files: int = 50,
+    engine: str = "antlr",
+):
+    """
+    Warm up and persist the prediction DFA of each language that has none in
+    ``dfa_dir`` for the current parser version.
+
+    Warm-up parses up to ``warmup_files`` files per language, sampled uniformly
+    over the tree with ``engine``, in the calling process and saves the
+    resulting DFA to ``dfa_dir``. Existing DFA files are left to the pool
+    workers, which load them in ``load_language``, so the calling process only
+    imports a grammar when it writes its DFA.
+    ``files_to_process`` is only iterated if a warm-up is needed.
+    """
+    os.makedirs(dfa_dir, exist_ok=True)
+    cold = [
+        language
+        for language in LANGUAGES
+        if not os.path.exists(_dfa_path(dfa_dir, language))
+    ]
+    if not cold:
+        return
+
+    # Reservoir sampling picks an even sample in one pass over the stream
+    rng = random.Random(0)
+    samples = {language: [] for language in cold}
+    seen = Counter()
+    for full_path, _ in files_to_process:
+        language = _source_language(full_path)
+        if language not in samples:
+            continue
+        seen[language] += 1
+        sample = samples[language]
+        if len(sample) < warmup_files:
+            sample.append(full_path)
+        else:
+            slot = rng.randrange(seen[language])
+            if slot < warmup_files:
+                sample[slot] = full_path
+
+    for language in cold:
+        sample = sorted(samples[language])
+        if not sample:
+            continue
+        logger.info(f"Warming up {language} DFA on {len(sample)} files")
+        parse, parser_class = load_language(language)
+        for full_path in sample:
+            try:
+                with open(full_path, "rb") as infile:
+                    parse(_decode_source(infile.read()), engine=engine)
+            except Exception as e:
+                logger.error(f"Error warming up DFA with {full_path}: {e}")
+        save_dfa_file(parser_class, _dfa_path(dfa_dir, language))
+
+
+def _decode_source(data: bytes) -> str:
+    """Decode file bytes the way text-mode open() would, with universal newlines."""
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def format_source_path(full_path: str, source_dir: str) -> str:
+    """Return the dotted path of a source file used as its section heading."""
+    rel_path = os.path.relpath(full_path, source_dir)
+    return rel_path.replace("/", ".")
+
+
+def parse_file(args) -> tuple[str, List[Dict], str, Counter]:
     """Worker function to parse a single file."""
     full_path, source_dir = args
+    formatted_path = format_source_path(full_path, source_dir)
+    reset_parse_stats()
     try:
-        with open(full_path, "r", encoding="utf-8") as infile:
-            content = infile.read()
+        with open(full_path, "rb") as infile:
+            data = infile.read()
 
-        rel_path = os.path.relpath(full_path, source_dir)
-        formatted_path = rel_path.replace("/", ".")
+        language = _source_language(full_path)
+        class_info = None
+        if _parse_cache:
+            key = content_hash(data)
+            class_info = _parse_cache.get(language, key)
+            record_parse_stat("cache.miss" if class_info is None else "cache.hit")
 
-        if full_path.endswith(".java"):
-            class_info = parse_java_file(content)
-        else:
-            class_info = parse_kotlin_file(content)
+        if class_info is None:
+            parse, _ = load_language(language)
+            class_info = parse(_decode_source(data), engine=_engine)
+            if _parse_cache:
+                _parse_cache.put(language, key, class_info)
 
-        return formatted_path, class_info, ""
+        return formatted_path, class_info, "", snapshot_parse_stats()
     except Exception as e:
-        return formatted_path, None, str(e)
+        return formatted_path, None, str(e), snapshot_parse_stats()
+
+
+def _render_result(formatted_path: str, class_info: Optional[List[Dict]]):
+    """Render a file's Markdown section as (utf-8 bytes, line count, classes)."""
+    if not class_info:
+        return None if class_info is None else ()
+    content, line_count = render_class_section(
+        formatted_path, encode_class_info(class_info)
+    )
+    return (content + "\n").encode("utf-8"), line_count, len(class_info)
+
+
+def parse_chunk(chunk) -> tuple[int, float, bytes]:
+    """
+    Worker function to parse a chunk of files, timing the work.
+
+    Results are packed with ``result_codec.encode_results`` so the pool pipe
+    carries one compact bytes object per chunk instead of pickled dicts. When
+    the pool renders Markdown, each file's class information is replaced by
+    its rendered section, see ``_render_result``.
+    """
+    start = time.perf_counter()
+    results = [parse_file(args) for args in chunk]
+    if _render_markdown:
+        results = [
+            (formatted_path, _render_result(formatted_path, class_info), error, stats)
+            for formatted_path, class_info, error, stats in results
+        ]
+    payload = encode_results(results, rendered=_render_markdown)
+    return os.getpid(), time.perf_counter() - start, payload
+
 
+def iter_source_files(source_dir: str) -> Iterator[tuple]:
+    """
+    Yield a (full_path, source_dir) task for every Java and Kotlin file.
 
-def count_source_files(source_dir: str) -> int:
-    """Count total number of Java and Kotlin files in the source directory."""
-    total_count = 0
-    for root, _, files in os.walk(source_dir):
-        total_count += sum(1 for file in files if file.endswith((".java", ".kt")))
-    return total_count
+    A single lazy os.scandir walk in the same order as a top-down os.walk:
+    the files of a directory first, then its subdirectories. Symlinked
+    directories are not followed and unreadable directories are skipped.
+    """
+    pending = [source_dir]
+    while pending:
+        directory = pending.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith((".java", ".kt")):
+                        yield entry.path, source_dir
+        except OSError:
+            continue
+        pending.extend(reversed(subdirs))
 
 
-class MarkdownWriter:
-    def __init__(self, base_filename: str, max_lines: int = 500000):
+def log_parse_stats(parse_stats: Counter):
+    """Log per-language parse statistics aggregated over a run."""
+    for language in ("java", "kotlin"):
+        sll = parse_stats[f"{language}.sll"]
+        fallback = parse_stats[f"{language}.ll_fallback"]
+        if sll + fallback:
+            logger.info(
+                f"{language}: {sll} files parsed with SLL, "
+                f"{fallback} needed LL fallback "
+                f"({fallback / (sll + fallback) * 100:.1f}%)"
+            )
+        ll_only = parse_stats[f"{language}.ll"]
+        if ll_only:
+            logger.info(f"{language}: {ll_only} files parsed with LL only")
+        skipped = parse_stats[f"{language}.prescan_skipped"]
+        if skipped:
+            logger.info(
+                f"{language}: {skipped} files short-circuited by lexer pre-scan"
+            )
+        token_engine = parse_stats[f"{language}.token_engine"]
+        if token_engine:
+            logger.info(f"{language}: {token_engine} files extracted from tokens only")
+        collapsed = parse_stats[f"{language}.bodies_collapsed"]
+        if collapsed:
+            logger.info(f"{language}: {collapsed} bodies left out of the parse")
+        walked = parse_stats[f"{language}.nodes_walked"]
+        if walked:
+            logger.info(
+                f"{language}: {walked} parse tree nodes walked, "
+                f"{parse_stats[f'{language}.subtrees_pruned']} code subtrees skipped"
+            )
+        dfa_states = parse_stats[f"{language}.dfa_states_added"]
+        if dfa_states:
+            logger.info(f"{language}: {dfa_states} DFA states built across workers")
+    hits, misses = parse_stats["cache.hit"], parse_stats["cache.miss"]
+    if hits + misses:
+        logger.info(f"Parse cache: {hits} hits, {misses} misses")
+
+
+def _render_table(parts: List[str], header: str, members) -> int:
+    """Append a member table to ``parts`` and return the newlines it adds."""
+    parts.append(header)
+    rows = 0
+    for name, comment in iter_members(members):
+        comment = comment.replace("\n", " ").strip()
+        parts.append(f"| {name} | {comment} |\n")
+        rows += 1
+    parts.append("\n")
+    return rows + 3
+
+
+def render_class_section(class_path: str, encoded) -> tuple[str, int]:
+    """
+    Render the Markdown section of one source file from encoded class info.
+
+    Pieces are collected in a list and joined once, and the line count is
+    tallied while rendering. Names and paths are single-line, comments have
+    their newlines replaced, so only the template adds newlines.
+
+    Returns:
+        tuple: (section text, number of lines it spans).
+    """
+    parts = [f"\n## {class_path}\n\n"]
+    newlines = 3
+
+    for name, constants, methods in iter_classes(
+        encoded, "name", "constants", "methods"
+    ):
+        parts.append(f"### Class: {name}\n\n")
+        newlines += 2
+
+        # Write constants table
+        if constants:
+            newlines += _render_table(
+                parts, "| Constant | Comment |\n|----------|---------|\n", constants
+            )
+
+        # Write methods table
+        if methods:
+            newlines += _render_table(
+                parts, "| Method | Comment |\n|---------|---------|\n", methods
+            )
+
+    return "".join(parts), newlines + 1
+
+
+def estimate_tokens(byte_count: int) -> int:
+    """Estimate the LLM tokens in ``byte_count`` bytes of Markdown."""
+    return -(-byte_count // BYTES_PER_TOKEN)
+
+
+class MarkdownWriter(OutputWriter):
+    def __init__(
+        self,
+        base_filename: str,
+        max_lines: int = 500000,
+        first_shard: int = 1,
+        max_bytes: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        """
+        Args:
+            base_filename (str): Shards are named ``{base_filename}-{n}.md``.
+            max_lines (int): A shard is closed before reaching this many lines.
+            first_shard (int): Number of the first shard written.
+            max_bytes (int): Optional cap on the bytes of a shard.
+            max_tokens (int): Optional cap on the estimated tokens of a shard.
+
+        A section is never split across shards. A new shard is only started
+        once the current one holds a section, so a single section larger than
+        a limit gets a shard of its own.
+        """
         self.base_filename = base_filename
-        self.output_dir = "output"
+        self.output_dir = OUTPUT_DIR
         os.makedirs(self.output_dir, exist_ok=True)
         self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
         self.current_file = None
         self.current_lines = 0
-        self.file_counter = 1
+        # Bytes of the current shard after its introduction
+        self.section_bytes = 0
+        self.file_counter = first_shard
+        # Encoded blocks held back from the file, and their lines and bytes
         self.buffer = []
+        self.buffer_lines = 0
+        self.buffer_bytes = 0
+        # Source paths written to each shard, consumed by the shard manifest
+        self.shard_sources = []
+        self.pending_sources = []
+        # Lines, bytes, classes and files of each shard, tracked as written
+        self.shard_stats = []
+        self.pending_classes = 0
+        self.pending_files = 0
         self._open_new_file()
 
     def _open_new_file(self):
-        if self.current_file:
-            filename = self.current_file.name
-            self.current_file.close()
-            logger.info(
-                f"Completed writing {filename} with {self._count_lines(filename)} lines"
-            )
+        self._close_current_file()
         filename = f"{self.base_filename}-{self.file_counter}.md"
         filepath = os.path.join(self.output_dir, filename)
-        self.current_file = open(filepath, "w", encoding="utf-8")
+        # Binary, so sections rendered by workers are appended as they are
+        self.current_file = open(filepath, "wb")
+        self.shard_sources.append([filename, []])
+        self.shard_stats.append(
+            {"file": filename, "lines": 0, "bytes": 0, "classes": 0, "files": 0}
+        )
         self.current_lines = 0
         self.file_counter += 1
         # Write introduction in each file
         intro_text = "这个文件里包含所有ideaIC-2024.2的源代码，里面的java类、函数、kotlin类和函数，可以用来帮助实现intellij plugin\n\n"
-        self.current_file.write(intro_text)
+        self._write_bytes(intro_text.encode("utf-8"), intro_text.count("\n"))
         self.current_lines += intro_text.count("\n") + 1
+        self.section_bytes = 0
 
-    def _count_lines(self, file_path: str) -> int:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return sum(1 for _ in f)
+    def _write_bytes(self, data: bytes, newlines: int):
+        self.current_file.write(data)
+        stats = self.shard_stats[-1]
+        stats["bytes"] += len(data)
+        stats["lines"] += newlines
+        self.section_bytes += len(data)
 
-    def write_class_info(self, class_path: str, class_info: List[Dict]):
-        content = f"\n## {class_path}\n\n"
-
-        for class_data in class_info:
-            content += f"### Class: {class_data['name']}\n\n"
-
-            # Write constants table
-            if class_data["constants"]:
-                content += "| Constant | Comment |\n|----------|---------|\n"
-                for const in class_data["constants"]:
-                    comment = const["comment"].replace("\n", " ").strip()
-                    content += f"| {const['name']} | {comment} |\n"
-                content += "\n"
-
-            # Write methods table
-            if class_data["methods"]:
-                content += "| Method | Comment |\n|---------|---------|\n"
-                for method in class_data["methods"]:
-                    comment = method["comment"].replace("\n", " ").strip()
-                    content += f"| {method['name']} | {comment} |\n"
-                content += "\n"
-
-        self.write(content)
-
-    def write(self, content: str):
-        lines = content.split("\n")
-        total_lines = self.current_lines + len(self.buffer) + len(lines)
-
-        if total_lines >= self.max_lines:
+    def _exceeds(self, line_count: int, size: int) -> bool:
+        """Check whether ``line_count`` more lines and ``size`` more bytes overflow."""
+        if not self.section_bytes:
+            return False
+        if self.current_lines + line_count >= self.max_lines:
+            return True
+        total_bytes = self.shard_stats[-1]["bytes"] + size
+        if self.max_bytes and total_bytes > self.max_bytes:
+            return True
+        return bool(self.max_tokens) and estimate_tokens(total_bytes) > self.max_tokens
+
+    def _make_room(self, line_count: int, size: int):
+        """Flush the buffer and start a new shard if a block would not fit."""
+        if self._exceeds(self.buffer_lines + line_count, self.buffer_bytes + size):
             self._write_buffer()
-            if self.current_lines + len(lines) >= self.max_lines:
+            if self._exceeds(line_count, size):
                 self._open_new_file()
 
-        self.buffer.extend(lines)
-        if not any(line.startswith("```") for line in self.buffer[-3:]):
+    def _close_current_file(self):
+        if not self.current_file:
+            return
+        filename = self.current_file.name
+        self.current_file.close()
+        self.current_file = None
+        stats = self.shard_stats[-1]
+        stats["tokens"] = estimate_tokens(stats["bytes"])
+        logger.info(
+            f"Completed writing {filename} with {stats['lines']} lines, "
+            f"{stats['classes']} classes from {stats['files']} files"
+        )
+
+    def write_class_info(self, class_path: str, class_info: List[Dict]):
+        """Write the section of one source file from parsed class information."""
+        self.write_encoded_class_info(class_path, encode_class_info(class_info))
+
+    def write_encoded_class_info(self, class_path: str, encoded):
+        """Write class information in the ``result_codec`` wire format."""
+        content, line_count = render_class_section(class_path, encoded)
+        self.write(content, class_path, line_count, class_count=len(encoded[1]))
+
+    def write_rendered(
+        self, class_path: str, data: bytes, line_count: int, class_count: int
+    ):
+        """
+        Append a section rendered by a pool worker, see ``_render_result``.
+
+        Args:
+            class_path (str): The source the section was rendered from.
+            data (bytes): The section as utf-8, ending in a newline.
+            line_count (int): Lines the section adds to the shard.
+            class_count (int): Classes described in the section.
+        """
+        self._make_room(line_count, len(data))
+        self._write_buffer()
+
+        self._write_bytes(data, line_count)
+        self.current_lines += line_count
+        self.pending_sources.append(class_path)
+        self.pending_classes += class_count
+        self.pending_files += 1
+        self._assign_pending_sources()
+
+    def record_source(self, class_path: str):
+        """Attribute a source without extracted classes to the current shard."""
+        self.pending_sources.append(class_path)
+        if not self.buffer:
+            self._assign_pending_sources()
+
+    def write(
+        self,
+        content: str,
+        source: Optional[str] = None,
+        line_count: Optional[int] = None,
+        class_count: int = 0,
+    ):
+        """
+        Write a block of text, starting a new shard first if it would not fit.
+
+        Args:
+            content (str): The text, written followed by a newline.
+            source (str): The source the text was rendered from.
+            line_count (int): Lines ``content`` spans, if already known.
+            class_count (int): Classes described in ``content``.
+        """
+        if line_count is None:
+            line_count = content.count("\n") + 1
+        data = content.encode("utf-8")
+        # Each block is followed by a newline in the file
+        self._make_room(line_count, len(data) + 1)
+
+        self.buffer.append(data)
+        self.buffer_lines += line_count
+        self.buffer_bytes += len(data) + 1
+        if source:
+            self.pending_sources.append(source)
+            self.pending_files += 1
+        self.pending_classes += class_count
+        # Every buffered block spans at least one line, so the last three
+        # blocks hold the last three lines
+        tail = b"\n".join(self.buffer[-3:]).rsplit(b"\n", 3)[-3:]
+        if not any(line.startswith(b"```") for line in tail):
             self._write_buffer()
 
+    def _assign_pending_sources(self):
+        self.shard_sources[-1][1].extend(self.pending_sources)
+        self.pending_sources = []
+        stats = self.shard_stats[-1]
+        stats["classes"] += self.pending_classes
+        stats["files"] += self.pending_files
+        self.pending_classes = 0
+        self.pending_files = 0
+
     def _write_buffer(self):
         if not self.buffer:
             return
-        content = "\n".join(self.buffer)
-        self.current_file.write(content + "\n")
-        self.current_lines += content.count("\n") + 1
+        self.buffer.append(b"")
+        self._write_bytes(b"\n".join(self.buffer), self.buffer_lines)
+        self.current_lines += self.buffer_lines
         self.buffer = []
-
-        if self.current_lines >= self.max_lines:
-            self._open_new_file()
+        self.buffer_lines = 0
+        self.buffer_bytes = 0
+        self._assign_pending_sources()
 
     def close(self):
         self._write_buffer()
-        if self.current_file:
-            filename = self.current_file.name
-            self.current_file.close()
-            logger.info(
-                f"Completed writing {filename} with {self._count_lines(filename)} lines"
-            )
+        self._assign_pending_sources()
+        self._close_current_file()
 
 
-def process_directory(
-    source_dir: str,
-    base_output_file: str,
-    max_lines: int = 100000,
-    worker_num: int = 10,
+def _parse_in_pool(
+    files_to_process: Iterable[tuple],
+    worker_num: int,
+    cache_dir: Optional[str],
+    cache_max_bytes: int,
+    dfa_dir: Optional[str],
+    parse_stats: Counter,
+    engine: str = "antlr",
+    chunk_policy: str = "size",
+    chunk_bytes: int = 256 * 1024,
+    render_markdown: bool = False,
 ):
-    """Process a directory containing Java and Kotlin files and generate markdown documentation."""
-    # First count total files to process
-    total_files = count_source_files(source_dir)
-    logger.info(f"Found {total_files} Java and Kotlin files to process")
+    """
+    Parse files in a worker pool, logging progress and merging parse stats.
+
+    ``files_to_process`` may be a lazy stream; files are dispatched in chunks
+    planned by ``stream_chunks`` as they arrive, and results are yielded per
+    file in completion order as (formatted_path, encoded class_info) in the
+    ``result_codec`` wire format, or as (formatted_path, rendered section)
+    with ``render_markdown``. Progress is reported as a file count until
+    the stream is exhausted and as a percentage once the total is known.
+    """
+    found_files = 0
+    discovery_done = False
+
+    def discover():
+        # Runs in the pool's task-feeding thread
+        nonlocal found_files, discovery_done
+        for task in files_to_process:
+            found_files += 1
+            yield task
+        discovery_done = True
+        logger.info(f"Found {found_files} Java and Kotlin files to process")
 
-    writer = MarkdownWriter(base_output_file, max_lines)
     processed_files = 0
     last_progress_milestone = -1
+    last_count_report = 0
+    chunks = stream_chunks(
+        discover(), chunk_policy, chunk_bytes, min_chunks=worker_num * 4
+    )
+    # Worker pid -> [busy seconds, files parsed]
+    worker_busy = defaultdict(lambda: [0.0, 0])
 
-    # Collect all files to process
-    files_to_process = []
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            if file.endswith((".java", ".kt")):
-                full_path = os.path.join(root, file)
-                files_to_process.append((full_path, source_dir))
-
-    # Process files in parallel
-    with Pool(processes=worker_num) as pool:
-        for formatted_path, class_info, error in pool.imap_unordered(
-            parse_file, files_to_process
-        ):
-            processed_files += 1
-            if error:
-                logger.error(f"Error processing {formatted_path}: {error}")
-            elif class_info:
-                writer.write_class_info(formatted_path, class_info)
+    with Pool(
+        processes=worker_num,
+        initializer=_init_worker,
+        initargs=(cache_dir, cache_max_bytes, dfa_dir, engine, render_markdown),
+    ) as pool:
+        for pid, busy, payload in pool.imap_unordered(parse_chunk, chunks):
+            results = decode_results(payload)
+            worker_busy[pid][0] += busy
+            worker_busy[pid][1] += len(results)
+            for formatted_path, encoded, error, file_stats in results:
+                processed_files += 1
+                parse_stats.update(file_stats)
+                if error:
+                    logger.error(f"Error processing {formatted_path}: {error}")
+                yield formatted_path, encoded
 
+            if not discovery_done:
+                if processed_files - last_count_report >= PROGRESS_COUNT_STEP:
+                    logger.info(
+                        f"Progress: {processed_files} files parsed, "
+                        f"{found_files} found so far"
+                    )
+                    last_count_report = processed_files
+                continue
+
+            total_files = found_files
             current_progress = int((processed_files / total_files) * 1000)
             if current_progress > last_progress_milestone:
                 logger.info(
                     f"Progress: {current_progress / 10:.1f}% ({processed_files}/{total_files} files)"
                 )
+                # A chunk can step over a multiple of 10%, so compare deciles
+                if current_progress // 100 > last_progress_milestone // 100:
+                    logger.info(
+                        "DFA states built so far: "
+                        + ", ".join(
+                            f"{language} {parse_stats[f'{language}.dfa_states_added']}"
+                            for language in LANGUAGES
+                        )
+                    )
                 last_progress_milestone = current_progress
 
-    writer.close()
-    logger.info(f"Markdown files generated with base name: {base_output_file}")
+    log_worker_balance(worker_busy)
+
+
+def _write_result(
+    writer: OutputWriter, formatted_path: str, result, rendered: bool = False
+):
+    if result and rendered:
+        writer.write_rendered(formatted_path, *result)
+    elif result:
+        writer.write_encoded_class_info(formatted_path, result)
+    else:
+        writer.record_source(formatted_path)
+
+
+def _remove_stale_shards(base_output_file: str, shard_count: int):
+    """Delete shards numbered beyond ``shard_count`` left over from earlier runs."""
+    pattern = re.compile(rf"{re.escape(base_output_file)}-(\d+)\.md$")
+    for path in glob.glob(os.path.join(OUTPUT_DIR, f"{base_output_file}-*.md")):
+        match = pattern.search(os.path.basename(path))
+        if match and int(match.group(1)) > shard_count:
+            os.remove(path)
+            logger.info(f"Removed stale shard {path}")
+
+
+def _regenerate_changed_shards(
+    manifest: ShardManifest,
+    source_files: Dict[str, str],
+    current_sources: Dict[str, List[int]],
+    source_dir: str,
+    base_output_file: str,
+    shard_limits: Dict,
+    parse_in_pool,
+    rendered: bool = False,
+) -> bool:
+    """
+    Rewrite only the shards whose sources changed, leaving the others on disk.
+
+    ``shard_limits`` holds the MarkdownWriter size limits. The tail shard may
+    grow into new shards. Other rewritten shards are written under a
+    temporary name first and only replace the old ones if they still fit
+    within the limits; otherwise nothing is replaced.
+
+    Returns:
+        bool: False if a shard before the tail outgrew the limits, in which
+        case every shard has to be regenerated.
+    """
+    rewrite, new_sources = manifest.changed_shards(current_sources)
+    logger.info(
+        f"Incremental run: rewriting {len(rewrite)} of {len(manifest.shards)} shards, "
+        f"{len(new_sources)} new source files"
+    )
+    if not rewrite:
+        return True
+
+    last_index = len(manifest.shards) - 1
+    shard_sources = {}
+    for index in rewrite:
+        sources = [s for s in manifest.shards[index][1] if s in current_sources]
+        if index == last_index:
+            sources += new_sources
+        shard_sources[index] = sources
+
+    files_to_process = [
+        (source_files[source], source_dir)
+        for sources in shard_sources.values()
+        for source in sources
+    ]
+    results = dict(parse_in_pool(files_to_process))
+
+    def write_shard(base_filename, index):
+        writer = MarkdownWriter(base_filename, first_shard=index + 1, **shard_limits)
+        for source in shard_sources[index]:
+            _write_result(writer, source, results.get(source), rendered)
+        writer.close()
+        return writer
+
+    partial_base = f"{base_output_file}.partial"
+    rewritten = {}
+    for index in rewrite:
+        if index == last_index:
+            continue
+        rewritten[index] = write_shard(partial_base, index)
+        if len(rewritten[index].shard_sources) > 1:
+            logger.info(f"Shard {index + 1} outgrew the shard limits")
+            for writer in rewritten.values():
+                for filename, _ in writer.shard_sources:
+                    os.remove(os.path.join(OUTPUT_DIR, filename))
+            return False
+
+    for index, writer in rewritten.items():
+        filename = manifest.shards[index][0]
+        [(partial_filename, sources)] = writer.shard_sources
+        os.replace(
+            os.path.join(OUTPUT_DIR, partial_filename),
+            os.path.join(OUTPUT_DIR, filename),
+        )
+        manifest.shards[index] = [filename, sources]
+        manifest.stats[index] = {**writer.shard_stats[0], "file": filename}
+
+    # The tail shard is rewritten last so only it can grow into new shards
+    if last_index in shard_sources:
+        writer = write_shard(base_output_file, last_index)
+        manifest.shards[last_index:] = writer.shard_sources
+        manifest.stats[last_index:] = writer.shard_stats
+    return True
+
+
+def process_directory(
+    source_dir: str,
+    base_output_file: str,
+    max_lines: int = 100000,
+    worker_num: int = 10,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = 2 * 1024**3,
+    incremental: bool = False,
+    dfa_dir: Optional[str] = None,
+    dfa_warmup_files: int = 50,
+    engine: str = "antlr",
+    chunk_policy: str = "size",
+    chunk_bytes: int = 256 * 1024,
+    render_in_workers: bool = True,
+    max_bytes: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    output_formats: tuple = ("markdown",),
+):
+    """Process a directory containing Java and Kotlin files and generate markdown documentation.
+
+    When ``cache_dir`` is given, parse results are cached there by file content
+    and parser version so re-runs only parse new or modified files.
+
+    With ``incremental``, a manifest of which sources went into which shard is
+    kept next to the output, and re-runs only rewrite shards whose sources were
+    added, modified or deleted.
+
+    When ``dfa_dir`` is given, the adaptive-prediction DFA is warmed up once on
+    a sample of files, persisted there, and loaded by every pool worker.
+
+    ``engine`` selects how declarations are extracted: "antlr" builds a full
+    parse tree per file, "skeleton" one without the statements of method and
+    function bodies that hold no local or anonymous classes, "streaming"
+    extracts declarations while parsing without keeping a tree in memory,
+    both with the same results, and "tokens" works from the token stream
+    alone, which is much faster but may differ from "antlr" on unusual syntax.
+
+    ``chunk_policy`` and ``chunk_bytes`` control how files are batched into
+    pool tasks, see ``task_scheduler.plan_chunks``. The default dispatches the
+    largest files first and packs small files into tasks of about
+    ``chunk_bytes`` source bytes.
+
+    With ``render_in_workers``, pool workers render each file's Markdown
+    section and the parent only appends the bytes to the current shard, so
+    output throughput scales with ``worker_num``. Otherwise the parent
+    renders every section from the parse results itself.
+
+    Shards are closed before reaching ``max_lines`` lines and, if given,
+    before exceeding ``max_bytes`` bytes or ``max_tokens`` estimated tokens
+    (``BYTES_PER_TOKEN`` bytes each). A ``## {class_path}`` section is never
+    split across shards.
+
+    ``output_formats`` selects the outputs written to the output directory,
+    any of "markdown" (the sharded documentation), "jsonl" (one JSON object
+    per source file in ``{base_output_file}.jsonl``), "columnar" (one row
+    per class and member, in Parquet if pyarrow is installed, otherwise in
+    a binary ``.symbols`` table), "sqlite" (an indexed symbol database in
+    ``{base_output_file}.db``), "search" (a full-text index of names and
+    comments in ``{base_output_file}.search.db``) and "names" (a fuzzy
+    name lookup index in ``{base_output_file}.names.db``), see
+    ``output_writers``; query the indexes with ``symbol_search``. Sections
+    are only rendered in workers when Markdown is the sole output, and
+    incremental runs only support Markdown.
+
+    Line, byte, class and file counts of every shard are tracked while
+    writing and saved to ``{base_output_file}.shards.json`` in the output
+    directory.
+
+    Source files are discovered in a single lazy walk that feeds the pool as
+    files are found, so parsing starts right away and the file list is never
+    held in memory. Incremental runs still collect the list up front because
+    the manifest compares it as a whole.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    if chunk_policy not in CHUNK_POLICIES:
+        raise ValueError(
+            f"Unknown chunk policy {chunk_policy!r}, expected one of {CHUNK_POLICIES}"
+        )
+    unknown_formats = set(output_formats) - set(OUTPUT_FORMATS)
+    if unknown_formats or not output_formats:
+        raise ValueError(
+            f"Unknown output formats {sorted(unknown_formats)}, "
+            f"expected some of {OUTPUT_FORMATS}"
+        )
+    if incremental and set(output_formats) != {"markdown"}:
+        raise ValueError("Incremental runs only support the markdown output format")
+    # Structured writers need the parse results, not rendered Markdown
+    render_in_workers = render_in_workers and set(output_formats) == {"markdown"}
+
+    parse_stats = Counter()
+
+    # The token engine never runs the parser, so it has no DFA to warm up
+    if engine != "tokens" and dfa_dir:
+        prepare_dfa(dfa_dir, iter_source_files(source_dir), dfa_warmup_files, engine)
+    else:
+        dfa_dir = None
+
+    def parse_in_pool(files):
+        return _parse_in_pool(
+            files,
+            worker_num,
+            cache_dir,
+            cache_max_bytes,
+            dfa_dir,
+            parse_stats,
+            engine,
+            chunk_policy,
+            chunk_bytes,
+            render_in_workers,
+        )
+
+    shard_limits = {
+        "max_lines": max_lines,
+        "max_bytes": max_bytes,
+        "max_tokens": max_tokens,
+    }
+    manifest = None
+    if incremental:
+        settings = {
+            "version": MANIFEST_VERSION,
+            **shard_limits,
+            "engine": engine,
+            "parsers": {lang: parser_fingerprint(lang) for lang in LANGUAGES},
+        }
+        manifest = ShardManifest.load(
+            os.path.join(OUTPUT_DIR, f"{base_output_file}.manifest.json"), settings
+        )
+        source_files = {}
+        current_sources = {}
+        for full_path, _ in iter_source_files(source_dir):
+            formatted_path = format_source_path(full_path, source_dir)
+            stat = os.stat(full_path)
+            source_files[formatted_path] = full_path
+            current_sources[formatted_path] = [stat.st_size, stat.st_mtime_ns]
+
+    regenerated = False
+    if manifest and manifest.shards:
+        regenerated = _regenerate_changed_shards(
+            manifest,
+            source_files,
+            current_sources,
+            source_dir,
+            base_output_file,
+            shard_limits,
+            parse_in_pool,
+            render_in_workers,
+        )
+        if not regenerated:
+            logger.info("Regenerating all shards")
+    if not regenerated:
+        if manifest:
+            files_to_process = [(path, source_dir) for path in source_files.values()]
+        else:
+            files_to_process = iter_source_files(source_dir)
+        writers = create_writers(output_formats, base_output_file, OUTPUT_DIR)
+        writer = None
+        if "markdown" in output_formats:
+            writer = MarkdownWriter(base_output_file, **shard_limits)
+            writers.insert(0, writer)
+        for formatted_path, result in parse_in_pool(files_to_process):
+            # Sources without classes only need recording for the manifest
+            if result or manifest:
+                for output_writer in writers:
+                    _write_result(
+                        output_writer, formatted_path, result, render_in_workers
+                    )
+        for output_writer in writers:
+            output_writer.close()
+        shard_stats = writer.shard_stats if writer else None
+        if manifest:
+            manifest.shards = writer.shard_sources
+            manifest.stats = shard_stats
+            _remove_stale_shards(base_output_file, len(writer.shard_sources))
+
+    if manifest:
+        manifest.sources = current_sources
+        manifest.save()
+        shard_stats = manifest.stats
+    if shard_stats is not None:
+        save_shard_stats(
+            os.path.join(OUTPUT_DIR, f"{base_output_file}.shards.json"), shard_stats
+        )
+
+    log_parse_stats(parse_stats)
+    if cache_dir:
+        ParseCache(cache_dir, cache_max_bytes, engine).prune()
+    logger.info(f"Output files generated with base name: {base_output_file}")
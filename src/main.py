@@ -1,7 +1,6 @@
 from loguru import logger
 import sys
-from directory_processor import process_directory
-from parsers.kotlin.kotlin_parser import parse_kotlin_file
+from directory_processor import load_language, process_directory
 
 
 def setup_logger():
@@ -21,6 +20,7 @@ def _main():
     file = "/Users/bytedance/Projects/ideaIC-2024.2-sources/com/intellij/ide/GeneralSettings.kt"
     with open(file, "r", encoding="utf-8") as f:
         content = f.read()
+        parse_kotlin_file, _ = load_language("kotlin")
         class_info = parse_kotlin_file(content)
         print(class_info)
 
@@ -32,7 +32,9 @@ def main():
     source_dir = "/Users/bytedance/Projects/ideaIC-2024.2-sources"
     base_output_file = "ideaIC-2024.2-sources"
 
-    process_directory(source_dir, base_output_file)
+    process_directory(
+        source_dir, base_output_file, cache_dir=".parse_cache", dfa_dir=".dfa_cache"
+    )
 
     logger.info("Application finished.")
 
@@ -0,0 +1,682 @@
+import json
+import os
+import re
+import sqlite3
+import struct
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List
+from loguru import logger
+from result_codec import MEMBER_LISTS, decode_class_info, iter_members
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+OUTPUT_FORMATS = ("markdown", "jsonl", "columnar", "sqlite", "search", "names")
+# Row kind of the members in each class member list
+MEMBER_KINDS = {
+    "constants": "constant",
+    "methods": "method",
+    "properties": "property",
+    "enum_values": "enum_value",
+    "companion_objects": "companion_object",
+}
+SYMBOL_COLUMNS = ("kind", "path", "class", "name", "comment")
+
+
+class OutputWriter(ABC):
+    """
+    Sink for the class information extracted from each source file.
+
+    process_directory feeds every parsed file to one or more writers, in the
+    ``result_codec`` wire format, and closes them at the end of the run.
+    """
+
+    @abstractmethod
+    def write_encoded_class_info(self, class_path: str, encoded):
+        """Write the classes of one source file, see ``result_codec``."""
+
+    def record_source(self, class_path: str):
+        """Note a source file without classes; most writers ignore it."""
+
+    def close(self):
+        """Flush and close the output."""
+
+
+def iter_symbols(class_path: str, encoded) -> Iterator[tuple]:
+    """
+    Yield one (kind, path, class, name, comment) row per class and member.
+
+    Class rows have kind "class" and repeat the class name as ``name``.
+    Member rows are typed by their list, e.g. "method" or "constant".
+    """
+    layouts, rows = encoded
+    for row in rows:
+        layout = layouts[row[0]]
+        fields = dict(zip(layout, row[1:]))
+        class_name = fields["name"]
+        yield "class", class_path, class_name, class_name, fields["comment"]
+        for key in layout:
+            if key in MEMBER_LISTS:
+                kind = MEMBER_KINDS[key]
+                for name, comment in iter_members(fields[key]):
+                    yield kind, class_path, class_name, name, comment
+
+
+class JsonlWriter(OutputWriter):
+    """
+    Streams one JSON object per source file to ``{base}.jsonl``.
+
+    Each line holds the path and the full class records of one file, so
+    consumers get the parser output without re-parsing Markdown.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+        self.files = 0
+
+    def write_encoded_class_info(self, class_path: str, encoded):
+        classes = decode_class_info(encoded)
+        self.file.write(
+            json.dumps({"path": class_path, "classes": classes}, ensure_ascii=False)
+        )
+        self.file.write("\n")
+        self.files += 1
+
+    def close(self):
+        self.file.close()
+        logger.info(f"Completed writing {self.path} with {self.files} files")
+
+
+class ColumnarWriter(OutputWriter):
+    """
+    Writes every class and member as a (kind, path, class, name, comment) row.
+
+    With pyarrow installed the rows go to a Parquet file, otherwise to a
+    compact binary symbol table, see ``read_symbol_table``. Rows are flushed
+    in groups of ``group_rows``, so memory stays bounded on large trees.
+    """
+
+    def __init__(self, path_without_extension: str, group_rows: int = 65536):
+        self.group_rows = group_rows
+        self.columns = {column: [] for column in SYMBOL_COLUMNS}
+        self.rows = 0
+        if pyarrow is not None:
+            self.path = f"{path_without_extension}.parquet"
+            self.table = _ParquetTable(self.path)
+        else:
+            self.path = f"{path_without_extension}.symbols"
+            self.table = _SymbolTable(self.path)
+
+    def write_encoded_class_info(self, class_path: str, encoded):
+        columns = [self.columns[column] for column in SYMBOL_COLUMNS]
+        for symbol in iter_symbols(class_path, encoded):
+            for column, value in zip(columns, symbol):
+                column.append(value)
+        if len(self.columns["kind"]) >= self.group_rows:
+            self._flush()
+
+    def _flush(self):
+        count = len(self.columns["kind"])
+        if count:
+            self.table.write_group(self.columns)
+            self.rows += count
+            self.columns = {column: [] for column in SYMBOL_COLUMNS}
+
+    def close(self):
+        self._flush()
+        self.table.close()
+        logger.info(f"Completed writing {self.path} with {self.rows} symbols")
+
+
+class _ParquetTable:
+    def __init__(self, path: str):
+        schema = pyarrow.schema(
+            [(column, pyarrow.string()) for column in SYMBOL_COLUMNS]
+        )
+        self.writer = parquet.ParquetWriter(path, schema)
+
+    def write_group(self, columns: Dict[str, List[str]]):
+        self.writer.write_table(pyarrow.table(columns))
+
+    def close(self):
+        self.writer.close()
+
+
+SYMBOL_TABLE_MAGIC = b"SYMTAB1\n"
+
+
+class _SymbolTable:
+    """
+    Compact binary symbol table used when pyarrow is not available.
+
+    Layout, all integers little-endian:
+
+    - ``SYMBOL_TABLE_MAGIC``
+    - row groups: uint32 row count, then one uint32 string id per row for
+      each column in ``SYMBOL_COLUMNS`` order
+    - string table: uint32 count, uint32 end offset of each string, then the
+      concatenated UTF-8 strings
+    - uint64 offset of the string table
+
+    Every column is dictionary-encoded against one shared string table, so
+    repeated paths, class names and comments are stored once.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.file.write(SYMBOL_TABLE_MAGIC)
+        self.string_ids = {}
+
+    def write_group(self, columns: Dict[str, List[str]]):
+        string_ids = self.string_ids
+        self.file.write(struct.pack("<I", len(columns["kind"])))
+        for column in SYMBOL_COLUMNS:
+            ids = array(
+                "I",
+                (
+                    string_ids.setdefault(value, len(string_ids))
+                    for value in columns[column]
+                ),
+            )
+            _write_array(self.file, ids)
+
+    def close(self):
+        table_offset = self.file.tell()
+        strings = [value.encode("utf-8") for value in self.string_ids]
+        offsets = array("I")
+        end = 0
+        for data in strings:
+            end += len(data)
+            offsets.append(end)
+        self.file.write(struct.pack("<I", len(strings)))
+        _write_array(self.file, offsets)
+        self.file.write(b"".join(strings))
+        self.file.write(struct.pack("<Q", table_offset))
+        self.file.close()
+
+
+def array_bytes(values: array) -> bytes:
+    """Return ``values`` as little-endian bytes, see ``read_array``."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_array(file, values: array):
+    file.write(array_bytes(values))
+
+
+def read_array(data: bytes, start: int, count: int) -> array:
+    """Read ``count`` little-endian uint32 values from ``data`` at ``start``."""
+    values = array("I")
+    values.frombytes(data[start : start + 4 * count])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def read_symbol_table(path: str) -> Dict[str, List[str]]:
+    """
+    Load a binary symbol table written by ``ColumnarWriter``.
+
+    Args:
+        path (str): A ``.symbols`` file.
+
+    Returns:
+        dict: Column name -> list of values, in ``SYMBOL_COLUMNS`` order.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(SYMBOL_TABLE_MAGIC):
+        raise ValueError(f"{path} is not a symbol table")
+
+    (table_offset,) = struct.unpack_from("<Q", data, len(data) - 8)
+    (count,) = struct.unpack_from("<I", data, table_offset)
+    offsets = read_array(data, table_offset + 4, count)
+    blob = data[table_offset + 4 + 4 * count : len(data) - 8]
+    strings = []
+    start = 0
+    for end in offsets:
+        strings.append(blob[start:end].decode("utf-8"))
+        start = end
+
+    columns = {column: [] for column in SYMBOL_COLUMNS}
+    position = len(SYMBOL_TABLE_MAGIC)
+    while position < table_offset:
+        (rows,) = struct.unpack_from("<I", data, position)
+        position += 4
+        for column in SYMBOL_COLUMNS:
+            ids = read_array(data, position, rows)
+            columns[column].extend(strings[i] for i in ids)
+            position += 4 * rows
+    return columns
+
+
+# Member lists stored in their own table of the symbol database
+MEMBER_TABLES = (
+    "constants",
+    "methods",
+    "properties",
+    "enum_values",
+    "companion_objects",
+)
+SYMBOL_DB_SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    package TEXT NOT NULL
+);
+CREATE TABLE classes (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    comment TEXT NOT NULL,
+    is_interface INTEGER,
+    is_enum INTEGER,
+    is_data_class INTEGER,
+    annotations TEXT
+);
+""" + "".join(
+    f"""
+CREATE TABLE {table} (
+    id INTEGER PRIMARY KEY,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    comment TEXT NOT NULL
+);
+""" for table in MEMBER_TABLES
+)
+SYMBOL_DB_INDEXES = """
+CREATE UNIQUE INDEX files_path ON files(path);
+CREATE INDEX files_package ON files(package);
+CREATE INDEX classes_file ON classes(file_id);
+CREATE INDEX classes_name ON classes(name);
+""" + "".join(
+    f"""
+CREATE INDEX {table}_class ON {table}(class_id);
+CREATE INDEX {table}_name ON {table}(name);
+""" for table in MEMBER_TABLES
+)
+
+
+def file_package(class_path: str) -> str:
+    """Return the dotted directory of a formatted path, e.g. "com.intellij.ide"."""
+    return class_path.rsplit(".", 2)[0] if class_path.count(".") >= 2 else ""
+
+
+class SqliteWriter(OutputWriter):
+    """
+    Stores files, classes and members in a SQLite symbol database.
+
+    Every member list gets its own table referencing ``classes``, which in
+    turn references ``files``. Row ids are assigned here, so rows are
+    buffered per table and inserted with ``executemany`` once ``batch_rows``
+    are pending, all inside one transaction committed on close. The
+    database uses WAL journaling, and the name and package indexes are
+    built after the bulk load, which is faster than maintaining them on
+    every insert.
+    """
+
+    def __init__(self, path: str, batch_rows: int = 50000):
+        self.path = path
+        self.batch_rows = batch_rows
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SYMBOL_DB_SCHEMA)
+        self.connection.execute("BEGIN")
+        # Parents first, so foreign keys hold at every flush
+        self.pending = {"files": [], "classes": []}
+        self.pending.update((table, []) for table in MEMBER_TABLES)
+        self.pending_rows = 0
+        self.file_id = 0
+        self.class_id = 0
+        self.member_id = 0
+        self.counts = Counter()
+
+    def write_encoded_class_info(self, class_path: str, encoded):
+        pending = self.pending
+        self.file_id += 1
+        pending["files"].append((self.file_id, class_path, file_package(class_path)))
+        rows = 1
+        layouts, class_rows = encoded
+        for row in class_rows:
+            fields = dict(zip(layouts[row[0]], row[1:]))
+            self.class_id += 1
+            annotations = fields.get("annotations")
+            pending["classes"].append(
+                (
+                    self.class_id,
+                    self.file_id,
+                    fields["name"],
+                    fields["comment"],
+                    fields.get("is_interface"),
+                    fields.get("is_enum"),
+                    fields.get("is_data_class"),
+                    json.dumps(annotations) if annotations else None,
+                )
+            )
+            rows += 1
+            for table in MEMBER_TABLES:
+                members = fields.get(table)
+                if members:
+                    table_rows = pending[table]
+                    for name, comment in iter_members(members):
+                        self.member_id += 1
+                        table_rows.append(
+                            (self.member_id, self.class_id, name, comment)
+                        )
+                    rows += len(members) // 2
+        self.pending_rows += rows
+        if self.pending_rows >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        for table, rows in self.pending.items():
+            if rows:
+                placeholders = ", ".join("?" * len(rows[0]))
+                self.connection.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders})", rows
+                )
+                self.counts[table] += len(rows)
+                rows.clear()
+        self.pending_rows = 0
+
+    def close(self):
+        self._flush()
+        # executescript would commit first, so run the statements one by one
+        for statement in SYMBOL_DB_INDEXES.split(";"):
+            if statement.strip():
+                self.connection.execute(statement)
+        self.connection.execute("COMMIT")
+        self.connection.execute("PRAGMA optimize")
+        self.connection.close()
+        summary = ", ".join(f"{count} {table}" for table, count in self.counts.items())
+        logger.info(f"Completed writing {self.path} with {summary}")
+
+
+# Splits identifiers at camel humps, acronyms and digits: HTTPClient2 -> HTTP Client 2
+IDENTIFIER_WORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# Column weights of the search ranking, in SEARCH_INDEX_SCHEMA column order
+SEARCH_WEIGHTS = (0.0, 0.0, 2.0, 5.0, 2.0, 1.0)
+# The same weights for the columns of symbol_names
+NAME_SEARCH_WEIGHTS = SEARCH_WEIGHTS[2:5]
+SEARCH_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE symbols USING fts5(
+    kind UNINDEXED,
+    path UNINDEXED,
+    class,
+    name,
+    words,
+    comment,
+    prefix='2 3'
+);
+CREATE VIRTUAL TABLE symbol_names USING fts5(
+    class,
+    name,
+    words,
+    content='',
+    prefix='2 3'
+);
+"""
+
+
+def identifier_words(name: str) -> str:
+    """Return the lowercase camel-hump words of ``name``, space separated."""
+    return " ".join(word.lower() for word in IDENTIFIER_WORD.findall(name))
+
+
+class SearchIndexWriter(OutputWriter):
+    """
+    Builds an SQLite FTS5 full-text index over classes, members and comments.
+
+    Every class and member becomes one row of the ``symbols`` table, see
+    ``iter_symbols``, with the camel-hump words of its name in a ``words``
+    column, so "settings" finds ``GeneralSettings``. The contentless
+    ``symbol_names`` table indexes the name columns again under the same
+    rowid, so name matches can be ranked without the length of comments
+    counting against them. Rows are inserted with ``executemany`` in batches
+    of ``batch_rows`` inside one transaction, and the indexes are merged
+    into single b-trees on close. Query it with
+    ``symbol_search.search_symbols``.
+    """
+
+    def __init__(self, path: str, batch_rows: int = 50000):
+        self.path = path
+        self.batch_rows = batch_rows
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        # The index is rebuilt from scratch on every run, so skip durability
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.executescript(SEARCH_INDEX_SCHEMA)
+        self.connection.execute("BEGIN")
+        self.pending = []
+        self.rows = 0
+
+    def write_encoded_class_info(self, class_path: str, encoded):
+        self.pending.extend(
+            (kind, path, class_name, name, identifier_words(name), comment)
+            for kind, path, class_name, name, comment in iter_symbols(
+                class_path, encoded
+            )
+        )
+        if len(self.pending) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            # Both tables share the rowids, assigned here
+            rows = [(self.rows + i, *row) for i, row in enumerate(self.pending, 1)]
+            self.connection.executemany(
+                "INSERT INTO symbols(rowid, kind, path, class, name, words, comment) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.connection.executemany(
+                "INSERT INTO symbol_names(rowid, class, name, words) "
+                "VALUES (?, ?, ?, ?)",
+                (row[:1] + row[3:6] for row in rows),
+            )
+            self.rows += len(self.pending)
+            self.pending = []
+
+    def close(self):
+        self._flush()
+        for table in ("symbols", "symbol_names"):
+            self.connection.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+        self.connection.execute("COMMIT")
+        self.connection.close()
+        logger.info(f"Completed indexing {self.rows} symbols in {self.path}")
+
+
+NAME_INDEX_SCHEMA = """
+CREATE TABLE names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    lower TEXT NOT NULL,
+    occurrences INTEGER NOT NULL
+);
+CREATE TABLE postings (
+    key TEXT PRIMARY KEY,
+    ids BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE locations (
+    name_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    class TEXT NOT NULL
+);
+"""
+NAME_INDEX_INDEXES = """
+CREATE INDEX names_lower ON names(lower);
+CREATE INDEX locations_name ON locations(name_id);
+"""
+
+
+def name_trigrams(lower: str) -> set:
+    """Return the trigrams of a lowercase name."""
+    return {lower[i : i + 3] for i in range(len(lower) - 2)}
+
+
+def name_index_keys(name: str) -> set:
+    """
+    Return the posting keys of a name in the fuzzy name index.
+
+    These are the trigrams of the lowercase name, for substring and
+    typo-tolerant lookups, "~" plus the first one and two letters of every
+    camel-hump word, and the same for every pair of consecutive words
+    joined by "|", so "GenSet" matches ``GeneralSettings`` via "~ge|se".
+    """
+    keys = name_trigrams(name.lower())
+    starts = [
+        {word[:1], word[:2]}
+        for word in (word.lower() for word in IDENTIFIER_WORD.findall(name))
+    ]
+    for current in starts:
+        keys.update("~" + start for start in current)
+    for current, following in zip(starts, starts[1:]):
+        keys.update(f"~{first}|{second}" for first in current for second in following)
+    return keys
+
+
+class NameIndexWriter(OutputWriter):
+    """
+    Builds a fuzzy lookup index of class and member names.
+
+    Every distinct name gets an id, and each class and member a
+    ``locations`` row pointing back at its kind, file and class. Ids are
+    ordered by name length, and ``postings`` stores the ascending ids of
+    every key from ``name_index_keys`` as a packed uint32 blob. A lookup
+    thus only reads the few posting lists its query needs, can bisect them,
+    and meets the shortest, usually best, candidates first. Query it with
+    ``symbol_search.find_names``.
+    """
+
+    def __init__(self, path: str, batch_rows: int = 50000):
+        self.path = path
+        self.batch_rows = batch_rows
+        if os.path.exists(path):
+            os.remove(path)
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        # The index is rebuilt from scratch on every run, so skip durability
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.executescript(NAME_INDEX_SCHEMA)
+        # Locations refer to names in order of discovery until close
+        self.connection.execute(
+            "CREATE TEMP TABLE discovered_locations "
+            "(discovered INTEGER, kind TEXT, path TEXT, class TEXT)"
+        )
+        self.connection.execute("BEGIN")
+        self.name_ids = {}
+        self.occurrences = []
+        self.pending = []
+        self.rows = 0
+
+    def write_encoded_class_info(self, class_path: str, encoded):
+        name_ids = self.name_ids
+        for kind, path, class_name, name, _ in iter_symbols(class_path, encoded):
+            name_id = name_ids.get(name)
+            if name_id is None:
+                name_id = name_ids[name] = len(name_ids)
+                self.occurrences.append(0)
+            self.occurrences[name_id] += 1
+            self.pending.append((name_id, kind, path, class_name))
+        if len(self.pending) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.connection.executemany(
+                "INSERT INTO discovered_locations VALUES (?, ?, ?, ?)", self.pending
+            )
+            self.rows += len(self.pending)
+            self.pending = []
+
+    def close(self):
+        self._flush()
+        names = sorted(self.name_ids, key=lambda name: (len(name), name))
+        self.connection.executemany(
+            "INSERT INTO names VALUES (?, ?, ?, ?)",
+            (
+                (name_id, name, name.lower(), self.occurrences[self.name_ids[name]])
+                for name_id, name in enumerate(names, 1)
+            ),
+        )
+        self.connection.execute(
+            "CREATE TEMP TABLE name_order (discovered INTEGER PRIMARY KEY, id INTEGER)"
+        )
+        self.connection.executemany(
+            "INSERT INTO name_order VALUES (?, ?)",
+            ((self.name_ids[name], name_id) for name_id, name in enumerate(names, 1)),
+        )
+        self.connection.execute(
+            "INSERT INTO locations SELECT name_order.id, kind, path, class "
+            "FROM discovered_locations JOIN name_order USING (discovered) "
+            "ORDER BY discovered_locations.rowid"
+        )
+
+        postings = {}
+        for name_id, name in enumerate(names, 1):
+            for key in name_index_keys(name):
+                ids = postings.get(key)
+                if ids is None:
+                    ids = postings[key] = array("I")
+                ids.append(name_id)
+        self.connection.executemany(
+            "INSERT INTO postings VALUES (?, ?)",
+            ((key, array_bytes(ids)) for key, ids in postings.items()),
+        )
+        for statement in NAME_INDEX_INDEXES.split(";"):
+            if statement.strip():
+                self.connection.execute(statement)
+        self.connection.execute("COMMIT")
+        self.connection.close()
+        logger.info(
+            f"Completed indexing {len(names)} names of {self.rows} "
+            f"symbols in {self.path}"
+        )
+
+
+def create_writers(output_formats, base_output_file: str, output_dir: str) -> List:
+    """
+    Create the structured writers for ``output_formats``.
+
+    Markdown is handled by ``MarkdownWriter`` and skipped here.
+
+    Args:
+        output_formats (iterable): Names from ``OUTPUT_FORMATS``.
+        base_output_file (str): Base name of the output files.
+        output_dir (str): Directory the files are written to.
+
+    Returns:
+        list: OutputWriter instances.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base_path = os.path.join(output_dir, base_output_file)
+    writers = []
+    for output_format in output_formats:
+        if output_format == "jsonl":
+            writers.append(JsonlWriter(f"{base_path}.jsonl"))
+        elif output_format == "columnar":
+            writers.append(ColumnarWriter(base_path))
+        elif output_format == "sqlite":
+            writers.append(SqliteWriter(f"{base_path}.db"))
+        elif output_format == "search":
+            writers.append(SearchIndexWriter(f"{base_path}.search.db"))
+        elif output_format == "names":
+            writers.append(NameIndexWriter(f"{base_path}.names.db"))
+    return writers
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import shutil
+from functools import lru_cache
+from typing import List, Dict, Optional
+from loguru import logger
+import parsers
+
+PARSERS_DIR = os.path.dirname(parsers.__file__)
+
+# Extraction engines accepted by parse_java_file and parse_kotlin_file
+ENGINES = ("antlr", "skeleton", "streaming", "tokens")
+
+
+@lru_cache(maxsize=None)
+def parser_fingerprint(language: str) -> str:
+    """
+    Hash the grammar and listener modules used to parse a language.
+
+    Any edit to a generated lexer/parser or to the listener code yields a new
+    fingerprint, which moves lookups to a fresh cache namespace.
+
+    Args:
+        language (str): Either "java" or "kotlin".
+
+    Returns:
+        str: Short hex digest identifying the parser version.
+    """
+    digest = hashlib.sha256()
+    for directory in (PARSERS_DIR, os.path.join(PARSERS_DIR, language)):
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".py"):
+                continue
+            digest.update(name.encode("utf-8"))
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def content_hash(data: bytes) -> str:
+    """Return the cache key of a source file's raw bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParseCache:
+    """
+    On-disk cache of class_info lists keyed by file content and parser version.
+
+    Entries are stored as
+    ``{cache_dir}/{language}-{engine}-{fingerprint}/{hh}/{hash}.json``, so results
+    of the different extraction engines never mix.
+    Writes go through a temporary file and ``os.replace`` so concurrent pool
+    workers never observe partial entries. Reads bump the entry's mtime, which
+    ``prune`` uses for least-recently-used eviction.
+    """
+
+    def __init__(
+        self, cache_dir: str, max_bytes: int = 2 * 1024**3, engine: str = "antlr"
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.engine = engine
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _namespace(self, language: str, engine: Optional[str] = None) -> str:
+        return f"{language}-{engine or self.engine}-{parser_fingerprint(language)}"
+
+    def _entry_path(self, language: str, key: str) -> str:
+        return os.path.join(
+            self.cache_dir, self._namespace(language), key[:2], f"{key}.json"
+        )
+
+    def get(self, language: str, key: str) -> Optional[List[Dict]]:
+        """Return the cached class_info for a file, or None on a miss."""
+        path = self._entry_path(language, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                class_info = json.load(f)
+            os.utime(path)
+            return class_info
+        except (OSError, ValueError):
+            return None
+
+    def put(self, language: str, key: str, class_info: List[Dict]):
+        """Store the class_info parsed from a file."""
+        path = self._entry_path(language, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(class_info, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def prune(self) -> int:
+        """
+        Drop entries of outdated parser versions and evict least recently used
+        entries until the cache fits in ``max_bytes``.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        # Entries of every engine stay valid, only parser versions expire
+        current = {
+            self._namespace(language, engine)
+            for language in ("java", "kotlin")
+            for engine in ENGINES
+        }
+        removed = 0
+        entries = []
+        for namespace in os.listdir(self.cache_dir):
+            namespace_dir = os.path.join(self.cache_dir, namespace)
+            if not os.path.isdir(namespace_dir):
+                continue
+            if namespace not in current:
+                logger.info(f"Invalidating outdated parse cache {namespace}")
+                shutil.rmtree(namespace_dir, ignore_errors=True)
+                continue
+            for root, _, files in os.walk(namespace_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+
+        logger.info(
+            f"Parse cache holds {len(entries) - removed} entries "
+            f"({total_bytes / 1024**2:.1f} MiB), evicted {removed}"
+        )
+        return removed
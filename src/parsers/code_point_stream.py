@@ -0,0 +1,29 @@
+import sys
+from antlr4 import InputStream
+
+# Encoding whose 4-byte units are the code points in native byte order
+_UTF32_NATIVE = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+
+
+class CodePointStream(InputStream):
+    """
+    InputStream holding the code points of the source in a compact buffer.
+
+    antlr4.InputStream keeps the code points in a list, 8 bytes per
+    character for the pointers alone. Here they are held as bytes when every
+    character is Latin-1, as most source files are, and otherwise as a
+    memoryview of their UTF-32 encoding cast to 4-byte unsigned ints. Both
+    index to the same ints as the list, so lexers read them unchanged.
+    """
+
+    __slots__ = ()
+
+    def _loadString(self):
+        self._index = 0
+        try:
+            self.data = self.strdata.encode("latin-1")
+        except UnicodeEncodeError:
+            # Lone surrogates are kept as their code points, like ord() does
+            encoded = self.strdata.encode(_UTF32_NATIVE, "surrogatepass")
+            self.data = memoryview(encoded).cast("I")
+        self._size = len(self.data)
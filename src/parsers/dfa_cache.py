@@ -0,0 +1,364 @@
+import io
+import marshal
+import os
+from antlr4.PredictionContext import (
+    ArrayPredictionContext,
+    PredictionContext,
+    SingletonPredictionContext,
+)
+from antlr4.atn.ATNConfig import ATNConfig
+from antlr4.atn.ATNConfigSet import ATNConfigSet
+from antlr4.atn.ATNSimulator import ATNSimulator
+from antlr4.atn.SemanticContext import (
+    AND,
+    OR,
+    PrecedencePredicate,
+    Predicate,
+    SemanticContext,
+)
+from antlr4.dfa.DFA import DFA
+from antlr4.dfa.DFAState import DFAState, PredPrediction
+from loguru import logger
+
+DFA_FORMAT_VERSION = 2
+
+# Leads every serialized DFA, so foreign files are rejected before decoding
+_MAGIC = b"ANTLR-DFA\n"
+
+# Edge targets that are not indices into a DFA's state table
+_NO_EDGE = -1
+_ERROR_EDGE = -2
+
+
+def dfa_state_count(parser_class):
+    """Return the number of DFA states cached for all decisions of a parser class."""
+    return sum(len(dfa._states) for dfa in parser_class.decisionsToDFA)
+
+
+def _context_parents(ctx):
+    if isinstance(ctx, ArrayPredictionContext):
+        return ctx.parents
+    return [ctx.parentCtx]
+
+
+class _DFAEncoder:
+    """
+    Flattens DFA states and the prediction-context graph they reference into
+    index-based tables of plain values, so serialization never recurses
+    through the graph and loading never runs code.
+    """
+
+    def __init__(self):
+        self.context_ids = {}
+        self.contexts = []
+        self.semantic_ids = {}
+        self.semantics = []
+
+    def _context_index(self, ctx):
+        if ctx is None:
+            return _NO_EDGE
+        stack = [ctx]
+        while stack:
+            node = stack[-1]
+            if id(node) in self.context_ids:
+                stack.pop()
+                continue
+            pending = [
+                parent
+                for parent in _context_parents(node)
+                if parent is not None and id(parent) not in self.context_ids
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            self.context_ids[id(node)] = len(self.contexts)
+            self.contexts.append(self._encode_context(node))
+        return self.context_ids[id(ctx)]
+
+    def _encode_context(self, ctx):
+        if ctx is PredictionContext.EMPTY:
+            return ("$",)
+        if isinstance(ctx, ArrayPredictionContext):
+            return (
+                "a",
+                [
+                    self.context_ids[id(p)] if p is not None else _NO_EDGE
+                    for p in ctx.parents
+                ],
+                list(ctx.returnStates),
+            )
+        parent = ctx.parentCtx
+        return (
+            "s",
+            self.context_ids[id(parent)] if parent is not None else _NO_EDGE,
+            ctx.returnState,
+        )
+
+    def _semantic_index(self, semantic):
+        if id(semantic) in self.semantic_ids:
+            return self.semantic_ids[id(semantic)]
+        if semantic is SemanticContext.NONE:
+            entry = ("$",)
+        elif isinstance(semantic, Predicate):
+            entry = (
+                "p",
+                semantic.ruleIndex,
+                semantic.predIndex,
+                semantic.isCtxDependent,
+            )
+        elif isinstance(semantic, PrecedencePredicate):
+            entry = ("r", semantic.precedence)
+        else:
+            # Operands are encoded first, so they always have lower indices
+            kind = "&" if isinstance(semantic, AND) else "|"
+            entry = (kind, [self._semantic_index(o) for o in semantic.opnds])
+        self.semantic_ids[id(semantic)] = len(self.semantics)
+        self.semantics.append(entry)
+        return self.semantic_ids[id(semantic)]
+
+    def _encode_configs(self, configs):
+        return (
+            [
+                (
+                    config.state.stateNumber,
+                    config.alt,
+                    self._context_index(config.context),
+                    self._semantic_index(config.semanticContext),
+                    config.reachesIntoOuterContext,
+                    config.precedenceFilterSuppressed,
+                )
+                for config in configs.configs
+            ],
+            configs.fullCtx,
+            configs.readonly,
+            configs.uniqueAlt,
+            configs.conflictingAlts,
+            configs.hasSemanticContext,
+            configs.dipsIntoOuterContext,
+        )
+
+    def encode_dfa(self, dfa):
+        states = list(dfa._states)
+        if dfa.precedenceDfa:
+            # The precedence start state lives outside the state table
+            states.insert(0, dfa.s0)
+        state_ids = {id(state): index for index, state in enumerate(states)}
+
+        def edge_index(target):
+            if target is None:
+                return _NO_EDGE
+            if target is ATNSimulator.ERROR:
+                return _ERROR_EDGE
+            return state_ids[id(target)]
+
+        encoded = []
+        for state in states:
+            encoded.append(
+                (
+                    state.stateNumber,
+                    self._encode_configs(state.configs),
+                    (
+                        None
+                        if state.edges is None
+                        else [edge_index(t) for t in state.edges]
+                    ),
+                    state.isAcceptState,
+                    state.prediction,
+                    state.requiresFullContext,
+                    (
+                        None
+                        if state.predicates is None
+                        else [
+                            (self._semantic_index(p.pred), p.alt)
+                            for p in state.predicates
+                        ]
+                    ),
+                )
+            )
+        s0 = _NO_EDGE if dfa.s0 is None else state_ids[id(dfa.s0)]
+        return dfa.precedenceDfa, s0, encoded
+
+
+class _DFADecoder:
+    def __init__(self, atn, contexts, semantics, context_cache):
+        self.atn = atn
+        self.semantics = []
+        for entry in semantics:
+            if entry[0] == "$":
+                semantic = SemanticContext.NONE
+            elif entry[0] == "p":
+                semantic = Predicate(entry[1], entry[2], entry[3])
+            elif entry[0] == "r":
+                semantic = PrecedencePredicate(entry[1])
+            else:
+                # The constructors would re-reduce the operands; keep them as is
+                semantic = object.__new__(AND if entry[0] == "&" else OR)
+                semantic.opnds = [self.semantics[i] for i in entry[1]]
+            self.semantics.append(semantic)
+        self.contexts = []
+        for entry in contexts:
+            if entry[0] == "$":
+                ctx = PredictionContext.EMPTY
+            elif entry[0] == "a":
+                ctx = ArrayPredictionContext(
+                    [self.contexts[i] if i != _NO_EDGE else None for i in entry[1]],
+                    entry[2],
+                )
+            else:
+                parent = self.contexts[entry[1]] if entry[1] != _NO_EDGE else None
+                ctx = SingletonPredictionContext(parent, entry[2])
+            self.contexts.append(context_cache.add(ctx))
+
+    def _decode_configs(self, encoded):
+        configs, full_ctx, readonly, unique_alt, conflicting, has_sem, dips = encoded
+        config_set = ATNConfigSet(full_ctx)
+        for state_number, alt, ctx, semantic, reaches, suppressed in configs:
+            config = ATNConfig(
+                self.atn.states[state_number],
+                alt,
+                self.contexts[ctx] if ctx != _NO_EDGE else None,
+                self.semantics[semantic],
+            )
+            config.reachesIntoOuterContext = reaches
+            config.precedenceFilterSuppressed = suppressed
+            config_set.configs.append(config)
+        config_set.uniqueAlt = unique_alt
+        config_set.conflictingAlts = conflicting
+        config_set.hasSemanticContext = has_sem
+        config_set.dipsIntoOuterContext = dips
+        # Only the empty precedence start set is writable, so configLookup can
+        # keep its empty default
+        if readonly:
+            config_set.setReadonly(True)
+        return config_set
+
+    def decode_dfa(self, decision, encoded):
+        precedence_dfa, s0, encoded_states = encoded
+        dfa = DFA(self.atn.decisionToState[decision], decision)
+        states = []
+        for encoded_state in encoded_states:
+            number, configs, _, accept, prediction, full_ctx, predicates = encoded_state
+            state = DFAState(number, self._decode_configs(configs))
+            state.isAcceptState = accept
+            state.prediction = prediction
+            state.requiresFullContext = full_ctx
+            if predicates is not None:
+                state.predicates = [
+                    PredPrediction(self.semantics[pred], alt)
+                    for pred, alt in predicates
+                ]
+            states.append(state)
+
+        for state, encoded_state in zip(states, encoded_states):
+            edges = encoded_state[2]
+            if edges is not None:
+                state.edges = [
+                    (
+                        None
+                        if index == _NO_EDGE
+                        else (
+                            ATNSimulator.ERROR
+                            if index == _ERROR_EDGE
+                            else states[index]
+                        )
+                    )
+                    for index in edges
+                ]
+
+        first_state = 1 if precedence_dfa else 0
+        dfa._states = {state: state for state in states[first_state:]}
+        dfa.s0 = states[s0] if s0 != _NO_EDGE else None
+        return dfa
+
+
+def serialize_dfa(parser_class):
+    """
+    Serialize the adaptive-prediction DFA a parser class has built so far.
+
+    Args:
+        parser_class (type): Generated parser class, e.g. JavaParser.
+
+    Returns:
+        bytes: Data accepted by ``load_dfa`` for the same grammar.
+    """
+    encoder = _DFAEncoder()
+    dfas = [encoder.encode_dfa(dfa) for dfa in parser_class.decisionsToDFA]
+    return b"".join(
+        [
+            _MAGIC,
+            marshal.dumps(_dfa_header(parser_class)),
+            marshal.dumps((encoder.contexts, encoder.semantics, dfas)),
+        ]
+    )
+
+
+def _dfa_header(parser_class):
+    return (
+        DFA_FORMAT_VERSION,
+        parser_class.grammarFileName,
+        len(parser_class.atn.states),
+        len(parser_class.decisionsToDFA),
+    )
+
+
+def load_dfa(parser_class, data):
+    """
+    Replace the DFA cache of a parser class with serialized states.
+
+    The class-level ``decisionsToDFA`` list is updated in place, so every parser
+    created afterwards starts from the loaded states. The data holds only plain
+    marshal values, and its header is checked before the tables are decoded.
+
+    Args:
+        parser_class (type): Generated parser class, e.g. JavaParser.
+        data (bytes): Output of ``serialize_dfa`` for the same grammar.
+
+    Returns:
+        bool: True if the data matched the grammar and was loaded.
+    """
+    if not data.startswith(_MAGIC):
+        return False
+    stream = io.BytesIO(data)
+    stream.seek(len(_MAGIC))
+    if marshal.load(stream) != _dfa_header(parser_class):
+        return False
+    contexts, semantics, dfas = marshal.load(stream)
+
+    decoder = _DFADecoder(
+        parser_class.atn, contexts, semantics, parser_class.sharedContextCache
+    )
+    for decision, encoded in enumerate(dfas):
+        parser_class.decisionsToDFA[decision] = decoder.decode_dfa(decision, encoded)
+    return True
+
+
+def save_dfa_file(parser_class, path):
+    """Write the DFA of a parser class to ``path`` atomically."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(serialize_dfa(parser_class))
+    os.replace(tmp_path, path)
+    logger.info(f"Saved {dfa_state_count(parser_class)} DFA states to {path}")
+
+
+def load_dfa_file(parser_class, path):
+    """
+    Load a DFA written by ``save_dfa_file``.
+
+    Returns:
+        bool: True if the file existed and matched the grammar.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return False
+    try:
+        loaded = load_dfa(parser_class, data)
+    except (EOFError, IndexError, TypeError, ValueError) as e:
+        logger.error(f"Error loading DFA from {path}: {e}")
+        return False
+    if loaded:
+        logger.debug(f"Loaded {dfa_state_count(parser_class)} DFA states from {path}")
+    return loaded
@@ -1,10 +1,35 @@
-from antlr4 import InputStream, ParseTreeListener, CommonTokenStream, ParseTreeWalker
-from antlr4.error.DiagnosticErrorListener import DiagnosticErrorListener
+from bisect import bisect_left
+from antlr4 import ParseTreeListener, CommonTokenStream
 from antlr4.Token import Token
 from loguru import logger
+from ..code_point_stream import CodePointStream
+from ..parse_stats import record_parse_stat
+from ..pruned_walker import PrunedTreeWalker
+from ..skeleton import collapse_bodies, skeleton_stream
+from ..two_stage import listen_two_stage, parse_two_stage
 from .JavaLexer import JavaLexer
 from .JavaParser import JavaParser
 
+# Every declaration JavaListener extracts starts with one of these keywords
+DECLARATION_TOKENS = {JavaLexer.CLASS, JavaLexer.INTERFACE, JavaLexer.ENUM}
+
+LOCAL_TYPE_TOKENS = DECLARATION_TOKENS | {JavaLexer.RECORD}
+
+# Statements whose parenthesized header is followed by a block
+CONTROL_KEYWORDS = {
+    JavaLexer.IF,
+    JavaLexer.WHILE,
+    JavaLexer.FOR,
+    JavaLexer.SWITCH,
+    JavaLexer.CATCH,
+    JavaLexer.SYNCHRONIZED,
+    JavaLexer.TRY,
+}
+
+# What the braces found by body_braces open: members or statements
+CLASS_BODY_KINDS = ("type", "enum", "anonymous")
+CODE_KINDS = ("body", "code")
+
 
 def setup_java_parser():
     """
@@ -16,6 +41,155 @@ def setup_java_parser():
     return None
 
 
+def needs_full_parse(tokens):
+    """
+    Lexer pre-scan deciding whether a file can produce any class information.
+
+    Files without class, interface or enum keywords (package-info.java,
+    module-info.java, empty stubs) always yield an empty result, so the
+    parser does not need to run on them.
+
+    Args:
+        tokens (list): All tokens of the file.
+
+    Returns:
+        bool: True if the file must be parsed.
+    """
+    return any(token.type in DECLARATION_TOKENS for token in tokens)
+
+
+def declaration_positions(tokens):
+    """
+    Find the tokens that may start a declaration inside code.
+
+    Inside blocks and expressions JavaListener only records local types and
+    the methods of anonymous classes. They are found by the type keyword and
+    by a brace after a closing parenthesis, which starts an anonymous class
+    body unless the parentheses belong to a control statement header.
+
+    Args:
+        tokens (list): All tokens of the file.
+
+    Returns:
+        list: Ascending token indexes.
+    """
+    positions = []
+    # Type of the token before each open parenthesis
+    openers = []
+    last_opener = None
+    previous_type = None
+    for token in tokens:
+        if token.channel != Token.DEFAULT_CHANNEL:
+            continue
+        token_type = token.type
+        if token_type in LOCAL_TYPE_TOKENS:
+            positions.append(token.tokenIndex)
+        elif token_type == JavaLexer.LPAREN:
+            openers.append(previous_type)
+        elif token_type == JavaLexer.RPAREN:
+            last_opener = openers.pop() if openers else None
+        elif (
+            token_type == JavaLexer.LBRACE
+            and previous_type == JavaLexer.RPAREN
+            and last_opener not in CONTROL_KEYWORDS
+        ):
+            positions.append(token.tokenIndex)
+        previous_type = token_type
+    return positions
+
+
+def prunable_subtrees(tokens):
+    """
+    Tell PrunedTreeWalker which code subtrees it may skip.
+
+    Args:
+        tokens (list): All tokens of the file.
+
+    Returns:
+        dict: Positions keeping blocks and expressions walked, by rule index.
+    """
+    positions = declaration_positions(tokens)
+    return {JavaParser.RULE_block: positions, JavaParser.RULE_expression: positions}
+
+
+def body_braces(tokens):
+    """
+    Find the braces of method bodies and of the code blocks within them.
+
+    A brace at the top level of a class body opens a method, constructor or
+    initializer body unless the member before it declares a type or
+    initializes a field, or it opens the body of an enum constant. Inside
+    bodies every other brace opens a block, lambda, switch or array
+    initializer, except for the bodies of local and anonymous classes,
+    whose members are read like those of any class. Braces are matched
+    while reading, and the state of the member being read is saved with
+    each open brace.
+
+    Args:
+        tokens (list): All tokens of the file.
+
+    Returns:
+        list: (open, close) token indexes of each body and code block.
+    """
+    code = [token for token in tokens if token.channel == Token.DEFAULT_CHANNEL]
+    # Anonymous class bodies are among the positions of declarations in code
+    positions = set(declaration_positions(tokens))
+    bodies = []
+    # Per open brace: its token index, what the enclosing braces open, and
+    # the state of the member being read in them
+    braces = []
+    kind = "other"
+    declaring = None
+    initializer = False
+    depth = 0
+    previous_type = None
+    for position, token in enumerate(code):
+        token_type = token.type
+        if token_type in LOCAL_TYPE_TOKENS and previous_type != JavaLexer.DOT:
+            following = code[position + 1] if position + 1 < len(code) else None
+            if following is not None and following.type == JavaLexer.IDENTIFIER:
+                declaring = token_type
+        elif token_type == JavaLexer.LPAREN:
+            depth += 1
+        elif token_type == JavaLexer.RPAREN:
+            depth -= 1
+        elif token_type in (JavaLexer.ASSIGN, JavaLexer.NEW) and depth == 0:
+            initializer = True
+        elif token_type == JavaLexer.SEMI and depth == 0:
+            declaring = None
+            initializer = False
+            if kind == "enum":
+                kind = "type"
+        elif token_type == JavaLexer.LBRACE:
+            braces.append((token.tokenIndex, kind, declaring, initializer, depth))
+            if declaring is not None:
+                kind = "enum" if declaring == JavaLexer.ENUM else "type"
+            elif kind in CLASS_BODY_KINDS and not depth and not initializer:
+                # Enum constants have class bodies, other members code
+                kind = "anonymous" if kind == "enum" else "body"
+            elif token.tokenIndex in positions:
+                kind = "anonymous"
+            elif kind in CODE_KINDS:
+                kind = "code"
+            else:
+                # Array initializers of fields and annotations
+                kind = "other"
+            declaring = None
+            initializer = False
+            depth = 0
+        elif token_type == JavaLexer.RBRACE and braces:
+            start, outer, declaring, initializer, depth = braces.pop()
+            if kind in CODE_KINDS:
+                bodies.append((start, token.tokenIndex))
+            if kind in ("type", "enum", "body"):
+                # A member of the enclosing class body ends here
+                declaring = None
+                initializer = False
+            kind = outer
+        previous_type = token_type
+    return bodies
+
+
 class JavaListener(ParseTreeListener):
     def __init__(self, source, comments):
         self.source = source
@@ -24,7 +198,10 @@ class JavaListener(ParseTreeListener):
         self.current_class = None
         self.nesting_level = 0
         self.comments = comments
+        self.comment_lines = [line for _, line in comments]
         self.last_processed_line = -1
+        # Method names per class record, keyed by id(), for O(1) deduplication
+        self.method_names = {}
         logger.debug("Initialized JavaListener")
 
     def _clean_comment(self, comment):
@@ -47,12 +224,14 @@ class JavaListener(ParseTreeListener):
 
     def _create_class_info(self, identifier, line):
         """Create a new class info dictionary with default values."""
-        return {
+        class_info = {
             "name": identifier,
             "constants": [],
             "methods": [],
             "comment": self.find_nearest_comment(line),
         }
+        self.method_names[id(class_info)] = set()
+        return class_info
 
     def _handle_class_stack(self):
         """Handle class stack operations when entering a new class context."""
@@ -62,10 +241,11 @@ class JavaListener(ParseTreeListener):
     def find_nearest_comment(self, target_line):
         """Find and return the nearest comment before the target line."""
         nearest_comment = None
-        for comment, line in reversed(self.comments):
-            if self.last_processed_line < line < target_line:
-                nearest_comment = self._clean_comment(comment)
-                break
+        # Comments are in source order, so the last one above the target line
+        # is found by bisection
+        index = bisect_left(self.comment_lines, target_line) - 1
+        if index >= 0 and self.comment_lines[index] > self.last_processed_line:
+            nearest_comment = self._clean_comment(self.comments[index][0])
         self.last_processed_line = target_line
         return nearest_comment or "No Comment"
 
@@ -82,12 +262,17 @@ class JavaListener(ParseTreeListener):
 
     def _handle_declaration_entry(self, ctx, declaration_type="class"):
         """Handle entry of class-like declarations (class, enum, interface)."""
+        self._enter_declaration(
+            self._find_identifier(ctx), ctx.start.line, declaration_type
+        )
+
+    def _enter_declaration(self, identifier, line, declaration_type="class"):
+        """Open a class-like declaration found at ``line``."""
         self.nesting_level += 1
-        identifier = self._find_identifier(ctx)
 
         if identifier:
             self._handle_class_stack()
-            self.current_class = self._create_class_info(identifier, ctx.start.line)
+            self.current_class = self._create_class_info(identifier, line)
 
             # Only add top-level declarations to class_info immediately
             if self.nesting_level == 1:
@@ -143,22 +328,29 @@ class JavaListener(ParseTreeListener):
         identifier = self._find_identifier(ctx, excluded_keywords)
 
         if identifier:
-            # Check if method already exists
-            if not any(
-                method["name"] == identifier for method in self.current_class["methods"]
-            ):
-                self.current_class["methods"].append(
-                    {
-                        "name": identifier,
-                        "comment": self.find_nearest_comment(ctx.start.line),
-                    }
-                )
-                logger.debug(
-                    f"Added {method_type} '{identifier}' to {self.current_class['name']}"
-                )
+            self._add_method(identifier, ctx.start.line, method_type)
         else:
             logger.debug(f"No {method_type} identifier found")
 
+    def _add_method(self, identifier, line, method_type="method"):
+        """Add a method found at ``line`` to the current class unless already present."""
+        if not self.current_class:
+            return
+
+        # Check if method already exists
+        method_names = self.method_names[id(self.current_class)]
+        if identifier not in method_names:
+            method_names.add(identifier)
+            self.current_class["methods"].append(
+                {
+                    "name": identifier,
+                    "comment": self.find_nearest_comment(line),
+                }
+            )
+            logger.debug(
+                f"Added {method_type} '{identifier}' to {self.current_class['name']}"
+            )
+
     def enterMethodDeclaration(self, ctx):
         excluded_keywords = [
             "public",
@@ -210,28 +402,118 @@ class JavaListener(ParseTreeListener):
         self._handle_method_declaration(ctx, "interface method", excluded_keywords)
 
 
-def parse_java_file(content, parser=None):
+class JavaParseListener(JavaListener):
+    """
+    JavaListener notified by the parser while it runs, without a parse tree.
+
+    Without a tree the parser does not attach rule contexts to their parents,
+    so the identifier of a declaration is not among its children when the
+    declaration is entered. Each declaration is opened once its identifier
+    has been parsed instead, which happens before any nested declaration.
+    """
+
+    # Children of a declaration that may come before its identifier
+    NAME_PRECEDING = (
+        JavaParser.TypeTypeOrVoidContext,
+        JavaParser.AnnotationContext,
+        JavaParser.IdentifierContext,
+        JavaParser.TypeIdentifierContext,
+    )
+
+    def __init__(self, source, comments):
+        super().__init__(source, comments)
+        # Declaration waiting for its identifier: (context, excluded keywords,
+        # callback taking the identifier)
+        self.pending = None
+
+    def _await_identifier(self, ctx, on_identifier, excluded_keywords=None):
+        """Call ``on_identifier`` once the identifier of ``ctx`` is parsed."""
+        self._resolve_pending(None)
+        self.pending = (ctx, excluded_keywords, on_identifier)
+
+    def _resolve_pending(self, identifier):
+        if self.pending is not None:
+            on_identifier = self.pending[2]
+            self.pending = None
+            on_identifier(identifier)
+
+    def enterEveryRule(self, ctx):
+        # A declaration has no identifier if its parameters or body come first
+        if (
+            self.pending is not None
+            and ctx.parentCtx is self.pending[0]
+            and not isinstance(ctx, self.NAME_PRECEDING)
+        ):
+            self._resolve_pending(None)
+
+    def exitEveryRule(self, ctx):
+        if self.pending is not None and ctx is self.pending[0]:
+            self._resolve_pending(None)
+
+    def exitIdentifier(self, ctx):
+        self._identifier_parsed(ctx)
+
+    def exitTypeIdentifier(self, ctx):
+        self._identifier_parsed(ctx)
+
+    def _identifier_parsed(self, ctx):
+        if self.pending is not None and ctx.parentCtx is self.pending[0]:
+            text = ctx.getText()
+            if self._is_valid_identifier(text, self.pending[1]):
+                self._resolve_pending(text)
+
+    def _handle_declaration_entry(self, ctx, declaration_type="class"):
+        line = ctx.start.line
+        self._await_identifier(
+            ctx,
+            lambda identifier: self._enter_declaration(
+                identifier, line, declaration_type
+            ),
+        )
+
+    def _handle_declaration_exit(self):
+        # A declaration without identifier is only opened when it ends
+        self._resolve_pending(None)
+        super()._handle_declaration_exit()
+
+    def _handle_method_declaration(
+        self, ctx, method_type="method", excluded_keywords=None
+    ):
+        if not self.current_class:
+            return
+
+        line = ctx.start.line
+
+        def add_method(identifier):
+            if identifier:
+                self._add_method(identifier, line, method_type)
+            else:
+                logger.debug(f"No {method_type} identifier found")
+
+        self._await_identifier(ctx, add_method, excluded_keywords)
+
+
+def parse_java_file(content, parser=None, engine="antlr"):
     """
     Parse Java source code and extract class information using ANTLR4.
 
     Args:
         content (str): The content of the Java source file.
         parser (None): Not used in ANTLR4 implementation.
+        engine (str): "antlr" walks a full parse tree, "skeleton" one of
+            the file with method bodies left empty, "streaming" extracts
+            declarations while parsing without building a tree, and "tokens"
+            extracts them from the token stream without running the parser.
 
     Returns:
         list: A list of dictionaries containing class information.
     """
     try:
         # Create the lexer and stream
-        input_stream = InputStream(content)
+        input_stream = CodePointStream(content)
         lexer = JavaLexer(input_stream)
         stream = CommonTokenStream(lexer)
 
-        # Create the parser with diagnostic logging
-        parser = JavaParser(stream)
-        parser.removeErrorListeners()  # Remove default error listeners
-        parser.addErrorListener(DiagnosticErrorListener())  # Add diagnostic listener
-
         # Extract comments
         stream.fill()
         comments = [
@@ -241,13 +523,47 @@ def parse_java_file(content, parser=None):
             and token.type in [JavaLexer.COMMENT, JavaLexer.LINE_COMMENT]
         ]
 
-        # Parse the compilation unit
-        tree = parser.compilationUnit()
+        if not needs_full_parse(stream.tokens):
+            record_parse_stat("java.prescan_skipped")
+            return []
+
+        if engine == "tokens":
+            from .token_extractor import extract_java_declarations
+
+            record_parse_stat("java.token_engine")
+            return extract_java_declarations(stream.tokens, comments)
+
+        if engine == "skeleton":
+            # Parse the declarations only, without the method bodies
+            tokens, collapsed = collapse_bodies(
+                stream.tokens,
+                body_braces(stream.tokens),
+                declaration_positions(stream.tokens),
+            )
+            stream = skeleton_stream(tokens)
+            record_parse_stat("java.bodies_collapsed", collapsed)
+
+        # Create the parser
+        parser = JavaParser(stream)
+
+        if engine == "streaming":
+            listener = listen_two_stage(
+                parser,
+                "compilationUnit",
+                "java",
+                lambda: JavaParseListener(content, comments),
+            )
+            return listener.class_info
+
+        # Parse the compilation unit, SLL first and full LL only if that fails
+        tree = parse_two_stage(parser, "compilationUnit", "java")
 
-        # Create and run the listener
+        # Create and run the listener, skipping code without declarations
         listener = JavaListener(content, comments)
-        walker = ParseTreeWalker()
+        walker = PrunedTreeWalker(prunable_subtrees(stream.tokens))
         walker.walk(listener, tree)
+        record_parse_stat("java.nodes_walked", walker.visited)
+        record_parse_stat("java.subtrees_pruned", walker.pruned)
 
         return listener.class_info
     except Exception as e:
@@ -1,6 +1,10 @@
+import pickle
 import pytest
 from pathlib import Path
+from src.parsers.dfa_cache import dfa_state_count, load_dfa, serialize_dfa
+from src.parsers.java.JavaParser import JavaParser
 from src.parsers.java.java_parser import parse_java_file
+from src.parsers.parse_stats import reset_parse_stats, snapshot_parse_stats
 
 
 @pytest.fixture
@@ -119,3 +123,179 @@ def test_parse_java_annotations(java_anno_test_file):
     assert any(method["name"] == "f" for method in annos_class["methods"]), (
         "Expected 'f' method in Annos class"
     )
+
+
+def test_parse_java_prediction_mode_stats(java_test_file, java_anno_test_file):
+    reset_parse_stats()
+    parse_java_file(java_anno_test_file)
+    stats = snapshot_parse_stats()
+    assert stats["java.sll"] == 1 and not stats["java.ll_fallback"], (
+        "Annos.java should parse in SLL mode without fallback"
+    )
+
+    # AllInOne8.java contains syntax the grammar rejects, so SLL bails out
+    reset_parse_stats()
+    result = parse_java_file(java_test_file)
+    stats = snapshot_parse_stats()
+    assert stats["java.ll_fallback"] == 1 and not stats["java.sll"], (
+        "AllInOne8.java should be re-parsed in LL mode"
+    )
+    assert any(cls["name"] == "Lambdas" for cls in result), (
+        "LL fallback should still extract classes"
+    )
+
+
+def test_java_dfa_serialization_roundtrip(java_test_file, java_anno_test_file):
+    expected = [parse_java_file(java_test_file), parse_java_file(java_anno_test_file)]
+    state_count = dfa_state_count(JavaParser)
+    assert state_count > 0, "Parsing should populate the DFA"
+
+    assert load_dfa(JavaParser, serialize_dfa(JavaParser)), "DFA should load back"
+    assert dfa_state_count(JavaParser) == state_count
+
+    # Parsing with the loaded DFA must not change results or grow the DFA
+    reset_parse_stats()
+    actual = [parse_java_file(java_test_file), parse_java_file(java_anno_test_file)]
+    assert actual == expected
+    assert not snapshot_parse_stats()["java.dfa_states_added"]
+
+
+def test_java_dfa_rejects_foreign_data(java_test_file):
+    parse_java_file(java_test_file)
+    data = serialize_dfa(JavaParser)
+    state_count = dfa_state_count(JavaParser)
+
+    # Pickles and caches of another grammar are rejected before decoding
+    assert not load_dfa(JavaParser, pickle.dumps({"version": 1}))
+    assert not load_dfa(JavaParser, data.replace(b"Java", b"Kotl", 1))
+    assert dfa_state_count(JavaParser) == state_count
+
+
+def test_parse_java_prescan_skips_files_without_declarations():
+    package_info = (
+        "/** Package documentation */\n"
+        "@ParametersAreNonnullByDefault\n"
+        "package com.intellij.ide;\n\n"
+        "import javax.annotation.ParametersAreNonnullByDefault;\n"
+    )
+    reset_parse_stats()
+    assert parse_java_file(package_info) == []
+    stats = snapshot_parse_stats()
+    assert stats["java.prescan_skipped"] == 1, "package-info should skip the parser"
+    assert not stats["java.sll"] and not stats["java.ll_fallback"]
+
+
+@pytest.mark.parametrize(
+    "test_file",
+    sorted((Path(__file__).parent / "test_data").glob("*.java")),
+    ids=lambda path: path.name,
+)
+def test_token_engine_matches_antlr(test_file):
+    content = test_file.read_text(encoding="utf-8")
+
+    assert parse_java_file(content, engine="tokens") == parse_java_file(content)
+
+
+def test_pruned_walk_keeps_declarations_in_bodies():
+    content = (
+        "class Outer {\n"
+        "    Runnable field = new Runnable() { public void run() {} };\n"
+        "    void work(int n) {\n"
+        "        for (int i = 0; i < n; i++) { n += i; }\n"
+        "        class Local { void local() {} }\n"
+        "        if (n > 0) { new Thread(new Runnable() { public void go() {} }); }\n"
+        "    }\n"
+        "}\n"
+    )
+    reset_parse_stats()
+    result = parse_java_file(content)
+    stats = snapshot_parse_stats()
+
+    assert [c["name"] for c in result] == ["Outer", "Local"]
+    assert [m["name"] for m in result[0]["methods"]] == ["run", "work", "go"]
+    assert [m["name"] for m in result[1]["methods"]] == ["local"]
+    assert stats["java.subtrees_pruned"] > 0, "The loop should not be walked"
+    assert stats["java.nodes_walked"] > 0
+
+
+@pytest.mark.parametrize(
+    "test_file",
+    sorted((Path(__file__).parent / "test_data").glob("*.java")),
+    ids=lambda path: path.name,
+)
+def test_skeleton_engine_matches_antlr(test_file):
+    content = test_file.read_text(encoding="utf-8")
+
+    assert parse_java_file(content, engine="skeleton") == parse_java_file(content)
+
+
+def test_skeleton_engine_keeps_declarations_in_bodies():
+    content = (
+        "enum Mode {\n"
+        "    FAST { int speed() { return 2; } },\n"
+        "    SLOW;\n"
+        "    int speed() { return 1; }\n"
+        "}\n"
+        "class Outer {\n"
+        '    static { System.loadLibrary("outer"); }\n'
+        "    int[] sizes = {1, 2};\n"
+        "    void work(int n) throws Exception {\n"
+        "        for (int i = 0; i < n; i++) { n += i; }\n"
+        "        class Local { void local() { n++; } }\n"
+        "        if (n > 0) { new Thread(new Runnable() { public void go() {} }); }\n"
+        "    }\n"
+        "}\n"
+    )
+    reset_parse_stats()
+    result = parse_java_file(content, engine="skeleton")
+    stats = snapshot_parse_stats()
+
+    assert result == parse_java_file(content)
+    assert [c["name"] for c in result] == ["Mode", "Outer", "Local"]
+    assert [m["name"] for m in result[1]["methods"]] == ["work", "go"]
+    assert stats["java.bodies_collapsed"] >= 5, "Bodies should not be parsed"
+
+
+@pytest.mark.parametrize(
+    "test_file",
+    sorted((Path(__file__).parent / "test_data").glob("*.java")),
+    ids=lambda path: path.name,
+)
+def test_streaming_engine_matches_antlr(test_file):
+    content = test_file.read_text(encoding="utf-8")
+
+    assert parse_java_file(content, engine="streaming") == parse_java_file(content)
+
+
+def test_streaming_engine_reads_names_after_modifiers_and_types():
+    content = (
+        '@Entity(name = "x")\n'
+        "public final class Repo<T extends Comparable<T>> {\n"
+        "    /** Finds the largest */\n"
+        '    @SuppressWarnings("unchecked")\n'
+        "    public static <R extends T> java.util.List<R> largest(R[] items) {\n"
+        "        return null;\n"
+        "    }\n"
+        "    private @interface Marker {}\n"
+        "    enum Kind { A, B }\n"
+        "}\n"
+    )
+    result = parse_java_file(content, engine="streaming")
+
+    assert result == parse_java_file(content)
+    assert [m["name"] for m in result[0]["methods"]] == ["largest"]
+
+
+def test_parse_java_source_beyond_latin1():
+    content = (
+        "/** Größe → 📦 */\n"
+        "class Kiste {\n"
+        '    String label = "📦 ✓";\n'
+        "    int größe() { return 1; }\n"
+        "}\n"
+    )
+    result = parse_java_file(content)
+
+    assert [c["name"] for c in result] == ["Kiste"]
+    assert "📦" in result[0]["comment"]
+    assert [m["name"] for m in result[0]["methods"]] == ["größe"]
@@ -0,0 +1,343 @@
+from antlr4.Token import Token
+from .JavaLexer import JavaLexer
+from .java_parser import JavaListener
+
+L = JavaLexer
+
+IDENTIFIER_TOKENS = {
+    L.IDENTIFIER,
+    L.MODULE,
+    L.OPEN,
+    L.REQUIRES,
+    L.EXPORTS,
+    L.OPENS,
+    L.TO,
+    L.USES,
+    L.PROVIDES,
+    L.WITH,
+    L.TRANSITIVE,
+    L.VAR,
+    L.YIELD,
+    L.RECORD,
+    L.SEALED,
+    L.PERMITS,
+}
+
+MODIFIER_TOKENS = {
+    L.PUBLIC,
+    L.PROTECTED,
+    L.PRIVATE,
+    L.STATIC,
+    L.ABSTRACT,
+    L.FINAL,
+    L.STRICTFP,
+    L.SEALED,
+    L.NON_SEALED,
+    L.NATIVE,
+    L.SYNCHRONIZED,
+    L.TRANSIENT,
+    L.VOLATILE,
+    L.DEFAULT,
+}
+
+DECLARATION_KEYWORDS = {L.CLASS: "class", L.INTERFACE: "interface", L.ENUM: "enum"}
+
+
+class _Frame:
+    """A brace-delimited scope of the token walk."""
+
+    __slots__ = (
+        "members",
+        "is_class",
+        "annotation",
+        "depth",
+        "header",
+        "expression",
+        "enum_constants",
+        "pending_type",
+    )
+
+    def __init__(self, members, depth, is_class=False, annotation=False, enum=False):
+        # Member scopes (class bodies) hold declarations, other scopes hold code
+        self.members = members
+        self.is_class = is_class
+        self.annotation = annotation
+        self.depth = depth
+        self.header = []
+        self.expression = False
+        self.enum_constants = enum
+        # Local type declaration waiting for its body: (kind, paren depth)
+        self.pending_type = None
+
+
+class JavaTokenExtractor(JavaListener):
+    """
+    Extract class information from the token stream alone.
+
+    Declarations are recognized with brace-depth tracking and keyword
+    patterns instead of a parse tree. Records are built through the same
+    JavaListener methods the ANTLR walk uses, so the output has the same
+    shape and comment attribution, at a fraction of the cost. Method bodies
+    are only scanned for local, anonymous and lambda-nested classes.
+    """
+
+    def extract(self, tokens):
+        """
+        Run the extraction.
+
+        Args:
+            tokens (list): All tokens of the file, including hidden ones.
+
+        Returns:
+            list: Class information in the same shape as the ANTLR engine.
+        """
+        self.tokens = [
+            token
+            for token in tokens
+            if token.channel == Token.DEFAULT_CHANNEL and token.type != Token.EOF
+        ]
+        self.frames = [_Frame(members=True, depth=0)]
+        # One entry per open parenthesis: True if it starts `new Type(...)`
+        self.parens = []
+        self.last_closed_new = False
+
+        for index, token in enumerate(self.tokens):
+            token_type = token.type
+            if token_type == L.LBRACE:
+                self._open_brace(index)
+            elif token_type == L.RBRACE:
+                self._close_brace()
+            else:
+                if token_type == L.LPAREN:
+                    self.parens.append(self._starts_class_creation(index))
+                elif token_type == L.RPAREN:
+                    self.last_closed_new = self.parens.pop() if self.parens else False
+
+                frame = self.frames[-1]
+                if frame.members:
+                    self._member_token(frame, token)
+                else:
+                    self._code_token(frame, index)
+
+        return self.class_info
+
+    def _token(self, index):
+        if 0 <= index < len(self.tokens):
+            return self.tokens[index]
+        return None
+
+    def _starts_class_creation(self, index):
+        """Check whether the parenthesis at ``index`` follows ``new Type``."""
+        k = index - 1
+        token = self._token(k)
+        if token is not None and token.type == L.GT:
+            depth = 0
+            while token is not None:
+                if token.type == L.GT:
+                    depth += 1
+                elif token.type == L.LT:
+                    depth -= 1
+                    if depth == 0:
+                        break
+                k -= 1
+                token = self._token(k)
+            k -= 1
+            token = self._token(k)
+        if token is None or token.type not in IDENTIFIER_TOKENS:
+            return False
+        while True:
+            dot, name = self._token(k - 1), self._token(k - 2)
+            if dot is None or dot.type != L.DOT or name is None:
+                break
+            if name.type not in IDENTIFIER_TOKENS:
+                break
+            k -= 2
+        previous = self._token(k - 1)
+        return previous is not None and previous.type == L.NEW
+
+    def _at_frame_depth(self, frame):
+        return len(self.parens) == frame.depth
+
+    def _push(self, members, **kwargs):
+        self.frames.append(_Frame(members, len(self.parens), **kwargs))
+
+    def _open_brace(self, index):
+        frame = self.frames[-1]
+        previous = self._token(index - 1)
+        creates_class = (
+            previous is not None and previous.type == L.RPAREN and self.last_closed_new
+        )
+
+        if frame.members and self._at_frame_depth(frame) and not frame.expression:
+            if frame.enum_constants:
+                # Enum constant body, its methods belong to the enum
+                self._push(members=True)
+                return
+            header, frame.header = frame.header, []
+            self._open_member_body(frame, header)
+            return
+
+        if creates_class:
+            # Anonymous class body, its methods belong to the enclosing class
+            self._push(members=True)
+        elif frame.pending_type and frame.pending_type[1] == len(self.parens):
+            kind = frame.pending_type[0]
+            frame.pending_type = None
+            self._push(members=True, is_class=kind != "record")
+        else:
+            self._push(members=False)
+
+    def _close_brace(self):
+        frame = self.frames.pop()
+        if frame.is_class:
+            self._handle_declaration_exit()
+        if not self.frames:
+            self.frames.append(_Frame(members=True, depth=0))
+
+    def _member_token(self, frame, token):
+        if not self._at_frame_depth(frame):
+            if not frame.expression and not frame.enum_constants:
+                frame.header.append(token)
+            return
+
+        token_type = token.type
+        if token_type == L.SEMI:
+            if not frame.expression and not frame.enum_constants:
+                self._close_member(frame, frame.header)
+            frame.header = []
+            frame.expression = False
+            frame.enum_constants = False
+        elif frame.expression or frame.enum_constants:
+            return
+        elif token_type == L.ASSIGN:
+            # Field initializer, only scanned for anonymous classes
+            frame.header = []
+            frame.expression = True
+        else:
+            frame.header.append(token)
+
+    def _code_token(self, frame, index):
+        token = self.tokens[index]
+        token_type = token.type
+        if token_type in DECLARATION_KEYWORDS or token_type == L.RECORD:
+            previous = self._token(index - 1)
+            name = self._token(index + 1)
+            if previous is not None and previous.type == L.DOT:
+                return
+            if name is None or name.type not in IDENTIFIER_TOKENS:
+                return
+            if token_type == L.RECORD:
+                after = self._token(index + 2)
+                if after is None or after.type not in (L.LPAREN, L.LT):
+                    return
+                frame.pending_type = ("record", len(self.parens))
+                return
+            # Local class or interface declared inside a block
+            kind = DECLARATION_KEYWORDS[token_type]
+            self._enter_declaration(name.text, token.line, kind)
+            frame.pending_type = (kind, len(self.parens))
+
+    def _skip_modifiers(self, header):
+        """Return the index of the first header token after modifiers and annotations."""
+        i = 0
+        while i < len(header):
+            token = header[i]
+            if token.type in MODIFIER_TOKENS:
+                i += 1
+            elif token.type == L.AT and not (
+                i + 1 < len(header) and header[i + 1].type == L.INTERFACE
+            ):
+                i += 2
+                while (
+                    i + 1 < len(header)
+                    and header[i].type == L.DOT
+                    and header[i + 1].type in IDENTIFIER_TOKENS
+                ):
+                    i += 2
+                if i < len(header) and header[i].type == L.LPAREN:
+                    i = self._skip_balanced(header, i, L.LPAREN, L.RPAREN)
+            else:
+                break
+        return i
+
+    def _skip_balanced(self, header, i, open_type, close_type):
+        depth = 0
+        while i < len(header):
+            if header[i].type == open_type:
+                depth += 1
+            elif header[i].type == close_type:
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return i
+
+    def _classify_header(self, header):
+        """
+        Classify a member declaration header.
+
+        Returns:
+            tuple: (kind, name, line) where kind is one of "class", "interface",
+            "enum", "annotation", "record", "method" or None.
+        """
+        i = self._skip_modifiers(header)
+        if i >= len(header):
+            return None, None, None
+
+        token = header[i]
+        if token.type == L.AT:
+            return "annotation", None, None
+        if token.type in DECLARATION_KEYWORDS:
+            name = header[i + 1].text if i + 1 < len(header) else None
+            return DECLARATION_KEYWORDS[token.type], name, token.line
+        if (
+            token.type == L.RECORD
+            and i + 2 < len(header)
+            and header[i + 1].type in IDENTIFIER_TOKENS
+            and header[i + 2].type in (L.LPAREN, L.LT)
+        ):
+            return "record", None, None
+
+        if token.type == L.LT:
+            i = self._skip_balanced(header, i, L.LT, L.GT)
+        start = i
+        for k in range(start, len(header)):
+            if header[k].type == L.LPAREN:
+                name = header[k - 1] if k > start else None
+                if name is not None and name.type in IDENTIFIER_TOKENS:
+                    kind = "constructor" if k - 1 == start else "method"
+                    return kind, name.text, header[start].line
+                break
+        return None, None, None
+
+    def _open_member_body(self, frame, header):
+        kind, name, line = self._classify_header(header)
+        if kind in DECLARATION_KEYWORDS.values():
+            self._enter_declaration(name, line, kind)
+            self._push(members=True, is_class=True, enum=kind == "enum")
+        elif kind in ("annotation", "record"):
+            # Bodies of records and annotation types add no class of their own
+            self._push(members=True, annotation=kind == "annotation")
+        else:
+            self._close_member(frame, header, kind, name, line)
+            self._push(members=False)
+
+    def _close_member(self, frame, header, kind=None, name=None, line=None):
+        if kind is None:
+            kind, name, line = self._classify_header(header)
+        if kind in ("method", "constructor") and not frame.annotation:
+            self._add_method(name, line, kind)
+
+
+def extract_java_declarations(tokens, comments):
+    """
+    Extract class information from Java tokens without building a parse tree.
+
+    Args:
+        tokens (list): All tokens of the file, including hidden ones.
+        comments (list): (text, line) pairs of the file's comments.
+
+    Returns:
+        list: A list of dictionaries containing class information.
+    """
+    return JavaTokenExtractor(None, comments).extract(tokens)
@@ -1,10 +1,70 @@
-from antlr4 import InputStream, ParseTreeListener, CommonTokenStream, ParseTreeWalker
-from antlr4.error.DiagnosticErrorListener import DiagnosticErrorListener
+from bisect import bisect_left
+from collections import defaultdict
+from antlr4 import ParseTreeListener, CommonTokenStream
 from antlr4.Token import Token
 from loguru import logger
+from ..code_point_stream import CodePointStream
+from ..parse_stats import record_parse_stat
+from ..pruned_walker import PrunedTreeWalker, token_positions
+from ..skeleton import collapse_bodies, skeleton_stream
+from ..two_stage import listen_two_stage, parse_two_stage
 from .KotlinLexer import KotlinLexer
 from .KotlinParser import KotlinParser
 
+# Every declaration KotlinListener extracts is a class or interface
+DECLARATION_TOKENS = {KotlinLexer.CLASS, KotlinLexer.INTERFACE}
+
+# Tokens starting the declarations KotlinListener records inside blocks:
+# local functions and the members of local classes and object literals
+BLOCK_DECLARATION_TOKENS = {
+    KotlinLexer.FUN,
+    KotlinLexer.CLASS,
+    KotlinLexer.INTERFACE,
+    KotlinLexer.OBJECT,
+}
+
+# Outside blocks, properties declared in lambdas are recorded as well
+EXPRESSION_DECLARATION_TOKENS = BLOCK_DECLARATION_TOKENS | {
+    KotlinLexer.VAL,
+    KotlinLexer.VAR,
+}
+
+# Tokens ending a function header that has no block body
+FUNCTION_HEADER_END_TOKENS = {
+    KotlinLexer.ASSIGNMENT,
+    KotlinLexer.RCURL,
+    KotlinLexer.SEMICOLON,
+    KotlinLexer.FUN,
+    KotlinLexer.CLASS,
+    KotlinLexer.INTERFACE,
+    KotlinLexer.OBJECT,
+    KotlinLexer.COMPANION,
+    KotlinLexer.VAL,
+    KotlinLexer.VAR,
+    KotlinLexer.INIT,
+    KotlinLexer.CONSTRUCTOR,
+    KotlinLexer.TYPE_ALIAS,
+}
+
+# A primary constructor may follow the class name
+CLASS_HEADER_END_TOKENS = FUNCTION_HEADER_END_TOKENS - {KotlinLexer.CONSTRUCTOR}
+
+# Tokens before the "get" or "set" of a property accessor
+ACCESSOR_PREFIX_TOKENS = {
+    KotlinLexer.NL,
+    KotlinLexer.PUBLIC,
+    KotlinLexer.PRIVATE,
+    KotlinLexer.PROTECTED,
+    KotlinLexer.INTERNAL,
+}
+
+# String templates open with "${" and close with an ordinary "}"
+OPEN_BRACE_TOKENS = {
+    KotlinLexer.LCURL,
+    KotlinLexer.LineStrExprStart,
+    KotlinLexer.MultiLineStrExprStart,
+}
+
 
 def setup_kotlin_parser():
     """
@@ -16,6 +76,139 @@ def setup_kotlin_parser():
     return None
 
 
+def needs_full_parse(tokens):
+    """
+    Lexer pre-scan deciding whether a file can produce any class information.
+
+    Only class and interface declarations produce entries, so files made of
+    top-level functions, properties or objects always yield an empty result
+    and the parser does not need to run on them.
+
+    Args:
+        tokens (list): All tokens of the file.
+
+    Returns:
+        bool: True if the file must be parsed.
+    """
+    return any(token.type in DECLARATION_TOKENS for token in tokens)
+
+
+def prunable_subtrees(tokens):
+    """
+    Tell PrunedTreeWalker which code subtrees it may skip.
+
+    Blocks cover block bodies of functions, accessors, constructors and init
+    blocks; expressions cover expression bodies and property initializers.
+
+    Args:
+        tokens (list): All tokens of the file.
+
+    Returns:
+        dict: Positions keeping blocks and expressions walked, by rule index.
+    """
+    return {
+        KotlinParser.RULE_block: token_positions(tokens, BLOCK_DECLARATION_TOKENS),
+        KotlinParser.RULE_expression: token_positions(
+            tokens, EXPRESSION_DECLARATION_TOKENS
+        ),
+    }
+
+
+def _body_brace(code, position, end_tokens):
+    """Return the brace opening the body of a declaration header, if any."""
+    depth = 0
+    for index in range(position, len(code)):
+        token = code[index]
+        if token.type == KotlinLexer.LPAREN:
+            depth += 1
+        elif token.type == KotlinLexer.RPAREN:
+            depth -= 1
+        elif depth == 0:
+            if token.type == KotlinLexer.LCURL:
+                return token
+            if token.type in end_tokens:
+                return None
+    return None
+
+
+def body_braces(tokens):
+    """
+    Find the braces of function bodies and of the code blocks within them.
+
+    The body of a function is the first brace after ``fun`` outside the
+    parameter list, unless the header ends before it in an expression body
+    or in the next declaration, as functions without a body do. Accessor,
+    class and object bodies are found the same way. Inside function and
+    accessor bodies and init blocks every other brace opens a block or
+    lambda. String templates and
+    the lambdas of property initializers are never included, nor is any
+    code after a local class.
+
+    Args:
+        tokens (list): All tokens of the file.
+
+    Returns:
+        list: (open, close) token indexes of each body and code block.
+    """
+    code = [token for token in tokens if token.channel == Token.DEFAULT_CHANNEL]
+    kinds = {}
+    previous_type = None
+    for position, token in enumerate(code):
+        brace = None
+        kind = "body"
+        if token.type == KotlinLexer.FUN:
+            brace = _body_brace(code, position + 1, FUNCTION_HEADER_END_TOKENS)
+        elif (
+            token.type in (KotlinLexer.GETTER, KotlinLexer.SETTER)
+            and previous_type in ACCESSOR_PREFIX_TOKENS
+            and position + 1 < len(code)
+            and code[position + 1].type == KotlinLexer.LPAREN
+        ):
+            brace = _body_brace(code, position + 1, FUNCTION_HEADER_END_TOKENS)
+        elif token.type in BLOCK_DECLARATION_TOKENS:
+            brace = _body_brace(code, position + 1, CLASS_HEADER_END_TOKENS)
+            kind = "object" if token.type == KotlinLexer.OBJECT else "class"
+        elif token.type == KotlinLexer.INIT and previous_type != KotlinLexer.DOT:
+            following = position + 1
+            while following < len(code) and code[following].type == KotlinLexer.NL:
+                following += 1
+            if following < len(code) and code[following].type == KotlinLexer.LCURL:
+                brace = code[following]
+        if brace is not None:
+            kinds.setdefault(brace.tokenIndex, kind)
+        previous_type = token.type
+
+    bodies = []
+    # Per open brace: its token index and what the enclosing braces open
+    braces = []
+    kind = "other"
+    for token in code:
+        if token.type in OPEN_BRACE_TOKENS:
+            braces.append((token.tokenIndex, kind))
+            if token.type != KotlinLexer.LCURL:
+                kind = "template"
+            elif token.tokenIndex in kinds:
+                kind = kinds[token.tokenIndex]
+            elif kind in ("body", "code"):
+                kind = "code"
+            else:
+                kind = "other"
+        elif token.type == KotlinLexer.RCURL and braces:
+            start, outer = braces.pop()
+            if kind in ("body", "code"):
+                bodies.append((start, token.tokenIndex))
+            elif kind == "class" and outer in ("body", "code"):
+                # The grammar reads the statements after a local class as part
+                # of its body, so they are left as they are
+                braces = [
+                    (brace, "other" if enclosing in ("body", "code") else enclosing)
+                    for brace, enclosing in braces
+                ]
+                outer = "other"
+            kind = outer
+    return bodies
+
+
 class KotlinListener(ParseTreeListener):
     def __init__(self, source, comments):
         self.source = source
@@ -23,7 +216,11 @@ class KotlinListener(ParseTreeListener):
         self.current_class = None
         self.nesting_level = 0
         self.comments = comments
+        self.comment_lines = [line for _, line in comments]
         self.last_processed_line = -1
+        # Member names per class record and member list, keyed by id(), for
+        # O(1) deduplication
+        self.member_names = {}
 
     def _clean_comment(self, comment):
         """Clean up comment by removing comment markers."""
@@ -54,39 +251,45 @@ class KotlinListener(ParseTreeListener):
                 annotations.append(annotation)
         return annotations
 
+    def _modifier_types(self, modifier_list_ctx):
+        """
+        Return the token types of the keyword modifiers in a ModifierList.
+
+        Modifiers followed by a line break are not counted, as in the token
+        engine.
+        """
+        types = set()
+        if modifier_list_ctx is None:
+            return types
+        for modifier in modifier_list_ctx.getChildren():
+            if (
+                isinstance(modifier, KotlinParser.ModifierContext)
+                and modifier.getChildCount() == 1
+            ):
+                types.add(modifier.start.type)
+        return types
+
     def _extract_property_info(self, ctx):
         """Extract property information from property declaration context."""
-        is_const = False
-        is_val = False
-        is_private = False
-        name = None
-
-        for child in ctx.getChildren():
-            text = child.getText()
-            if isinstance(child, KotlinParser.ModifierListContext):
-                for modifier_child in child.getChildren():
-                    modifier_text = modifier_child.getText()
-                    if modifier_text == "private":
-                        is_private = True
-                    elif modifier_text == "const":
-                        is_const = True
-            elif text in ["var", "val"]:
-                is_val = True
-            elif isinstance(child, KotlinParser.VariableDeclarationContext):
-                for sibling_child in child.getChildren():
-                    if isinstance(sibling_child, KotlinParser.SimpleIdentifierContext):
-                        name = sibling_child.getText()
-                        break
-
-        return name, is_const, is_val, is_private
+        modifiers = self._modifier_types(ctx.modifierList())
+        is_val = ctx.VAL() is not None or ctx.VAR() is not None
+        variable = ctx.variableDeclaration()
+        name = variable.simpleIdentifier() if variable is not None else None
+        return (
+            name.getText() if name is not None else None,
+            KotlinLexer.CONST in modifiers,
+            is_val,
+            KotlinLexer.PRIVATE in modifiers,
+        )
 
     def find_nearest_comment(self, target_line):
         """Find and return the nearest comment before the target line."""
         nearest_comment = None
-        for comment, line in reversed(self.comments):
-            if self.last_processed_line < line < target_line:
-                nearest_comment = self._clean_comment(comment)
-                break
+        # Comments are in source order, so the last one above the target line
+        # is found by bisection
+        index = bisect_left(self.comment_lines, target_line) - 1
+        if index >= 0 and self.comment_lines[index] > self.last_processed_line:
+            nearest_comment = self._clean_comment(self.comments[index][0])
         self.last_processed_line = target_line
         return nearest_comment or "No Comment"
 
@@ -94,7 +297,7 @@ class KotlinListener(ParseTreeListener):
         self, class_name, annotations, is_interface, is_data_class, line
     ):
         """Create a new class info dictionary with default values."""
-        return {
+        class_info = {
             "name": class_name,
             "constants": [],
             "methods": [],
@@ -107,48 +310,61 @@ class KotlinListener(ParseTreeListener):
             "enum_values": [],
             "comment": self.find_nearest_comment(line),
         }
+        self.member_names[id(class_info)] = defaultdict(set)
+        return class_info
+
+    def _add_member(self, kind, name, line):
+        """
+        Append a named member to one of the current class's member lists.
+
+        Args:
+            kind (str): The list to add to, e.g. "methods" or "properties".
+            name (str): The member name.
+            line (int): The line of the declaration, used for its comment.
+
+        Returns:
+            bool: False if the list already has a member with this name.
+        """
+        names = self.member_names[id(self.current_class)][kind]
+        if name in names:
+            return False
+        names.add(name)
+        self.current_class[kind].append(
+            {"name": name, "comment": self.find_nearest_comment(line)}
+        )
+        return True
 
     def _process_class_modifiers(self, ctx):
         """Process class modifiers to extract annotations and class type."""
+        modifier_list = ctx.modifierList()
         annotations = []
-        is_data_class = False
-
-        for child in ctx.getChildren():
-            if isinstance(child, KotlinParser.ModifierListContext):
-                for modifier in child.getChildren():
-                    if isinstance(modifier, KotlinParser.AnnotationsContext):
-                        annotations.append(modifier.getText().strip("@"))
-                    elif modifier.getText() == "data":
-                        is_data_class = True
-
+        if modifier_list is not None:
+            annotations = self._extract_annotations(modifier_list)
+        is_data_class = KotlinLexer.DATA in self._modifier_types(modifier_list)
         return annotations, is_data_class
 
     def _find_class_name_and_type(self, ctx):
         """Find class name and determine if it's an interface."""
-        found_type = False
-        is_interface = False
-        class_name = None
-
-        for child in ctx.getChildren():
-            text = child.getText()
-            if text in ["class", "interface"]:
-                found_type = True
-                is_interface = text == "interface"
-            elif found_type and isinstance(child, KotlinParser.SimpleIdentifierContext):
-                class_name = child.getText()
-                break
-
-        return class_name, is_interface
+        name = ctx.simpleIdentifier()
+        return (
+            name.getText() if name is not None else None,
+            ctx.INTERFACE() is not None,
+        )
 
     def enterClassDeclaration(self, ctx):
-        self.nesting_level += 1
-
         annotations, is_data_class = self._process_class_modifiers(ctx)
         class_name, is_interface = self._find_class_name_and_type(ctx)
+        self._enter_class(
+            class_name, annotations, is_interface, is_data_class, ctx.start.line
+        )
+
+    def _enter_class(self, class_name, annotations, is_interface, is_data_class, line):
+        """Open a class or interface declaration found at ``line``."""
+        self.nesting_level += 1
 
         if class_name and self.nesting_level == 1:
             self.current_class = self._create_class_info(
-                class_name, annotations, is_interface, is_data_class, ctx.start.line
+                class_name, annotations, is_interface, is_data_class, line
             )
             logger.debug(
                 f"Created new {'interface' if is_interface else 'class'}: {class_name}"
@@ -156,31 +372,29 @@ class KotlinListener(ParseTreeListener):
 
     def enterClassParameter(self, ctx):
         if self.current_class and self.current_class.get("is_data_class"):
-            # Look for parameter name in class constructor
-            name = None
-            is_private = False
+            name = ctx.simpleIdentifier()
+            modifiers = self._modifier_types(ctx.modifierList())
+            self._add_class_parameter(
+                name.getText() if name is not None else None,
+                KotlinLexer.PRIVATE in modifiers,
+                ctx.start.line,
+            )
 
-            # Check modifiers first
-            for child in ctx.getChildren():
-                if isinstance(child, KotlinParser.ModifierListContext):
-                    for modifier in child.getChildren():
-                        if modifier.getText() == "private":
-                            is_private = True
-                            break
-                elif isinstance(child, KotlinParser.SimpleIdentifierContext):
-                    name = child.getText()
-                    break
+    def _add_class_parameter(self, name, is_private, line):
+        """Record a public primary constructor parameter of a data class."""
+        if not self.current_class or not self.current_class.get("is_data_class"):
+            return
 
-            if name and not is_private:
-                # Add as property for data class parameters
-                self.current_class["properties"].append(
-                    {"name": name, "comment": self.find_nearest_comment(ctx.start.line)}
-                )
-                logger.debug(
-                    f"Added data class parameter '{name}' as property to class {self.current_class['name']}"
-                )
+        # Add as property for data class parameters
+        if name and not is_private and self._add_member("properties", name, line):
+            logger.debug(
+                f"Added data class parameter '{name}' as property to class {self.current_class['name']}"
+            )
 
     def enterEnumClassBody(self, ctx):
+        self._mark_enum()
+
+    def _mark_enum(self):
         if self.current_class:
             self.current_class["is_enum"] = True
             logger.debug(f"Marked class {self.current_class['name']} as enum class")
@@ -191,40 +405,51 @@ class KotlinListener(ParseTreeListener):
             for child in ctx.getChildren():
                 if isinstance(child, KotlinParser.SimpleIdentifierContext):
                     # Found an enum entry name
-                    self.current_class["enum_values"].append(
-                        {
-                            "name": child.getText(),
-                            "comment": self.find_nearest_comment(ctx.start.line),
-                        }
-                    )
-                    logger.debug(
-                        f"Added enum value '{child.getText()}' to enum class {self.current_class['name']}"
-                    )
+                    self._add_enum_value(child.getText(), ctx.start.line)
                     break
 
+    def _add_enum_value(self, name, line):
+        if not self.current_class or not self.current_class["is_enum"]:
+            return
+
+        if self._add_member("enum_values", name, line):
+            logger.debug(
+                f"Added enum value '{name}' to enum class {self.current_class['name']}"
+            )
+
     def enterCompanionObject(self, ctx):
         if self.current_class:
-            # Look for companion object name
-            name = None
-            for child in ctx.getChildren():
-                text = child.getText()
-                if text not in ["companion", "object"] and not text.startswith("@"):
-                    name = text
-                    break
+            name = ctx.simpleIdentifier()
+            self._add_companion_object(
+                name.getText() if name is not None else None, ctx.start.line
+            )
 
-            # If no explicit name is found, use default name "Companion"
-            if not name:
-                name = "Companion"
+    def _add_companion_object(self, name, line):
+        """
+        Add a companion object to the current class.
 
-            # Add companion object to current class
-            self.current_class["companion_objects"].append(
-                {"name": name, "comment": self.find_nearest_comment(ctx.start.line)}
-            )
-            logger.debug(
-                f"Added companion object '{name}' to class {self.current_class['name']}"
-            )
+        Returns:
+            dict: The added entry, or None if there is no current class.
+        """
+        if not self.current_class:
+            return None
+
+        # If no explicit name is found, use default name "Companion"
+        if not name:
+            name = "Companion"
+
+        # Add companion object to current class
+        companion = {"name": name, "comment": self.find_nearest_comment(line)}
+        self.current_class["companion_objects"].append(companion)
+        logger.debug(
+            f"Added companion object '{name}' to class {self.current_class['name']}"
+        )
+        return companion
 
     def exitClassDeclaration(self, ctx):
+        self._exit_class()
+
+    def _exit_class(self):
         if self.nesting_level == 1 and self.current_class:
             self.class_info.append(self.current_class)
             self.current_class = None
@@ -232,11 +457,7 @@ class KotlinListener(ParseTreeListener):
 
     def _add_property_to_class(self, name, is_const, line):
         """Add a property to the current class."""
-        property_info = {"name": name, "comment": self.find_nearest_comment(line)}
-        if is_const:
-            self.current_class["constants"].append(property_info)
-        else:
-            self.current_class["properties"].append(property_info)
+        self._add_member("constants" if is_const else "properties", name, line)
 
     def enterPropertyDeclaration(self, ctx):
         if not self.current_class or not self._is_class_level_property(ctx):
@@ -246,100 +467,209 @@ class KotlinListener(ParseTreeListener):
         if name and not is_private and (is_const or is_val):
             self._add_property_to_class(name, is_const, ctx.start.line)
 
-    def _is_modifier_or_annotation(self, text):
-        """Check if the text is a modifier or annotation."""
-        return text.startswith("@") or text in [
-            "private",
-            "public",
-            "protected",
-            "internal",
-        ]
-
-    def _extract_extension_function_info(self, text, next_text, next_next_text):
-        """Extract extension function information."""
-        name = None
-        receiver_type = None
-
-        if "." in text:
-            parts = text.split(".")
-            receiver_type = parts[0]
-            if next_text and not next_text.startswith("("):
-                name = next_text
-        else:
-            receiver_type = text
-            if next_next_text and not next_next_text.startswith("("):
-                name = next_next_text
-
-        return name, receiver_type
-
-    def _is_valid_function_name(self, text):
-        """Check if the text could be a valid function name."""
-        return not any(
-            [
-                text.startswith("("),
-                text.startswith("<"),
-                text.startswith("@"),
-                text in ["fun", ":"],
-            ]
-        )
-
     def enterFunctionDeclaration(self, ctx):
         if not self.current_class:
             return
 
-        children = list(ctx.getChildren())
-        found_fun = False
-        name = None
-
-        for i, child in enumerate(children):
-            text = child.getText()
-
-            if text == "fun":
-                found_fun = True
-                continue
-
-            if not found_fun:
-                continue
-
-            if self._is_modifier_or_annotation(text) or text.startswith("<"):
-                continue
-
-            if name is None:
-                next_text = children[i + 1].getText() if i + 1 < len(children) else ""
-                next_next_text = (
-                    children[i + 2].getText() if i + 2 < len(children) else ""
-                )
-
-                if "." in text or (text and next_text == "."):
-                    name, _ = self._extract_extension_function_info(
-                        text, next_text, next_next_text
-                    )
-                    if name:
-                        break
-                elif self._is_valid_function_name(text):
-                    name = text
-                    break
+        # The name follows the receiver type, if any
+        name = ctx.identifier()
+        self._add_method(name.getText() if name is not None else None, ctx.start.line)
 
-        if name:
-            self.current_class["methods"].append(
-                {"name": name, "comment": self.find_nearest_comment(ctx.start.line)}
+    def _add_method(self, name, line):
+        """Add a function found at ``line`` to the current class."""
+        if self.current_class and name:
+            self._add_member("methods", name, line)
+
+
+class KotlinParseListener(KotlinListener):
+    """
+    KotlinListener notified by the parser while it runs, without a parse tree.
+
+    Without a tree the parser does not attach rule contexts to their parents,
+    so the names and modifier lists of a declaration are not among its
+    children when it is entered. Modifier lists are collected as they are
+    parsed, and each declaration is recorded once its name has been parsed,
+    which happens before any nested declaration. Texts spanning several
+    tokens are read from the token stream.
+    """
+
+    # Children of a declaration that may come before its name
+    NAME_PRECEDING = (
+        KotlinParser.ModifierListContext,
+        KotlinParser.TypeParametersContext,
+        KotlinParser.TypeContext,
+        KotlinParser.ReceiverTypeContext,
+    )
+
+    # Declarations whose modifier list is read
+    MODIFIED_DECLARATIONS = (
+        KotlinParser.ClassDeclarationContext,
+        KotlinParser.PropertyDeclarationContext,
+        KotlinParser.ClassParameterContext,
+    )
+
+    def __init__(self, source, comments, tokens):
+        super().__init__(source, comments)
+        self.tokens = tokens
+        # Declaration waiting for its name: (context, context class of the
+        # name, callback taking the name)
+        self.pending = None
+        # Annotations and keyword modifier types of the declarations being
+        # parsed, by context
+        self.modifiers = {}
+
+    def _text(self, ctx):
+        """Return the text of a context as getText() would in a tree."""
+        if ctx.stop is None:
+            return ""
+        tokens = self.tokens[ctx.start.tokenIndex : ctx.stop.tokenIndex + 1]
+        return "".join(
+            token.text for token in tokens if token.channel == Token.DEFAULT_CHANNEL
+        )
+
+    def _await_name(self, ctx, name_class, on_name):
+        """Call ``on_name`` once the name of ``ctx`` is parsed."""
+        self._resolve_pending(None)
+        self.pending = (ctx, name_class, on_name)
+
+    def _resolve_pending(self, name):
+        if self.pending is not None:
+            on_name = self.pending[2]
+            self.pending = None
+            on_name(name)
+
+    def enterEveryRule(self, ctx):
+        # A declaration has no name if anything else follows its keyword
+        if (
+            self.pending is not None
+            and ctx.parentCtx is self.pending[0]
+            and not isinstance(ctx, self.NAME_PRECEDING + (self.pending[1],))
+        ):
+            self._resolve_pending(None)
+
+    def exitEveryRule(self, ctx):
+        if self.pending is not None and ctx is self.pending[0]:
+            self._resolve_pending(None)
+        if self.modifiers:
+            self.modifiers.pop(ctx, None)
+
+    def enterModifierList(self, ctx):
+        if isinstance(ctx.parentCtx, self.MODIFIED_DECLARATIONS):
+            self.modifiers[ctx.parentCtx] = ([], set())
+
+    def _modifiers_of(self, ctx):
+        """Return the collected modifiers a ModifierList child belongs to."""
+        parent = ctx.parentCtx
+        if isinstance(parent, KotlinParser.ModifierListContext):
+            return self.modifiers.get(parent.parentCtx)
+        return None
+
+    def exitAnnotations(self, ctx):
+        modifiers = self._modifiers_of(ctx)
+        if modifiers is not None:
+            modifiers[0].append(self._text(ctx).strip("@"))
+
+    def exitModifier(self, ctx):
+        # Only line breaks after the modifier are children without a tree
+        modifiers = self._modifiers_of(ctx)
+        if modifiers is not None and ctx.getChildCount() == 0:
+            modifiers[1].add(ctx.start.type)
+
+    def exitSimpleIdentifier(self, ctx):
+        parent = ctx.parentCtx
+        if self.pending is not None and parent is self.pending[0]:
+            if self.pending[1] is KotlinParser.SimpleIdentifierContext:
+                self._resolve_pending(ctx.getText())
+        elif isinstance(parent, KotlinParser.VariableDeclarationContext):
+            if isinstance(parent.parentCtx, KotlinParser.PropertyDeclarationContext):
+                self._property_named(parent.parentCtx, ctx.getText())
+        elif isinstance(parent, KotlinParser.ClassParameterContext):
+            _, modifier_types = self.modifiers.get(parent, ((), ()))
+            self._add_class_parameter(
+                ctx.getText(), KotlinLexer.PRIVATE in modifier_types, parent.start.line
             )
+        elif isinstance(parent, KotlinParser.EnumEntryContext):
+            self._add_enum_value(ctx.getText(), parent.start.line)
 
+    def exitIdentifier(self, ctx):
+        if self.pending is not None and ctx.parentCtx is self.pending[0]:
+            if self.pending[1] is KotlinParser.IdentifierContext:
+                self._resolve_pending(self._text(ctx))
+
+    def _property_named(self, ctx, name):
+        if not self.current_class or not self._is_class_level_property(ctx):
+            return
+
+        _, modifier_types = self.modifiers.get(ctx, ((), ()))
+        is_const = KotlinLexer.CONST in modifier_types
+        is_val = ctx.VAL() is not None or ctx.VAR() is not None
+        if KotlinLexer.PRIVATE not in modifier_types and (is_const or is_val):
+            self._add_property_to_class(name, is_const, ctx.start.line)
 
-def parse_kotlin_file(content, parser=None):
+    def enterClassDeclaration(self, ctx):
+        def enter_class(class_name):
+            annotations, modifier_types = self.modifiers.get(ctx, ([], ()))
+            self._enter_class(
+                class_name,
+                annotations,
+                ctx.INTERFACE() is not None,
+                KotlinLexer.DATA in modifier_types,
+                ctx.start.line,
+            )
+
+        self._await_name(ctx, KotlinParser.SimpleIdentifierContext, enter_class)
+
+    def _exit_class(self):
+        # A class without name is only opened when it ends
+        self._resolve_pending(None)
+        super()._exit_class()
+
+    def enterClassParameter(self, ctx):
+        pass
+
+    def enterEnumEntry(self, ctx):
+        pass
+
+    def enterCompanionObject(self, ctx):
+        if self.current_class:
+            line = ctx.start.line
+            self._await_name(
+                ctx,
+                KotlinParser.SimpleIdentifierContext,
+                lambda name: self._add_companion_object(name, line),
+            )
+
+    def enterPropertyDeclaration(self, ctx):
+        pass
+
+    def enterFunctionDeclaration(self, ctx):
+        if self.current_class:
+            line = ctx.start.line
+            self._await_name(
+                ctx,
+                KotlinParser.IdentifierContext,
+                lambda name: self._add_method(name, line),
+            )
+
+
+def parse_kotlin_file(content, parser=None, engine="antlr"):
     """
     Parse Kotlin source code and extract class information using ANTLR4.
 
     Args:
         content (str): The content of the Kotlin source file.
         parser (None): Not used in ANTLR4 implementation.
+        engine (str): "antlr" walks a full parse tree, "skeleton" one of
+            the file with function bodies left empty, "streaming" extracts
+            declarations while parsing without building a tree, and "tokens"
+            extracts them from the token stream without running the parser.
 
     Returns:
         list: A list of dictionaries containing class information.
     """
     try:
         # Create the lexer and stream
-        input_stream = InputStream(content)
+        input_stream = CodePointStream(content)
         lexer = KotlinLexer(input_stream)
         stream = CommonTokenStream(lexer)
 
@@ -353,16 +683,45 @@ def parse_kotlin_file(content, parser=None):
             ]:
                 comments.append((token.text.strip(), token.line))
 
-        # Create the parser
+        if not needs_full_parse(stream.tokens):
+            record_parse_stat("kotlin.prescan_skipped")
+            return []
+
+        if engine == "tokens":
+            from .token_extractor import extract_kotlin_declarations
+
+            record_parse_stat("kotlin.token_engine")
+            return extract_kotlin_declarations(stream.tokens, comments)
+
+        if engine == "skeleton":
+            # Parse the declarations only, without the function bodies
+            tokens, collapsed = collapse_bodies(
+                stream.tokens,
+                body_braces(stream.tokens),
+                token_positions(stream.tokens, BLOCK_DECLARATION_TOKENS),
+            )
+            stream = skeleton_stream(tokens)
+            record_parse_stat("kotlin.bodies_collapsed", collapsed)
+
+        # Create the parser; Kotlin is parsed in LL mode only, see TWO_STAGE
         parser = KotlinParser(stream)
-        parser.removeErrorListeners()  # Remove default error listeners
-        parser.addErrorListener(DiagnosticErrorListener())  # Add diagnostic listener
-        tree = parser.kotlinFile()
+        if engine == "streaming":
+            listener = listen_two_stage(
+                parser,
+                "kotlinFile",
+                "kotlin",
+                lambda: KotlinParseListener(content, comments, stream.tokens),
+            )
+            return listener.class_info
+
+        tree = parse_two_stage(parser, "kotlinFile", "kotlin")
 
-        # Create and run the listener with comments
+        # Create and run the listener, skipping code without declarations
         listener = KotlinListener(content, comments)
-        walker = ParseTreeWalker()
+        walker = PrunedTreeWalker(prunable_subtrees(stream.tokens))
         walker.walk(listener, tree)
+        record_parse_stat("kotlin.nodes_walked", walker.visited)
+        record_parse_stat("kotlin.subtrees_pruned", walker.pruned)
 
         return listener.class_info
     except Exception as e:
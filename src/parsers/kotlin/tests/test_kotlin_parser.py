@@ -1,6 +1,10 @@
 import pytest
 from pathlib import Path
 from src.parsers.kotlin.kotlin_parser import parse_kotlin_file
+from src.parsers.parse_stats import reset_parse_stats, snapshot_parse_stats
+from src.parsers.two_stage import TWO_STAGE
+
+KOTLIN_TEST_FILES = sorted((Path(__file__).parent / "test_data").glob("*.kt"))
 
 
 @pytest.fixture
@@ -262,3 +266,199 @@ def test_parse_complex_kotlin_file(kt_complex_test_file):
     assert interface_foo["is_interface"], "Foo should be an interface"
     assert "methods" in interface_foo, "Interface should have methods"
     assert "properties" in interface_foo, "Interface should have properties"
+
+
+def test_parse_kotlin_prediction_mode_stats(kt_extension_test_file):
+    # Extension receivers need full-context prediction in the Kotlin grammar,
+    # so Kotlin files skip the SLL pass
+    reset_parse_stats()
+    result = parse_kotlin_file(kt_extension_test_file)
+    stats = snapshot_parse_stats()
+    assert stats["kotlin.ll"] == 1, "Kotlin files should be parsed in LL mode"
+    assert not stats["kotlin.sll"] and not stats["kotlin.ll_fallback"]
+    assert [m["name"] for m in result[0]["methods"]] == ["addPrefix", "double"]
+
+
+def test_parse_kotlin_two_stage_when_enabled(monkeypatch, kt_extension_test_file):
+    monkeypatch.setitem(TWO_STAGE, "kotlin", True)
+    reset_parse_stats()
+    result = parse_kotlin_file("class Simple {\n    fun run() {}\n}\n")
+    stats = snapshot_parse_stats()
+    assert stats["kotlin.sll"] == 1 and not stats["kotlin.ll_fallback"], (
+        "Simple class should parse in SLL mode without fallback"
+    )
+    assert result[0]["methods"][0]["name"] == "run"
+
+    reset_parse_stats()
+    result = parse_kotlin_file(kt_extension_test_file)
+    stats = snapshot_parse_stats()
+    assert stats["kotlin.ll_fallback"] == 1 and not stats["kotlin.sll"], (
+        "Extension functions should be re-parsed in LL mode"
+    )
+    assert [m["name"] for m in result[0]["methods"]] == ["addPrefix", "double"]
+
+
+@pytest.mark.parametrize("engine", ["antlr", "tokens"])
+def test_parse_kotlin_deduplicates_members(engine):
+    content = (
+        "class Overloads {\n"
+        "    // Formats an int\n"
+        "    fun format(value: Int): String = value.toString()\n"
+        "    fun format(value: Long): String = value.toString()\n"
+        "    val size: Int = 1\n"
+        "    inner class Nested {\n"
+        "        val size: Int = 2\n"
+        "    }\n"
+        "}\n"
+    )
+    result = parse_kotlin_file(content, engine=engine)
+    assert result[0]["methods"] == [{"name": "format", "comment": "Formats an int"}]
+    assert [p["name"] for p in result[0]["properties"]] == ["size"]
+
+
+def test_parse_kotlin_prescan_skips_files_without_classes():
+    top_level_only = (
+        "package com.intellij.util\n\n"
+        "// Top-level helpers\n"
+        "fun String.shout(): String = uppercase()\n\n"
+        "object Registry {\n    val items = listOf(1, 2)\n}\n"
+    )
+    reset_parse_stats()
+    assert parse_kotlin_file(top_level_only) == []
+    stats = snapshot_parse_stats()
+    assert stats["kotlin.prescan_skipped"] == 1, "File should skip the parser"
+    assert not stats["kotlin.sll"] and not stats["kotlin.ll_fallback"]
+
+
+@pytest.mark.parametrize(
+    "file_name", ["ExtensionFunction.kt", "GeneralSettings.kt", "TestClass.kt"]
+)
+def test_token_engine_matches_antlr(file_name):
+    test_file = Path(__file__).parent / "test_data" / file_name
+    content = test_file.read_text(encoding="utf-8")
+
+    assert parse_kotlin_file(content, engine="tokens") == parse_kotlin_file(content)
+
+
+def test_token_engine_matches_antlr_declarations(kt_complex_test_file):
+    # In `class Bar ... : A by b { ... }` the grammar reads the braces as a
+    # lambda passed to `b`, so ANTLR finds no class-level properties there
+    antlr = parse_kotlin_file(kt_complex_test_file)
+    tokens = parse_kotlin_file(kt_complex_test_file, engine="tokens")
+
+    assert len(tokens) == len(antlr)
+    for token_class, antlr_class in zip(tokens, antlr):
+        for key in ("name", "comment", "methods", "enum_values", "companion_objects"):
+            assert token_class[key] == antlr_class[key]
+
+
+def test_pruned_walk_keeps_declarations_in_bodies():
+    content = (
+        "class Service {\n"
+        "    val total = listOf(1, 2).map { val doubled = it * 2; doubled }\n"
+        "    fun work(n: Int): Int {\n"
+        "        var sum = 0\n"
+        "        for (i in 0 until n) { sum += i }\n"
+        "        fun helper() = sum\n"
+        "        return helper()\n"
+        "    }\n"
+        "}\n"
+    )
+    reset_parse_stats()
+    result = parse_kotlin_file(content)
+    stats = snapshot_parse_stats()
+
+    assert [m["name"] for m in result[0]["methods"]] == ["work", "helper"]
+    assert [p["name"] for p in result[0]["properties"]] == ["total", "doubled"]
+    assert stats["kotlin.subtrees_pruned"] > 0, "The loop should not be walked"
+    assert stats["kotlin.nodes_walked"] > 0
+
+
+@pytest.mark.parametrize("test_file", KOTLIN_TEST_FILES, ids=lambda path: path.name)
+def test_skeleton_engine_matches_antlr(test_file):
+    content = test_file.read_text(encoding="utf-8")
+
+    assert parse_kotlin_file(content, engine="skeleton") == parse_kotlin_file(content)
+
+
+def test_skeleton_engine_keeps_declarations_in_bodies():
+    content = (
+        "class Service {\n"
+        "    val total = listOf(1, 2).map { val doubled = it * 2; doubled }\n"
+        '    var name: String = ""\n'
+        '        set(value) { field = "${value.trim()}" }\n'
+        '    init { check(total > 0) { "empty" } }\n'
+        "    fun work(n: Int): Int {\n"
+        "        var sum = 0\n"
+        "        for (i in 0 until n) { sum += i }\n"
+        "        fun helper() = sum\n"
+        "        return helper()\n"
+        "    }\n"
+        "    abstract fun pending(block: () -> Unit = {})\n"
+        "    fun listener() = object : Runnable { override fun run() { work(1) } }\n"
+        "}\n"
+    )
+    reset_parse_stats()
+    result = parse_kotlin_file(content, engine="skeleton")
+    stats = snapshot_parse_stats()
+
+    assert result == parse_kotlin_file(content)
+    assert [m["name"] for m in result[0]["methods"]] == [
+        "work",
+        "helper",
+        "pending",
+        "listener",
+        "run",
+    ]
+    assert [p["name"] for p in result[0]["properties"]] == ["total", "doubled", "name"]
+    assert stats["kotlin.bodies_collapsed"] >= 4, "Bodies should not be parsed"
+
+
+@pytest.mark.parametrize("test_file", KOTLIN_TEST_FILES, ids=lambda path: path.name)
+def test_streaming_engine_matches_antlr(test_file):
+    content = test_file.read_text(encoding="utf-8")
+
+    assert parse_kotlin_file(content, engine="streaming") == parse_kotlin_file(content)
+
+
+def test_streaming_engine_reads_modifiers_and_names():
+    content = (
+        "@Serializable\n"
+        "data class Point(val x: Int, private val y: Int, @Ann var z: Int) {\n"
+        "    private\n"
+        "    val hidden = 1\n"
+        "    const val MAX = 2\n"
+        "    var (a, b) = 1 to 2\n"
+        "    fun <T> List<T>.second(): T = this[1]\n"
+        "    companion object Factory { val origin = 0 }\n"
+        "}\n"
+    )
+    result = parse_kotlin_file(content, engine="streaming")
+
+    assert result == parse_kotlin_file(content)
+    assert result[0]["annotations"] == ["Serializable\n"]
+    assert [p["name"] for p in result[0]["properties"]] == [
+        "x",
+        "z",
+        "hidden",
+        "origin",
+    ]
+    assert [c["name"] for c in result[0]["constants"]] == ["MAX"]
+    assert [m["name"] for m in result[0]["methods"]] == ["second"]
+    assert [c["name"] for c in result[0]["companion_objects"]] == ["Factory"]
+
+
+def test_parse_kotlin_source_beyond_latin1():
+    content = (
+        "/** Größe → 📦 */\n"
+        "class Kiste {\n"
+        '    val label = "📦 ${"✓"}"\n'
+        "    fun größe() = 1\n"
+        "}\n"
+    )
+    result = parse_kotlin_file(content)
+
+    assert [c["name"] for c in result] == ["Kiste"]
+    assert "📦" in result[0]["comment"]
+    assert [p["name"] for p in result[0]["properties"]] == ["label"]
+    assert [m["name"] for m in result[0]["methods"]] == ["größe"]
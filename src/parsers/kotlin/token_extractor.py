@@ -0,0 +1,671 @@
+from antlr4.Token import Token
+from .KotlinLexer import KotlinLexer
+from .kotlin_parser import KotlinListener
+
+K = KotlinLexer
+
+# Tokens the grammar accepts as simpleIdentifier
+IDENTIFIER_TOKENS = {
+    K.Identifier,
+    K.ABSTRACT,
+    K.ANNOTATION,
+    K.BY,
+    K.CATCH,
+    K.COMPANION,
+    K.CONSTRUCTOR,
+    K.CROSSINLINE,
+    K.DATA,
+    K.DYNAMIC,
+    K.ENUM,
+    K.EXTERNAL,
+    K.FINAL,
+    K.FINALLY,
+    K.GETTER,
+    K.IMPORT,
+    K.INFIX,
+    K.INIT,
+    K.INLINE,
+    K.INNER,
+    K.INTERNAL,
+    K.LATEINIT,
+    K.NOINLINE,
+    K.OPEN,
+    K.OPERATOR,
+    K.OUT,
+    K.OVERRIDE,
+    K.PRIVATE,
+    K.PROTECTED,
+    K.PUBLIC,
+    K.REIFIED,
+    K.SEALED,
+    K.TAILREC,
+    K.SETTER,
+    K.VARARG,
+    K.WHERE,
+    K.CONST,
+    K.SUSPEND,
+}
+
+MODIFIER_TOKENS = {
+    K.ENUM,
+    K.SEALED,
+    K.ANNOTATION,
+    K.DATA,
+    K.INNER,
+    K.OVERRIDE,
+    K.LATEINIT,
+    K.PUBLIC,
+    K.PRIVATE,
+    K.INTERNAL,
+    K.PROTECTED,
+    K.IN,
+    K.OUT,
+    K.TAILREC,
+    K.OPERATOR,
+    K.INFIX,
+    K.INLINE,
+    K.EXTERNAL,
+    K.SUSPEND,
+    K.CONST,
+    K.ABSTRACT,
+    K.FINAL,
+    K.OPEN,
+    K.VARARG,
+    K.NOINLINE,
+    K.CROSSINLINE,
+    K.REIFIED,
+}
+
+USE_SITE_TOKENS = {
+    K.FIELD,
+    K.FILE,
+    K.PROPERTY,
+    K.GET,
+    K.SET,
+    K.RECEIVER,
+    K.PARAM,
+    K.SETPARAM,
+    K.DELEGATE,
+}
+
+ANNOTATION_START_TOKENS = {K.LabelReference, K.AT} | USE_SITE_TOKENS
+
+MEMBER_KEYWORDS = {
+    K.CLASS,
+    K.INTERFACE,
+    K.FUN,
+    K.VAL,
+    K.VAR,
+    K.OBJECT,
+    K.COMPANION,
+    K.INIT,
+    K.CONSTRUCTOR,
+    K.TYPE_ALIAS,
+}
+
+OPEN_BRACE_TOKENS = {K.LCURL, K.LineStrExprStart, K.MultiLineStrExprStart}
+
+# A brace directly after one of these opens a block rather than a lambda
+BLOCK_KEYWORDS = {K.ELSE, K.TRY, K.FINALLY, K.DO, K.INIT, K.ARROW}
+
+# A brace after `keyword (...)` opens a block rather than a lambda
+BLOCK_HEADER_KEYWORDS = {K.IF, K.WHILE, K.FOR, K.CATCH, K.GETTER, K.SETTER}
+
+# Tokens after which a new statement or member declaration may start
+STATEMENT_BOUNDARIES = {None, K.SEMICOLON, K.LCURL, K.RCURL}
+
+# After a newline these tokens still continue a pending declaration header
+CONTINUATION_TOKENS = {
+    K.COLON,
+    K.LCURL,
+    K.WHERE,
+    K.COMMA,
+    K.DOT,
+    K.BY,
+    K.ASSIGNMENT,
+    K.LPAREN,
+    K.LANGLE,
+    K.ARROW,
+}
+
+
+class _Frame:
+    """
+    A brace-delimited scope of the token walk.
+
+    ``kind`` is "root", "members" (a class body), "enum" (an enum class
+    body), "block" (a code block) or "lambda" (any other braces, such as
+    lambdas, `when` bodies and string templates).
+    """
+
+    __slots__ = (
+        "kind",
+        "depth",
+        "is_class",
+        "pending",
+        "modifiers",
+        "modifiers_start",
+        "annotation",
+        "after_newline",
+        "last_type",
+        "entries",
+        "expect_entry",
+        "entry_start",
+    )
+
+    def __init__(self, kind, depth, is_class=False):
+        self.kind = kind
+        self.depth = depth
+        self.is_class = is_class
+        # Declarations whose body brace has not been seen yet, innermost last
+        self.pending = []
+        # Texts of the modifierList children seen before a declaration keyword
+        self.modifiers = []
+        self.modifiers_start = None
+        # None, or the state of the annotation being collected
+        self.annotation = None
+        self.after_newline = False
+        self.last_type = None
+        self.entries = kind == "enum"
+        self.expect_entry = True
+        self.entry_start = None
+
+
+class KotlinTokenExtractor(KotlinListener):
+    """
+    Extract class information from the token stream alone.
+
+    Declarations are recognized with brace-depth tracking and keyword
+    patterns instead of a parse tree, and recorded through the same
+    KotlinListener helpers the ANTLR walk uses. Names and modifier texts are
+    rebuilt from token texts, so the output matches the ANTLR engine on
+    regular code; files the grammar cannot parse cleanly may differ.
+    """
+
+    def extract(self, tokens):
+        """
+        Run the extraction.
+
+        Args:
+            tokens (list): All tokens of the file, including hidden ones.
+
+        Returns:
+            list: Class information in the same shape as the ANTLR engine.
+        """
+        self.tokens = [
+            token
+            for token in tokens
+            if token.channel == Token.DEFAULT_CHANNEL and token.type != Token.EOF
+        ]
+        self.frames = [_Frame("root", 0)]
+        # Type of the token before each open parenthesis or bracket
+        self.groups = []
+        self.last_group_opener = None
+        # Companion object whose name follows its `object` keyword
+        self.companion = None
+        # Primary constructor parameters being read
+        self.class_params = None
+
+        for index, token in enumerate(self.tokens):
+            if self.companion is not None and token.type == K.OBJECT:
+                self._resolve_companion_name(index)
+            self._token(index, token)
+
+        while self.frames:
+            self._close_frame()
+        return self.class_info
+
+    def _at(self, index):
+        if 0 <= index < len(self.tokens):
+            return self.tokens[index]
+        return None
+
+    def _next_significant(self, index):
+        """Return the index of the first non-newline token after ``index``."""
+        index += 1
+        while index < len(self.tokens) and self.tokens[index].type == K.NL:
+            index += 1
+        return index
+
+    def _previous_significant(self, index):
+        index -= 1
+        while index >= 0 and self.tokens[index].type == K.NL:
+            index -= 1
+        return self._at(index)
+
+    def _skip_angles(self, index):
+        """Return the index after the type argument list starting at ``index``."""
+        depth = 0
+        while index < len(self.tokens):
+            token_type = self.tokens[index].type
+            if token_type == K.LANGLE:
+                depth += 1
+            elif token_type == K.RANGLE:
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+            index += 1
+        return index
+
+    def _token(self, index, token):
+        token_type = token.type
+        frame = self.frames[-1]
+
+        if token_type in OPEN_BRACE_TOKENS:
+            self._open_brace(index, token)
+            return
+        if token_type == K.RCURL:
+            self._close_frame()
+            return
+
+        depth = len(self.groups)
+        if token_type in (K.LPAREN, K.LSQUARE):
+            previous = self._previous_significant(index)
+            self.groups.append(previous.type if previous is not None else None)
+        elif token_type in (K.RPAREN, K.RSQUARE):
+            self.last_group_opener = self.groups.pop() if self.groups else None
+            depth = len(self.groups)
+
+        if self.class_params is not None and self.class_params["frame"] is frame:
+            if self._class_param_token(token, depth):
+                return
+
+        if depth != frame.depth:
+            if frame.annotation is not None:
+                frame.modifiers[-1] += token.text
+            return
+        self._base_token(frame, index, token)
+
+    def _base_token(self, frame, index, token):
+        """Handle a token directly inside the frame's braces."""
+        token_type = token.type
+
+        if frame.pending:
+            self._pending_token(frame, token)
+
+        statement_start = frame.after_newline or frame.last_type in STATEMENT_BOUNDARIES
+        if token_type == K.NL:
+            frame.after_newline = True
+        else:
+            frame.after_newline = False
+            frame.last_type = token_type
+
+        if frame.entries:
+            self._enum_entry_token(frame, token)
+            return
+
+        if self._modifier_token(frame, token, statement_start):
+            return
+
+        if token_type in MEMBER_KEYWORDS:
+            self._declaration(frame, index, token)
+        frame.modifiers = []
+        frame.modifiers_start = None
+
+    def _pending_token(self, frame, token):
+        """Track the header of declarations whose body has not started yet."""
+        token_type = token.type
+        pending = frame.pending[-1]
+        if token_type == K.LANGLE:
+            pending["angles"] = pending.get("angles", 0) + 1
+        elif token_type == K.RANGLE:
+            pending["angles"] = pending.get("angles", 0) - 1
+        if pending.get("angles") or token_type == K.RANGLE:
+            # Type parameters may span lines
+            return
+
+        if token_type == K.SEMICOLON:
+            self._cancel_pending(frame)
+        elif token_type != K.NL and frame.after_newline:
+            if (
+                token_type not in CONTINUATION_TOKENS
+                and frame.last_type not in CONTINUATION_TOKENS
+            ):
+                self._cancel_pending(frame)
+        if not frame.pending:
+            return
+
+        pending = frame.pending[-1]
+        if pending["kind"] == "fun" and token_type == K.ASSIGNMENT:
+            # Expression body, no block follows
+            frame.pending.pop()
+        elif pending["kind"] == "class":
+            if token_type == K.COLON:
+                pending["header"] = False
+            elif token_type == K.LPAREN and pending["header"]:
+                pending["header"] = False
+                self.class_params = {
+                    "frame": frame,
+                    "depth": len(self.groups),
+                    "start": None,
+                    "private": False,
+                    "done": False,
+                    "annotation": False,
+                }
+
+    def _modifier_token(self, frame, token, statement_start):
+        """
+        Collect modifiers and annotations preceding a declaration.
+
+        Modifier keywords double as identifiers, so a new modifier list only
+        starts at the beginning of a statement.
+
+        Returns:
+            bool: True if the token belongs to the modifier list.
+        """
+        token_type = token.type
+        if token_type == K.NL:
+            if frame.modifiers:
+                frame.modifiers[-1] += token.text
+            frame.annotation = None
+            return True
+
+        state = frame.annotation
+        if state is not None:
+            if token_type in (K.DOT, K.COLON) and state != "args":
+                frame.modifiers[-1] += token.text
+                frame.annotation = "name"
+                return True
+            if token_type in IDENTIFIER_TOKENS and state == "name":
+                frame.modifiers[-1] += token.text
+                frame.annotation = "after_name"
+                return True
+            if token_type in (K.LPAREN, K.LSQUARE) and state != "args":
+                frame.modifiers[-1] += token.text
+                frame.annotation = "args"
+                return True
+            if token_type in (K.RPAREN, K.RSQUARE) and state == "args":
+                frame.modifiers[-1] += token.text
+                return True
+            frame.annotation = None
+
+        if not (statement_start or frame.modifiers):
+            return False
+        if token_type in ANNOTATION_START_TOKENS:
+            frame.modifiers.append(token.text)
+            frame.annotation = (
+                "name" if token_type != K.LabelReference else "after_name"
+            )
+        elif token_type in MODIFIER_TOKENS:
+            frame.modifiers.append(token.text)
+        else:
+            return False
+        if frame.modifiers_start is None:
+            frame.modifiers_start = token
+        return True
+
+    def _enum_entry_token(self, frame, token):
+        token_type = token.type
+        if token_type == K.SEMICOLON:
+            frame.entries = False
+        elif token_type in (K.COMMA, K.NL):
+            frame.expect_entry = True
+        elif token_type in ANNOTATION_START_TOKENS:
+            if frame.entry_start is None:
+                frame.entry_start = token
+        elif frame.expect_entry and token_type in IDENTIFIER_TOKENS:
+            start = frame.entry_start or token
+            self._add_enum_value(token.text, start.line)
+            frame.expect_entry = False
+            frame.entry_start = None
+
+    def _class_param_token(self, token, depth):
+        """
+        Read primary constructor parameters.
+
+        Returns:
+            bool: True if the token was consumed.
+        """
+        params = self.class_params
+        token_type = token.type
+        if token_type == K.RPAREN and depth < params["depth"]:
+            self.class_params = None
+            return False
+        if depth != params["depth"]:
+            return depth > params["depth"]
+
+        if token_type == K.COMMA:
+            params.update(start=None, private=False, done=False, annotation=False)
+        elif params["done"]:
+            pass
+        elif token_type in ANNOTATION_START_TOKENS:
+            params["start"] = params["start"] or token
+            params["annotation"] = token_type != K.LabelReference
+        elif token_type in (K.DOT, K.COLON) and params["start"] is not None:
+            params["annotation"] = True
+        elif params["annotation"] and token_type in IDENTIFIER_TOKENS:
+            params["annotation"] = False
+        elif token_type in MODIFIER_TOKENS or token_type in (K.VAL, K.VAR):
+            params["start"] = params["start"] or token
+            if token.text == "private":
+                params["private"] = True
+        elif token_type in IDENTIFIER_TOKENS:
+            start = params["start"] or token
+            self._add_class_parameter(token.text, params["private"], start.line)
+            params["done"] = True
+        return True
+
+    def _declaration(self, frame, index, token):
+        token_type = token.type
+        start = frame.modifiers_start or token
+        if token_type in (K.CLASS, K.INTERFACE):
+            previous = self._previous_significant(index)
+            if previous is not None and previous.type in (K.COLONCOLON, K.DOT):
+                return
+            name = self._at(self._next_significant(index))
+            annotations = [
+                text.strip("@") for text in frame.modifiers if text.startswith("@")
+            ]
+            self._enter_class(
+                (
+                    name.text
+                    if name is not None and name.type in IDENTIFIER_TOKENS
+                    else None
+                ),
+                annotations,
+                token_type == K.INTERFACE,
+                "data" in frame.modifiers,
+                start.line,
+            )
+            frame.pending.append({"kind": "class", "header": True})
+        elif token_type == K.FUN:
+            self._add_method(self._function_name(index), start.line)
+            frame.pending.append({"kind": "fun"})
+        elif token_type in (K.VAL, K.VAR):
+            if self.current_class and self._is_class_level():
+                name = self._property_name(index)
+                if name and "private" not in frame.modifiers:
+                    self._add_property_to_class(
+                        name, "const" in frame.modifiers, start.line
+                    )
+        elif token_type == K.COMPANION:
+            self.companion = self._add_companion_object(None, start.line)
+            frame.pending.append({"kind": "object", "companion": True})
+        elif token_type == K.OBJECT:
+            if frame.pending and frame.pending[-1].pop("companion", False):
+                return
+            frame.pending.append({"kind": "object"})
+        elif token_type == K.CONSTRUCTOR:
+            if not (frame.pending and frame.pending[-1].get("header")):
+                # Secondary constructor, its body is a block
+                frame.pending.append({"kind": "fun"})
+
+    def _resolve_companion_name(self, index):
+        """Name the companion object after the identifier following `object`."""
+        name = self._at(self._next_significant(index))
+        if name is not None and name.type in IDENTIFIER_TOKENS:
+            self.companion["name"] = name.text
+        self.companion = None
+
+    def _function_name(self, index):
+        """Find a function's name after its type parameters and receiver type."""
+        tokens = self.tokens
+        i = self._next_significant(index)
+        if i < len(tokens) and tokens[i].type == K.LANGLE:
+            i = self._next_significant(self._skip_angles(i) - 1)
+        if i >= len(tokens):
+            return None
+
+        last_dot = None
+        k = i
+        if tokens[k].type == K.LPAREN:
+            # Parenthesized receiver type
+            depth = 0
+            while k < len(tokens):
+                if tokens[k].type == K.LPAREN:
+                    depth += 1
+                elif tokens[k].type == K.RPAREN:
+                    depth -= 1
+                    if depth == 0:
+                        break
+                k += 1
+            k += 1
+            while k < len(tokens) and tokens[k].type == K.QUEST:
+                k += 1
+            if k >= len(tokens) or tokens[k].type != K.DOT:
+                return None
+            last_dot = k
+        else:
+            while k < len(tokens):
+                token_type = tokens[k].type
+                if token_type == K.LANGLE:
+                    k = self._skip_angles(k)
+                    continue
+                if token_type == K.DOT:
+                    last_dot = k
+                elif token_type not in IDENTIFIER_TOKENS and token_type not in (
+                    K.QUEST,
+                    K.NL,
+                ):
+                    break
+                k += 1
+
+        if last_dot is not None:
+            i = self._next_significant(last_dot)
+        name = self._at(i)
+        if name is None or name.type not in IDENTIFIER_TOKENS:
+            return None
+        return name.text
+
+    def _property_name(self, index):
+        """Return the declared name of a property, or None for destructuring."""
+        i = self._next_significant(index)
+        if i < len(self.tokens) and self.tokens[i].type == K.LANGLE:
+            i = self._next_significant(self._skip_angles(i) - 1)
+        name = None
+        while i < len(self.tokens):
+            token_type = self.tokens[i].type
+            if token_type not in IDENTIFIER_TOKENS:
+                break
+            name = self.tokens[i].text
+            i += 1
+            if i < len(self.tokens) and self.tokens[i].type == K.LANGLE:
+                i = self._skip_angles(i)
+            while i < len(self.tokens) and self.tokens[i].type == K.QUEST:
+                i += 1
+            if i < len(self.tokens) and self.tokens[i].type == K.DOT:
+                i += 1
+            else:
+                break
+        return name
+
+    def _is_class_level(self):
+        """Mirror KotlinListener._is_class_level_property on the frame stack."""
+        for frame in reversed(self.frames):
+            if frame.kind == "block":
+                return False
+            if frame.kind == "members":
+                return True
+        return False
+
+    def _is_enum_body(self, index):
+        """Check whether the class body opening at ``index`` parses as an enum body."""
+        i = self._next_significant(index)
+        token = self._at(i)
+        if token is None or token.type == K.RCURL:
+            return False
+        if token.type == K.SEMICOLON:
+            return True
+        while token is not None and (
+            token.type in MODIFIER_TOKENS or token.type in ANNOTATION_START_TOKENS
+        ):
+            i = self._next_significant(i)
+            token = self._at(i)
+        return token is not None and token.type not in MEMBER_KEYWORDS
+
+    def _open_brace(self, index, token):
+        frame = self.frames[-1]
+        depth = len(self.groups)
+        kind = "lambda"
+        is_class = False
+
+        if token.type != K.LCURL:
+            pass
+        elif depth == frame.depth and frame.entries:
+            # Body of an enum entry
+            kind = "members"
+        elif depth == frame.depth and frame.pending:
+            pending = frame.pending.pop()
+            if pending["kind"] == "class":
+                is_class = True
+                kind = "enum" if self._is_enum_body(index) else "members"
+                if kind == "enum":
+                    self._mark_enum()
+            elif pending["kind"] == "object":
+                kind = "members"
+            else:
+                kind = "block"
+        else:
+            previous = self._previous_significant(index)
+            if previous is not None and (
+                previous.type in BLOCK_KEYWORDS
+                or previous.type == K.RPAREN
+                and self.last_group_opener in BLOCK_HEADER_KEYWORDS
+            ):
+                kind = "block"
+
+        frame.modifiers = []
+        frame.modifiers_start = None
+        frame.annotation = None
+        frame.after_newline = False
+        frame.last_type = token.type
+        frame.expect_entry = False
+
+        self.frames.append(_Frame(kind, depth, is_class))
+
+    def _cancel_pending(self, frame):
+        """Close declarations that turned out to have no body."""
+        while frame.pending:
+            if frame.pending.pop()["kind"] == "class":
+                self._exit_class()
+        if self.class_params is not None and self.class_params["frame"] is frame:
+            self.class_params = None
+
+    def _close_frame(self):
+        frame = self.frames.pop()
+        self._cancel_pending(frame)
+        if frame.is_class:
+            self._exit_class()
+        if not self.frames:
+            if frame.kind != "root":
+                self.frames.append(_Frame("root", 0))
+            return
+        parent = self.frames[-1]
+        parent.after_newline = False
+        parent.last_type = K.RCURL
+        if parent.kind == "enum" and parent.entries:
+            parent.expect_entry = False
+
+
+def extract_kotlin_declarations(tokens, comments):
+    """
+    Extract class information from Kotlin tokens without building a parse tree.
+
+    Args:
+        tokens (list): All tokens of the file, including hidden ones.
+        comments (list): (text, line) pairs of the file's comments.
+
+    Returns:
+        list: A list of dictionaries containing class information.
+    """
+    return KotlinTokenExtractor(None, comments).extract(tokens)
@@ -0,0 +1,26 @@
+from collections import Counter
+
+# Per-process counters describing how files were parsed, e.g. how many
+# needed the full-LL fallback. Workers reset these before every file and
+# ship a snapshot back so the parent can aggregate them per run.
+parse_stats = Counter()
+
+
+def record_parse_stat(key, amount=1):
+    """Increment the counter stored under ``key``."""
+    parse_stats[key] += amount
+
+
+def reset_parse_stats():
+    """Clear all counters of the current process."""
+    parse_stats.clear()
+
+
+def snapshot_parse_stats():
+    """
+    Return a copy of the counters of the current process.
+
+    Returns:
+        Counter: Independent copy that is safe to pickle and merge.
+    """
+    return Counter(parse_stats)
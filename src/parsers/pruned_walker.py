@@ -0,0 +1,77 @@
+from bisect import bisect_right
+from antlr4 import ParseTreeWalker
+from antlr4.Token import Token
+from antlr4.tree.Tree import ErrorNode, TerminalNode
+
+
+def token_positions(tokens, token_types):
+    """
+    Return the indexes of the default-channel tokens of the given types.
+
+    Args:
+        tokens (list): All tokens of the file, as held by the token stream.
+        token_types (set): Token types to look for.
+
+    Returns:
+        list: Ascending token indexes.
+    """
+    return [
+        token.tokenIndex
+        for token in tokens
+        if token.type in token_types and token.channel == Token.DEFAULT_CHANNEL
+    ]
+
+
+class PrunedTreeWalker(ParseTreeWalker):
+    """
+    ParseTreeWalker that skips code subtrees holding no declarations.
+
+    Listeners extracting declarations have no use for the statements and
+    expressions of method bodies and initializers, which make up most of a
+    parse tree, except where a local or anonymous class is declared inside
+    them. A subtree of one of the prunable rules is skipped, without any
+    enter or exit events, unless a token that may start such a declaration
+    lies within its tokens.
+
+    Attributes:
+        visited (int): Nodes walked, rules and terminals.
+        pruned (int): Subtrees skipped.
+    """
+
+    def __init__(self, prunable):
+        """
+        Args:
+            prunable (dict): Maps the rule index of each prunable rule to the
+                ascending token indexes that keep its subtrees walked.
+        """
+        self.prunable = prunable
+        self.visited = 0
+        self.pruned = 0
+
+    def walk(self, listener, t):
+        self.visited += 1
+        if isinstance(t, ErrorNode):
+            listener.visitErrorNode(t)
+            return
+        if isinstance(t, TerminalNode):
+            listener.visitTerminal(t)
+            return
+
+        positions = self.prunable.get(t.getRuleIndex())
+        if positions is not None and self._skippable(t, positions):
+            self.pruned += 1
+            return
+
+        self.enterRule(listener, t)
+        for child in t.getChildren():
+            self.walk(listener, child)
+        self.exitRule(listener, t)
+
+    def _skippable(self, ctx, positions):
+        """Check that no token of ``positions`` lies within ``ctx`` past its start."""
+        if ctx.start is None or ctx.stop is None:
+            return False
+        # A block or expression never starts a declaration with its own first
+        # token, e.g. a method body brace is not an anonymous class body
+        index = bisect_right(positions, ctx.start.tokenIndex)
+        return index == len(positions) or positions[index] > ctx.stop.tokenIndex
@@ -0,0 +1,58 @@
+from bisect import bisect_right
+from antlr4 import CommonTokenStream
+from antlr4.ListTokenSource import ListTokenSource
+
+
+def collapse_bodies(tokens, bodies, keep):
+    """
+    Drop the tokens inside method and function bodies before parsing.
+
+    Only the braces of each body stay, so the parser sees an empty body and
+    builds the declaration skeleton of the file without any statements. A
+    body is kept as it is if a token of ``keep``, which may start a
+    declaration the listener records, lies inside it.
+
+    Args:
+        tokens (list): All tokens of the file, as held by the token stream.
+        bodies (list): (open, close) token indexes of the braces of each body.
+        keep (list): Ascending token indexes that keep a body parsed.
+
+    Returns:
+        tuple: The remaining tokens and the number of bodies collapsed.
+    """
+    collapsed = []
+    for start, stop in sorted(bodies):
+        if collapsed and stop < collapsed[-1][1]:
+            # Nested in a body that is already gone
+            continue
+        index = bisect_right(keep, start)
+        if index == len(keep) or keep[index] >= stop:
+            collapsed.append((start, stop))
+    if not collapsed:
+        return tokens, 0
+
+    remaining = []
+    position = 0
+    for start, stop in collapsed:
+        remaining.extend(tokens[position : start + 1])
+        position = stop
+    remaining.extend(tokens[position:])
+    return remaining, len(collapsed)
+
+
+def skeleton_stream(tokens):
+    """
+    Return a filled token stream over the tokens left by collapse_bodies.
+
+    Tokens are renumbered in their new order, so token indexes taken from
+    the original stream no longer apply.
+
+    Args:
+        tokens (list): Tokens ending with EOF.
+
+    Returns:
+        CommonTokenStream: The stream to parse.
+    """
+    stream = CommonTokenStream(ListTokenSource(tokens))
+    stream.fill()
+    return stream
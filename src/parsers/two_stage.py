@@ -0,0 +1,109 @@
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.DiagnosticErrorListener import DiagnosticErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+from .dfa_cache import dfa_state_count
+from .parse_stats import record_parse_stat
+
+# Whether the files of a language are parsed with SLL first. The Kotlin grammar
+# needs full-context prediction for common constructs (companion objects,
+# extension receivers), so SLL fails on most Kotlin files and would only add
+# a wasted pass before the LL one.
+TWO_STAGE = {"java": True, "kotlin": False}
+
+
+def parse_two_stage(parser, start_rule, language, on_fallback=None):
+    """
+    Run a start rule with fast SLL prediction, falling back to full LL on failure.
+
+    SLL prediction with a bail-out error strategy succeeds for almost every
+    real source file and produces the same tree LL would. Only when it hits
+    a syntax error (a real one, or an SLL-only conflict) is the token stream
+    rewound and parsed again in the default LL mode with error recovery.
+    Languages disabled in ``TWO_STAGE`` are parsed in LL mode right away.
+
+    Args:
+        parser (Parser): Parser whose token stream is already attached.
+        start_rule (str): Name of the rule method to invoke, e.g. "compilationUnit".
+        language (str): Prefix of the parse_stats counters, e.g. "java".
+        on_fallback (callable): Called before the LL parse, e.g. to replace
+            parse listeners that saw the failed SLL attempt.
+
+    Returns:
+        ParserRuleContext: The parse tree returned by the start rule.
+    """
+    states_before = dfa_state_count(parser)
+    try:
+        return _parse_sll_then_ll(parser, start_rule, language, on_fallback)
+    finally:
+        # DFA states built for this file, i.e. adaptive-prediction warm-up cost
+        states_added = dfa_state_count(parser) - states_before
+        if states_added:
+            record_parse_stat(f"{language}.dfa_states_added", states_added)
+
+
+def listen_two_stage(parser, start_rule, language, create_listener):
+    """
+    Run parse_two_stage notifying a parse listener instead of building a tree.
+
+    The listener receives the enter and exit events of each rule as the
+    parser runs it. With ``buildParseTrees`` disabled, contexts are not
+    attached to their parents and become garbage once their rule returns,
+    so memory no longer grows with the size of the file. A new listener is
+    created for the LL parse if the SLL one fails.
+
+    Args:
+        parser (Parser): Parser whose token stream is already attached.
+        start_rule (str): Name of the rule method to invoke, e.g. "compilationUnit".
+        language (str): Prefix of the parse_stats counters, e.g. "java".
+        create_listener (callable): Returns a new ParseTreeListener.
+
+    Returns:
+        ParseTreeListener: The listener of the parse that succeeded.
+    """
+    listener = create_listener()
+    parser.buildParseTrees = False
+    parser.addParseListener(listener)
+
+    def restart():
+        nonlocal listener
+        parser.removeParseListener(listener)
+        listener = create_listener()
+        parser.addParseListener(listener)
+
+    parse_two_stage(parser, start_rule, language, on_fallback=restart)
+    return listener
+
+
+def _parse_sll_then_ll(parser, start_rule, language, on_fallback=None):
+    if not TWO_STAGE.get(language, True):
+        record_parse_stat(f"{language}.ll")
+        return _parse_ll(parser, start_rule)
+
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.SLL
+    try:
+        tree = getattr(parser, start_rule)()
+        record_parse_stat(f"{language}.sll")
+        return tree
+    except ParseCancellationException:
+        record_parse_stat(f"{language}.ll_fallback")
+
+    # Rewind and parse again with full-context prediction and error recovery.
+    # Parser.reset() fails while parse listeners are registered.
+    listeners = parser._parseListeners
+    parser._parseListeners = None
+    parser.reset()
+    parser._parseListeners = listeners
+    if on_fallback is not None:
+        on_fallback()
+    return _parse_ll(parser, start_rule)
+
+
+def _parse_ll(parser, start_rule):
+    parser.removeErrorListeners()
+    parser.addErrorListener(DiagnosticErrorListener())
+    parser._errHandler = DefaultErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.LL
+    return getattr(parser, start_rule)()
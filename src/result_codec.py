@@ -0,0 +1,157 @@
+import marshal
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Class keys whose values are lists of {"name", "comment"} members
+MEMBER_LISTS = {
+    "constants",
+    "methods",
+    "companion_objects",
+    "properties",
+    "enum_values",
+}
+
+
+def encode_class_info(class_info: Optional[List[Dict]]):
+    """
+    Convert class information to a compact tuple form for the pool pipe.
+
+    Dict keys are sent once per distinct key layout instead of once per
+    record: each class becomes a row ``(layout index, value, ...)`` and each
+    member list a flat ``(name, comment, name, comment, ...)`` tuple. Rows
+    can be read with ``iter_classes`` without rebuilding any dicts.
+
+    Args:
+        class_info (list): Class dictionaries as returned by a parser, or None.
+
+    Returns:
+        tuple: (layouts, rows); an empty tuple if there are no classes, None
+        if ``class_info`` is None.
+    """
+    if class_info is None:
+        return None
+    if not class_info:
+        return ()
+    layouts = {}
+    rows = []
+    for class_data in class_info:
+        layout = tuple(class_data)
+        index = layouts.setdefault(layout, len(layouts))
+        row = [index]
+        for key, value in class_data.items():
+            if key in MEMBER_LISTS:
+                row.append(
+                    tuple(
+                        field
+                        for member in value
+                        for field in (member["name"], member["comment"])
+                    )
+                )
+            elif isinstance(value, list):
+                row.append(tuple(value))
+            else:
+                row.append(value)
+        rows.append(tuple(row))
+    return tuple(layouts), tuple(rows)
+
+
+def decode_class_info(encoded) -> Optional[List[Dict]]:
+    """
+    Rebuild class dictionaries from ``encode_class_info`` output.
+
+    Args:
+        encoded (tuple): (layouts, rows), an empty tuple, or None.
+
+    Returns:
+        list: Class dictionaries equal to the encoded ones, or None.
+    """
+    if encoded is None:
+        return None
+    if not encoded:
+        return []
+    layouts, rows = encoded
+    class_info = []
+    for row in rows:
+        class_data = {}
+        for key, value in zip(layouts[row[0]], row[1:]):
+            if key in MEMBER_LISTS:
+                class_data[key] = [
+                    {"name": value[i], "comment": value[i + 1]}
+                    for i in range(0, len(value), 2)
+                ]
+            elif isinstance(value, tuple):
+                class_data[key] = list(value)
+            else:
+                class_data[key] = value
+        class_info.append(class_data)
+    return class_info
+
+
+def iter_classes(encoded, *keys):
+    """
+    Yield selected fields of every encoded class without building dicts.
+
+    Args:
+        encoded (tuple): ``encode_class_info`` output with at least one class.
+        *keys (str): Class keys to read, e.g. "name", "methods".
+
+    Yields:
+        tuple: The values of ``keys`` for one class. Member lists are flat
+        ``(name, comment, ...)`` tuples.
+    """
+    layouts, rows = encoded
+    positions = [tuple(layout.index(key) + 1 for key in keys) for layout in layouts]
+    for row in rows:
+        yield tuple(row[i] for i in positions[row[0]])
+
+
+def iter_members(members):
+    """Yield (name, comment) pairs of a flat encoded member list."""
+    return zip(members[::2], members[1::2])
+
+
+def encode_results(results: List[tuple], rendered: bool = False) -> bytes:
+    """
+    Pack a worker's per-file results into one bytes object.
+
+    The payload uses marshal, which is fast and compact but tied to the
+    interpreter version; the pool parent and its workers always share one.
+
+    Args:
+        results (list): (formatted_path, class_info, error, parse_stats) tuples.
+        rendered (bool): The class_info fields already hold rendered output
+            made of marshal-able values and are packed as they are.
+
+    Returns:
+        bytes: The packed results.
+    """
+    return marshal.dumps(
+        [
+            (
+                formatted_path,
+                class_info if rendered else encode_class_info(class_info),
+                error,
+                tuple(stats.items()),
+            )
+            for formatted_path, class_info, error, stats in results
+        ]
+    )
+
+
+def decode_results(payload: bytes) -> List[tuple]:
+    """
+    Unpack ``encode_results`` output.
+
+    Class information stays in its encoded form; read it with
+    ``iter_classes`` or turn it back into dicts with ``decode_class_info``.
+
+    Args:
+        payload (bytes): The packed results.
+
+    Returns:
+        list: (formatted_path, encoded class_info, error, parse_stats) tuples.
+    """
+    return [
+        (formatted_path, encoded, error, Counter(dict(stats)))
+        for formatted_path, encoded, error, stats in marshal.loads(payload)
+    ]
@@ -0,0 +1,112 @@
+import json
+import os
+from typing import List, Dict
+from loguru import logger
+
+MANIFEST_VERSION = 3
+
+
+class ShardManifest:
+    """
+    Records which source files were written to which Markdown shard.
+
+    The manifest is saved next to the shards as ``{base}.manifest.json``. On an
+    incremental run the recorded size and mtime of every source are compared
+    against the tree, and only shards containing a changed or deleted source
+    are rewritten. New sources are appended to the last shard.
+    """
+
+    def __init__(self, path: str, settings: Dict):
+        self.path = path
+        self.settings = settings
+        # [[shard filename, [formatted_path, ...]], ...] in shard order
+        self.shards: List[List] = []
+        # formatted_path -> [size, mtime_ns]
+        self.sources: Dict[str, List[int]] = {}
+        # Per-shard statistics in shard order, see save_shard_stats
+        self.stats: List[Dict] = []
+
+    @classmethod
+    def load(cls, path: str, settings: Dict) -> "ShardManifest":
+        """
+        Load a manifest, or return an empty one if it is missing or was written
+        with different settings (which forces a full regeneration).
+        """
+        manifest = cls(path, settings)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+
+        if data.get("settings") != settings:
+            logger.info("Output settings or parser version changed since last run")
+            return manifest
+
+        manifest.shards = data["shards"]
+        manifest.sources = data["sources"]
+        manifest.stats = data["stats"]
+        return manifest
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "settings": self.settings,
+                    "shards": self.shards,
+                    "sources": self.sources,
+                    "stats": self.stats,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+
+    def changed_shards(
+        self, current: Dict[str, List[int]]
+    ) -> tuple[List[int], List[str]]:
+        """
+        Compare the recorded sources with the current tree.
+
+        Args:
+            current (dict): formatted_path -> [size, mtime_ns] of every source now on disk.
+
+        Returns:
+            tuple: Indices of the shards to rewrite in ascending order, and the
+            sorted sources not assigned to any shard yet.
+        """
+        changed = {
+            path for path, stat in self.sources.items() if current.get(path) != stat
+        }
+        new_sources = sorted(path for path in current if path not in self.sources)
+
+        rewrite = [
+            index
+            for index, (_, sources) in enumerate(self.shards)
+            if any(source in changed for source in sources)
+        ]
+        # New sources go to the tail shard, which may then split into new shards
+        last_index = len(self.shards) - 1
+        if new_sources and (not rewrite or rewrite[-1] != last_index):
+            rewrite.append(last_index)
+        return rewrite, new_sources
+
+
+def save_shard_stats(path: str, stats: List[Dict]):
+    """
+    Write the per-shard statistics tracked by the Markdown writer.
+
+    Args:
+        path (str): Destination, ``{base}.shards.json`` next to the shards.
+        stats (list): One {"file", "lines", "bytes", "tokens", "classes",
+            "files"} dict per shard, in shard order.
+    """
+    totals = {
+        key: sum(shard[key] for shard in stats)
+        for key in ("lines", "bytes", "tokens", "classes", "files")
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"shards": stats, "totals": totals}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
@@ -0,0 +1,322 @@
+import argparse
+import json
+import math
+import re
+import sqlite3
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List
+from output_writers import (
+    IDENTIFIER_WORD,
+    NAME_SEARCH_WEIGHTS,
+    SEARCH_WEIGHTS,
+    name_trigrams,
+    read_array,
+)
+
+SEARCH_FIELDS = ("kind", "path", "class", "name", "comment")
+# Share of the query trigrams a name needs to be a typo-tolerant match
+FUZZY_OVERLAP = 0.5
+# Most names scored per candidate route, and names read per prefix range
+MAX_CANDIDATES = 200
+PREFIX_CANDIDATES = 200
+
+
+def match_expression(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching every word as a prefix.
+
+    Args:
+        query (str): Words to look for, e.g. "general settings".
+
+    Returns:
+        str: The MATCH expression, or "" if the query has no words.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_symbols(
+    index_path: str, query: str, limit: int = 20, raw: bool = False
+) -> List[Dict]:
+    """
+    Find classes and members matching ``query`` in a search index.
+
+    Symbols whose names match every word come first, ranked with BM25 over
+    their name columns alone, so a long comment does not push a class below
+    similar ones. The other matches follow, ranked with BM25 over all
+    columns, weighting names above class names and comments. Raw queries
+    are only ranked over all columns, as they may filter on any of them.
+
+    Args:
+        index_path (str): A ``{base_output_file}.search.db`` index.
+        query (str): Free text; every word must match a name, camel-hump
+            word or comment word by prefix.
+        limit (int): Maximum number of matches.
+        raw (bool): Pass ``query`` to FTS5 unchanged, allowing its query
+            syntax such as OR, NEAR and column filters.
+
+    Returns:
+        list: Dictionaries with kind, path (the formatted_path of the source
+        file), class, name, comment and score (BM25 over all columns, lower
+        is better), best match first.
+    """
+    expression = query if raw else match_expression(query)
+    if not expression:
+        return []
+    weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
+    name_weights = ", ".join(str(weight) for weight in NAME_SEARCH_WEIGHTS)
+    select = (
+        f"SELECT kind, path, class, name, comment, bm25(symbols, {weights}) "
+        "AS score FROM symbols"
+    )
+    if raw:
+        sql = f"{select} WHERE symbols MATCH ? ORDER BY score LIMIT ?"
+        parameters = (expression, limit)
+    else:
+        sql = (
+            f"{select} LEFT JOIN (SELECT rowid, bm25(symbol_names, {name_weights}) "
+            "AS score FROM symbol_names WHERE symbol_names MATCH ?) AS names "
+            "ON names.rowid = symbols.rowid WHERE symbols MATCH ? "
+            "ORDER BY names.score IS NULL, names.score, score LIMIT ?"
+        )
+        parameters = (expression, expression, limit)
+    connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(sql, parameters).fetchall()
+    finally:
+        connection.close()
+    return [dict(zip(SEARCH_FIELDS + ("score",), row)) for row in rows]
+
+
+def _camel_start(humps: List[str], words: List[str]) -> int:
+    """Return the word where ``humps`` prefix consecutive words, or -1."""
+    for start in range(len(words) - len(humps) + 1):
+        if all(words[start + i].startswith(hump) for i, hump in enumerate(humps)):
+            return start
+    return -1
+
+
+def score_name(query: str, humps: List[str], query_trigrams: set, name: str) -> float:
+    """
+    Rate how well ``name`` matches a lookup query, higher is better.
+
+    Exact matches score 4, prefixes 3 to 4, camel-hump matches 2 to 3,
+    substrings 1.5 to 2, and other names the Dice coefficient of their
+    trigrams with the query, below 1.
+
+    Args:
+        query (str): The lowercase query without separators.
+        humps (list): The lowercase camel-hump words of the query.
+        query_trigrams (set): The trigrams of ``query``.
+        name (str): A class or member name.
+
+    Returns:
+        float: The score.
+    """
+    lower = name.lower()
+    coverage = len(query) / len(lower)
+    if lower == query:
+        return 4.0
+    if lower.startswith(query):
+        return 3.0 + coverage
+    words = [word.lower() for word in IDENTIFIER_WORD.findall(name)]
+    start = _camel_start(humps, words) if humps else -1
+    if start >= 0:
+        return 2.0 + (0.5 if start == 0 else 0.0) + coverage / 2
+    if query in lower:
+        return 1.5 + coverage / 2
+    trigrams = name_trigrams(lower)
+    if not trigrams or not query_trigrams:
+        return 0.0
+    return 2 * len(trigrams & query_trigrams) / (len(trigrams) + len(query_trigrams))
+
+
+def _read_names(connection, name_ids) -> List[tuple]:
+    return connection.execute(
+        "SELECT name, occurrences, id FROM names WHERE id IN "
+        "(SELECT value FROM json_each(?))",
+        (json.dumps(list(name_ids)),),
+    ).fetchall()
+
+
+def _contains(ids, name_id: int) -> bool:
+    position = bisect_left(ids, name_id)
+    return position < len(ids) and ids[position] == name_id
+
+
+def _all_of(posting_lists: List, limit: int) -> List[int]:
+    """Return the first ``limit`` ids found in every ascending posting list."""
+    posting_lists = sorted(posting_lists, key=len)
+    found = []
+    for name_id in posting_lists[0]:
+        if all(_contains(ids, name_id) for ids in posting_lists[1:]):
+            found.append(name_id)
+            if len(found) >= limit:
+                break
+    return found
+
+
+def _most_of(posting_lists: List, min_overlap: int, limit: int) -> List[int]:
+    """Return up to ``limit`` ids sharing the most of ``min_overlap`` lists."""
+    # An id in min_overlap lists is in one of the len - min_overlap + 1 shortest
+    posting_lists = sorted(posting_lists, key=len)
+    counts = Counter()
+    for ids in posting_lists[: len(posting_lists) - min_overlap + 1]:
+        counts.update(ids)
+    return [name_id for name_id, _ in counts.most_common(limit)]
+
+
+def find_names(
+    index_path: str, query: str, limit: int = 10, locations: int = 3
+) -> List[Dict]:
+    """
+    Look up class and member names by prefix, camel humps or similarity.
+
+    "GenSet" finds ``GeneralSettings`` through its camel humps and
+    "GeneralSetings" finds it through shared trigrams. Candidates come from
+    the prefix range of the query and from the names holding every posting
+    key of its humps; only if these give fewer than ``limit`` good matches
+    are names sharing ``FUZZY_OVERLAP`` of its trigrams considered too. At
+    most ``MAX_CANDIDATES`` names per route, shortest first, are read from
+    the index and scored with ``score_name``.
+
+    Args:
+        index_path (str): A ``{base_output_file}.names.db`` index.
+        query (str): A full, partial or camel-hump name.
+        limit (int): Maximum number of names returned.
+        locations (int): Maximum locations listed per name.
+
+    Returns:
+        list: Dictionaries with name, score, occurrences and locations (kind,
+        path and class of up to ``locations`` declarations), best first.
+    """
+    humps = [word.lower() for word in IDENTIFIER_WORD.findall(query)]
+    lower = "".join(humps)
+    if not lower:
+        return []
+    query_trigrams = name_trigrams(lower)
+    if len(humps) > 1:
+        camel_keys = {
+            f"~{first[:2]}|{second[:2]}" for first, second in zip(humps, humps[1:])
+        }
+    else:
+        camel_keys = {"~" + lower[:2]}
+    camel_keys.update(*(name_trigrams(hump) for hump in humps))
+
+    connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        postings = {
+            key: read_array(ids, 0, len(ids) // 4)
+            for key, ids in connection.execute(
+                "SELECT key, ids FROM postings WHERE key IN "
+                "(SELECT value FROM json_each(?))",
+                (json.dumps(sorted(camel_keys | query_trigrams)),),
+            )
+        }
+        candidates = [
+            name_id
+            for (name_id,) in connection.execute(
+                "SELECT id FROM names WHERE lower >= ? AND lower < ? LIMIT ?",
+                (lower, lower + "\uffff", PREFIX_CANDIDATES),
+            )
+        ]
+        candidates += _all_of(
+            [postings.get(key, ()) for key in camel_keys], MAX_CANDIDATES
+        )
+        scored = {}
+        for name, occurrences, name_id in _read_names(connection, set(candidates)):
+            score = score_name(lower, humps, query_trigrams, name)
+            scored[name_id] = (-score, -occurrences, len(name), name, name_id)
+
+        good = sum(1 for entry in scored.values() if entry[0] <= -1.5)
+        if good < limit and len(query_trigrams) > 1:
+            min_overlap = math.ceil(len(query_trigrams) * FUZZY_OVERLAP)
+            similar = _most_of(
+                [postings.get(key, ()) for key in query_trigrams],
+                min_overlap,
+                MAX_CANDIDATES,
+            )
+            unscored = [name_id for name_id in similar if name_id not in scored]
+            for name, occurrences, name_id in _read_names(connection, unscored):
+                score = score_name(lower, humps, query_trigrams, name)
+                if score > 0:
+                    scored[name_id] = (-score, -occurrences, len(name), name, name_id)
+
+        matches = []
+        for score, occurrences, _, name, name_id in sorted(scored.values())[:limit]:
+            rows = connection.execute(
+                "SELECT kind, path, class FROM locations WHERE name_id = ? LIMIT ?",
+                (name_id, locations),
+            )
+            matches.append(
+                {
+                    "name": name,
+                    "score": -score,
+                    "occurrences": -occurrences,
+                    "locations": [
+                        dict(zip(("kind", "path", "class"), row)) for row in rows
+                    ],
+                }
+            )
+    finally:
+        connection.close()
+    return matches
+
+
+def _print_search(args):
+    start = time.perf_counter()
+    matches = search_symbols(args.index, args.query, args.limit, args.raw)
+    elapsed = time.perf_counter() - start
+    for match in matches:
+        comment = match["comment"].replace("\n", " ").strip()
+        symbol = match["class"]
+        if match["kind"] != "class":
+            symbol = f"{symbol}.{match['name']}"
+        print(f"{match['kind']:<16} {match['path']}  {symbol}")
+        if comment:
+            print(f"{'':<16} {comment[:120]}")
+    print(f"{len(matches)} matches in {elapsed * 1000:.1f} ms")
+
+
+def _print_names(args):
+    start = time.perf_counter()
+    matches = find_names(args.index, args.query, args.limit)
+    elapsed = time.perf_counter() - start
+    for match in matches:
+        print(f"{match['score']:5.2f}  {match['name']}  ({match['occurrences']}x)")
+        for location in match["locations"]:
+            print(f"       {location['kind']:<16} {location['path']}")
+    print(f"{len(matches)} names in {elapsed * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search the API symbols indexed by process_directory."
+    )
+    parser.add_argument(
+        "index",
+        help="A {base_output_file}.search.db index, or a .names.db index with "
+        "--names",
+    )
+    parser.add_argument("query", help="Words to search for, or a name with --names")
+    parser.add_argument("-n", "--limit", type=int, default=20)
+    parser.add_argument(
+        "--raw", action="store_true", help="Use FTS5 query syntax as it is"
+    )
+    parser.add_argument(
+        "--names",
+        action="store_true",
+        help="Fuzzy name lookup by prefix, camel humps or similarity",
+    )
+    args = parser.parse_args()
+
+    if args.names:
+        _print_names(args)
+    else:
+        _print_search(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+from typing import Dict, Iterable, Iterator, List
+from loguru import logger
+
+CHUNK_POLICIES = ("size", "fixed", "single")
+
+
+def _file_size(full_path: str) -> int:
+    try:
+        return os.path.getsize(full_path)
+    except OSError:
+        return 0
+
+
+def plan_chunks(
+    files_to_process: List[tuple],
+    policy: str = "size",
+    chunk_bytes: int = 256 * 1024,
+    chunk_files: int = 64,
+    min_chunks: int = 1,
+) -> List[List[tuple]]:
+    """
+    Group files into pool tasks, largest files first.
+
+    Dispatching the largest files first keeps a few huge files (generated
+    parsers, big test fixtures) from being picked up last and leaving a single
+    worker busy at the end of the run. Batching small files amortizes the
+    per-task IPC cost of the pool.
+
+    Args:
+        files_to_process (list): (full_path, source_dir) tuples.
+        policy (str): "size" packs files into tasks of about ``chunk_bytes``,
+            with files at least that large running alone; "fixed" puts
+            ``chunk_files`` files in every task; "single" sends one file per
+            task in discovery order, as a plain imap over the files would.
+        chunk_bytes (int): Target source bytes per task for the "size" policy.
+        chunk_files (int): Maximum files per task.
+        min_chunks (int): Shrink chunks on small trees so there are at least
+            this many tasks, which keeps every worker busy.
+
+    Returns:
+        list: Lists of (full_path, source_dir) tuples, one per task.
+    """
+    if policy not in CHUNK_POLICIES:
+        raise ValueError(
+            f"Unknown chunk policy {policy!r}, expected one of {CHUNK_POLICIES}"
+        )
+    if policy == "single":
+        return [[task] for task in files_to_process]
+
+    sized = sorted(
+        ((_file_size(task[0]), task) for task in files_to_process),
+        key=lambda item: item[0],
+        reverse=True,
+    )
+    if policy == "fixed":
+        chunk_files = max(1, min(chunk_files, -(-len(sized) // min_chunks)))
+        return [
+            [task for _, task in sized[i : i + chunk_files]]
+            for i in range(0, len(sized), chunk_files)
+        ]
+
+    total_bytes = sum(size for size, _ in sized)
+    chunk_bytes = min(chunk_bytes, total_bytes // min_chunks)
+    chunks = []
+    chunk, chunk_size = [], 0
+    for size, task in sized:
+        if chunk and (chunk_size + size > chunk_bytes or len(chunk) >= chunk_files):
+            chunks.append(chunk)
+            chunk, chunk_size = [], 0
+        chunk.append(task)
+        chunk_size += size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def stream_chunks(
+    files: Iterable[tuple],
+    policy: str = "size",
+    chunk_bytes: int = 256 * 1024,
+    chunk_files: int = 64,
+    min_chunks: int = 1,
+    max_window: int = 4096,
+) -> Iterator[List[tuple]]:
+    """
+    Plan pool tasks over a stream of files without materializing it.
+
+    Files are collected into windows that start small, so the first tasks
+    are dispatched as soon as a few files are found, and double up to
+    ``max_window`` files. Each window is planned with ``plan_chunks``, so
+    large files go first within their window rather than across the tree.
+
+    Args:
+        files (iterable): (full_path, source_dir) tuples, e.g. from discovery.
+        policy (str): See ``plan_chunks``; "single" forwards every file as
+            soon as it arrives.
+        chunk_bytes (int): Target source bytes per task for the "size" policy.
+        chunk_files (int): Maximum files per task.
+        min_chunks (int): Minimum number of tasks per window.
+        max_window (int): Largest number of files planned together.
+
+    Yields:
+        list: (full_path, source_dir) tuples of one task.
+    """
+    if policy == "single":
+        for task in files:
+            yield [task]
+        return
+
+    window = min(256, max_window)
+    batch = []
+    for task in files:
+        batch.append(task)
+        if len(batch) >= window:
+            yield from plan_chunks(batch, policy, chunk_bytes, chunk_files, min_chunks)
+            batch = []
+            window = min(window * 2, max_window)
+    if batch:
+        yield from plan_chunks(batch, policy, chunk_bytes, chunk_files, min_chunks)
+
+
+def log_worker_balance(worker_busy: Dict[int, List[float]]):
+    """
+    Log how long each pool worker spent parsing, to show load balance.
+
+    Args:
+        worker_busy (dict): Worker pid -> [busy seconds, files parsed].
+    """
+    if not worker_busy:
+        return
+    for pid, (busy, files) in sorted(worker_busy.items()):
+        logger.info(f"Worker {pid}: busy {busy:.1f}s parsing {int(files)} files")
+    busy_times = [busy for busy, _ in worker_busy.values()]
+    longest = max(busy_times)
+    if longest:
+        logger.info(
+            f"Worker balance: {len(busy_times)} workers, busy "
+            f"{min(busy_times):.1f}s to {longest:.1f}s, "
+            f"mean/max {sum(busy_times) / len(busy_times) / longest:.2f}"
+        )
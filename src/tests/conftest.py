@@ -0,0 +1,32 @@
+import glob
+import os
+import sys
+import pytest
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARSERS_DIR = os.path.join(SRC_DIR, "parsers")
+
+# The top-level modules import each other by name, as when src/main.py runs
+sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture(scope="session")
+def test_data_results():
+    """
+    Return (formatted_path, class_info) for every parser test data file.
+
+    The files are parsed with the token engine, which is fast; the tests
+    using this only need realistic parser output, not a particular engine.
+    """
+    from directory_processor import format_source_path, load_language
+
+    results = []
+    pattern = os.path.join(PARSERS_DIR, "*", "tests", "test_data", "*")
+    for path in sorted(glob.glob(pattern)):
+        if not path.endswith((".java", ".kt")):
+            continue
+        parse, _ = load_language("java" if path.endswith(".java") else "kotlin")
+        with open(path, encoding="utf-8") as f:
+            class_info = parse(f.read(), engine="tokens")
+        results.append((format_source_path(path, PARSERS_DIR), class_info))
+    return results
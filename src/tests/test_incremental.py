@@ -0,0 +1,212 @@
+import json
+import os
+import pytest
+import directory_processor
+from directory_processor import estimate_tokens, process_directory
+
+BASE = "docs"
+# Room for the introduction and two sections of write_source classes
+MAX_BYTES = 480
+
+
+def write_source(source_dir, name, methods=("load", "save", "reset")):
+    """Write a Java class ``name`` with one documented method per name."""
+    lines = ["package sample;", f"/** The {name} class */", f"public class {name} {{"]
+    for method in methods:
+        lines += [f"    /** Runs {method} */", f"    public void {method}() {{}}"]
+    lines.append("}")
+    path = source_dir / f"{name}.java"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    output = tmp_path / "output"
+    monkeypatch.setattr(directory_processor, "OUTPUT_DIR", str(output))
+    return output
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in ("Alpha", "Beta", "Gamma", "Delta", "Epsilon", "Zeta"):
+        write_source(source, name)
+    return source
+
+
+def run(source_dir, **kwargs):
+    kwargs.setdefault("max_lines", 30)
+    process_directory(str(source_dir), BASE, worker_num=1, incremental=True, **kwargs)
+
+
+def load_manifest(output_dir):
+    with open(output_dir / f"{BASE}.manifest.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shard_of(manifest, source_name):
+    """Return the file name of the shard holding ``source_name``."""
+    for filename, sources in manifest["shards"]:
+        if f"{source_name}.java" in sources:
+            return filename
+    raise AssertionError(f"{source_name} is in no shard")
+
+
+def age_shards(output_dir):
+    """Backdate every shard so rewritten ones are told apart by their mtime."""
+    for path in output_dir.glob(f"{BASE}-*.md"):
+        os.utime(path, ns=(0, 0))
+
+
+def rewritten_shards(output_dir):
+    return sorted(
+        path.name
+        for path in output_dir.glob(f"{BASE}-*.md")
+        if path.stat().st_mtime_ns != 0
+    )
+
+
+def section_paths(output_dir):
+    """Return the source paths of all sections, per shard in shard order."""
+    paths = []
+    for filename in sorted(os.listdir(output_dir)):
+        if filename.startswith(f"{BASE}-") and filename.endswith(".md"):
+            text = (output_dir / filename).read_text(encoding="utf-8")
+            paths += [line[3:] for line in text.splitlines() if line.startswith("## ")]
+    return paths
+
+
+def assert_within_limits(output_dir, max_bytes):
+    for filename, sources in load_manifest(output_dir)["shards"]:
+        if len(sources) > 1:
+            assert (output_dir / filename).stat().st_size <= max_bytes
+
+
+def test_edit_rewrites_only_its_shard(source_dir, output_dir):
+    run(source_dir)
+    manifest = load_manifest(output_dir)
+    assert len(manifest["shards"]) >= 3
+    age_shards(output_dir)
+
+    # Same number of lines, so the shard keeps its sources
+    write_source(source_dir, "Gamma", ("load", "save", "renamed"))
+    run(source_dir)
+
+    assert rewritten_shards(output_dir) == [shard_of(manifest, "Gamma")]
+    text = (output_dir / shard_of(manifest, "Gamma")).read_text(encoding="utf-8")
+    assert "| renamed |" in text
+    assert load_manifest(output_dir)["shards"] == manifest["shards"]
+
+
+def test_deleted_and_added_sources(source_dir, output_dir):
+    run(source_dir)
+    manifest = load_manifest(output_dir)
+    age_shards(output_dir)
+
+    (source_dir / "Beta.java").unlink()
+    write_source(source_dir, "Theta")
+    run(source_dir)
+
+    updated = load_manifest(output_dir)
+    assert "Beta.java" not in updated["sources"]
+    assert "Theta.java" in updated["sources"]
+    # New sources are appended to the tail shard
+    assert shard_of(updated, "Theta") == updated["shards"][-1][0]
+    rewritten = rewritten_shards(output_dir)
+    assert shard_of(manifest, "Beta") in rewritten
+    assert manifest["shards"][-1][0] in rewritten
+    remaining = ("Alpha", "Gamma", "Delta", "Epsilon", "Zeta", "Theta")
+    assert sorted(section_paths(output_dir)) == sorted(
+        f"{name}.java" for name in remaining
+    )
+
+
+def test_growing_shard_within_limits_is_rewritten_alone(source_dir, output_dir):
+    run(source_dir, max_lines=100000, max_bytes=MAX_BYTES)
+    manifest = load_manifest(output_dir)
+    age_shards(output_dir)
+
+    # The first shard has room for one more short method
+    name = manifest["shards"][0][1][0][: -len(".java")]
+    write_source(source_dir, name, ("load", "save", "reset", "x"))
+    run(source_dir, max_lines=100000, max_bytes=MAX_BYTES)
+
+    assert rewritten_shards(output_dir) == [manifest["shards"][0][0]]
+    assert_within_limits(output_dir, MAX_BYTES)
+
+
+def test_shard_outgrowing_limits_rebuilds_everything(source_dir, output_dir):
+    run(source_dir, max_lines=100000, max_bytes=MAX_BYTES)
+    manifest = load_manifest(output_dir)
+    assert len(manifest["shards"]) >= 3
+    age_shards(output_dir)
+
+    name = manifest["shards"][0][1][0][: -len(".java")]
+    write_source(source_dir, name, ("load", "save", "reset", "close", "open"))
+    run(source_dir, max_lines=100000, max_bytes=MAX_BYTES)
+
+    shards = sorted(path.name for path in output_dir.glob(f"{BASE}-*.md"))
+    assert rewritten_shards(output_dir) == shards
+    assert not list(output_dir.glob("*.partial*"))
+    assert_within_limits(output_dir, MAX_BYTES)
+    sources = load_manifest(output_dir)["sources"]
+    assert sorted(section_paths(output_dir)) == sorted(sources)
+
+
+def test_changed_settings_rebuild_everything(source_dir, output_dir):
+    run(source_dir)
+    age_shards(output_dir)
+
+    run(source_dir, max_lines=40)
+
+    shards = sorted(path.name for path in output_dir.glob(f"{BASE}-*.md"))
+    assert rewritten_shards(output_dir) == shards
+    assert load_manifest(output_dir)["settings"]["max_lines"] == 40
+
+
+def test_rebuild_removes_stale_shards(source_dir, output_dir):
+    run(source_dir)
+    assert (output_dir / f"{BASE}-3.md").exists()
+
+    run(source_dir, max_lines=1000)
+
+    assert [path.name for path in output_dir.glob(f"{BASE}-*.md")] == [f"{BASE}-1.md"]
+    assert len(section_paths(output_dir)) == 6
+
+
+def load_shard_stats(output_dir):
+    with open(output_dir / f"{BASE}.shards.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def assert_shard_stats_match(output_dir):
+    """Check ``{BASE}.shards.json`` against the shards and the manifest."""
+    stats = load_shard_stats(output_dir)
+    manifest = load_manifest(output_dir)
+    assert [shard["file"] for shard in stats["shards"]] == [
+        filename for filename, _ in manifest["shards"]
+    ]
+    for shard, (filename, sources) in zip(stats["shards"], manifest["shards"]):
+        data = (output_dir / filename).read_bytes()
+        assert shard["bytes"] == len(data)
+        assert shard["lines"] == data.count(b"\n")
+        assert shard["tokens"] == estimate_tokens(len(data))
+        assert shard["files"] == len(sources) == data.count(b"\n## ")
+        assert shard["classes"] == data.count(b"\n### Class: ")
+    for key, total in stats["totals"].items():
+        assert total == sum(shard[key] for shard in stats["shards"])
+
+
+def test_shard_stats_follow_regenerated_shards(source_dir, output_dir):
+    run(source_dir)
+    assert_shard_stats_match(output_dir)
+    first_stats = load_shard_stats(output_dir)
+
+    write_source(source_dir, "Gamma", ("load", "save", "a_much_longer_name"))
+    run(source_dir)
+
+    assert_shard_stats_match(output_dir)
+    stats = load_shard_stats(output_dir)
+    assert stats["totals"]["bytes"] > first_stats["totals"]["bytes"]
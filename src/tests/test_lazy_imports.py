@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prints the generated lexer and parser modules a fresh interpreter imported
+LIST_GRAMMARS = """
+import json, sys
+print(json.dumps(sorted(
+    name
+    for name in sys.modules
+    if name.startswith("parsers.") and name.endswith(("Lexer", "Parser"))
+)))
+"""
+
+
+def imported_grammars(script):
+    output = subprocess.run(
+        [sys.executable, "-c", script + LIST_GRAMMARS],
+        cwd=SRC_DIR,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", ["main", "directory_processor"])
+def test_import_loads_no_grammar(module):
+    assert imported_grammars(f"import {module}\n") == []
+
+
+def test_load_language_imports_only_its_grammar():
+    script = "import directory_processor\ndirectory_processor.load_language('java')\n"
+
+    assert imported_grammars(script) == [
+        "parsers.java.JavaLexer",
+        "parsers.java.JavaParser",
+    ]
+
+
+def test_existing_dfa_files_are_left_to_workers(tmp_path):
+    script = f"""
+import directory_processor
+for language in directory_processor.LANGUAGES:
+    path = directory_processor._dfa_path({str(tmp_path)!r}, language)
+    open(path, "wb").close()
+directory_processor.prepare_dfa({str(tmp_path)!r}, iter([]))
+"""
+
+    assert imported_grammars(script) == []
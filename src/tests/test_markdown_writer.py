@@ -0,0 +1,113 @@
+import os
+import pytest
+import directory_processor
+from directory_processor import (
+    MarkdownWriter,
+    _render_result,
+    estimate_tokens,
+    process_directory,
+    render_class_section,
+)
+from result_codec import encode_class_info
+
+MAX_BYTES = 2000
+MAX_TOKENS = 400
+MAX_LINES = 40
+
+
+def class_info(name, methods):
+    return [
+        {
+            "name": name,
+            "constants": [],
+            "methods": [
+                {"name": f"method{i}", "comment": f"Handles case {i} of {name}"}
+                for i in range(methods)
+            ],
+        }
+    ]
+
+
+# Section sizes vary, and Huge alone is larger than every cap
+SOURCES = [(f"Small{i}.java", class_info(f"Small{i}", 2 + i % 5)) for i in range(20)]
+SOURCES.insert(7, ("Huge.java", class_info("Huge", 80)))
+SOURCES.append(("HugeTail.java", class_info("HugeTail", 80)))
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(directory_processor, "OUTPUT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write_sources(writer, rendered):
+    for path, info in SOURCES:
+        if rendered:
+            writer.write_rendered(path, *_render_result(path, info))
+        else:
+            writer.write_encoded_class_info(path, encode_class_info(info))
+    writer.close()
+
+
+def read_shards(output_dir, writer):
+    return [
+        (output_dir / filename).read_text(encoding="utf-8")
+        for filename, _ in writer.shard_sources
+    ]
+
+
+@pytest.mark.parametrize("rendered", [False, True], ids=["encoded", "rendered"])
+@pytest.mark.parametrize(
+    "caps",
+    [{"max_bytes": MAX_BYTES}, {"max_tokens": MAX_TOKENS}, {"max_lines": MAX_LINES}],
+    ids=["bytes", "tokens", "lines"],
+)
+def test_shards_respect_caps_without_splitting_sections(output_dir, caps, rendered):
+    writer = MarkdownWriter("docs", **{"max_lines": 100000, **caps})
+    write_sources(writer, rendered)
+    shards = read_shards(output_dir, writer)
+
+    assert len(shards) > 2
+    for text, (_, sources), stats in zip(
+        shards, writer.shard_sources, writer.shard_stats
+    ):
+        size = len(text.encode("utf-8"))
+        assert stats["bytes"] == size
+        assert sources, "No shard may hold only the introduction"
+        if any(source.startswith("Huge") for source in sources):
+            # An oversized section gets a shard of its own
+            assert len(sources) == 1
+            continue
+        assert stats["lines"] < caps.get("max_lines", stats["lines"] + 1)
+        assert size <= caps.get("max_bytes", size)
+        assert estimate_tokens(size) <= caps.get("max_tokens", estimate_tokens(size))
+
+    for path, info in SOURCES:
+        section, _ = render_class_section(path, encode_class_info(info))
+        assert sum(section in text for text in shards) == 1, f"{path} was split"
+    assert [s for _, sources in writer.shard_sources for s in sources] == [
+        path for path, _ in SOURCES
+    ]
+
+
+def test_worker_rendering_matches_parent_rendering(tmp_path, monkeypatch):
+    source_dir = os.path.join(os.path.dirname(directory_processor.__file__), "parsers")
+    outputs = {}
+    for render_in_workers in (False, True):
+        output_dir = tmp_path / str(render_in_workers)
+        monkeypatch.setattr(directory_processor, "OUTPUT_DIR", str(output_dir))
+        # One worker, so results arrive in the same order both times
+        process_directory(
+            source_dir,
+            "docs",
+            max_lines=200,
+            worker_num=1,
+            engine="tokens",
+            render_in_workers=render_in_workers,
+        )
+        outputs[render_in_workers] = {
+            path.name: path.read_bytes() for path in output_dir.iterdir()
+        }
+
+    assert len([name for name in outputs[True] if name.endswith(".md")]) > 1
+    assert outputs[True] == outputs[False]
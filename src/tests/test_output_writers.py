@@ -0,0 +1,122 @@
+import json
+import sqlite3
+import pytest
+from output_writers import (
+    MEMBER_TABLES,
+    ColumnarWriter,
+    SYMBOL_COLUMNS,
+    create_writers,
+    iter_symbols,
+    pyarrow,
+    read_symbol_table,
+)
+from result_codec import encode_class_info
+
+
+def write_all(writers, results):
+    for path, class_info in results:
+        for writer in writers:
+            writer.write_encoded_class_info(path, encode_class_info(class_info))
+    for writer in writers:
+        writer.close()
+
+
+def read_columns(writer):
+    """Return the columns of a ColumnarWriter output, Parquet or not."""
+    if pyarrow is not None:
+        import pyarrow.parquet as parquet
+
+        return parquet.read_table(writer.path).to_pydict()
+    return read_symbol_table(writer.path)
+
+
+def expected_columns(results):
+    columns = {column: [] for column in SYMBOL_COLUMNS}
+    for path, class_info in results:
+        for symbol in iter_symbols(path, encode_class_info(class_info)):
+            for column, value in zip(SYMBOL_COLUMNS, symbol):
+                columns[column].append(value)
+    return columns
+
+
+def test_outputs_read_back(tmp_path, test_data_results):
+    results = [(path, info) for path, info in test_data_results if info]
+    jsonl, columnar = create_writers(("jsonl", "columnar"), "symbols", str(tmp_path))
+    write_all([jsonl, columnar], results)
+
+    with open(tmp_path / "symbols.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [{"path": path, "classes": info} for path, info in results]
+
+    columns = read_columns(columnar)
+    assert list(columns) == list(SYMBOL_COLUMNS)
+    assert columns == expected_columns(results)
+    assert "GeneralSettings" in columns["class"]
+
+
+@pytest.mark.skipif(pyarrow is not None, reason="writes Parquet with pyarrow")
+def test_symbol_table_spans_row_groups(tmp_path, test_data_results):
+    results = [(path, info) for path, info in test_data_results if info]
+    writer = ColumnarWriter(str(tmp_path / "symbols"), group_rows=5)
+    write_all([writer], results)
+
+    assert writer.path.endswith(".symbols")
+    assert read_symbol_table(writer.path) == expected_columns(results)
+
+
+def test_read_symbol_table_rejects_other_files(tmp_path):
+    path = tmp_path / "symbols.symbols"
+    path.write_bytes(b"not a symbol table")
+
+    with pytest.raises(ValueError):
+        read_symbol_table(str(path))
+
+
+def test_symbol_database(tmp_path, test_data_results):
+    results = [(path, info) for path, info in test_data_results if info]
+    write_all(create_writers(("sqlite",), "symbols", str(tmp_path)), results)
+
+    connection = sqlite3.connect(tmp_path / "symbols.db")
+    tables = {
+        name
+        for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    assert tables == {"files", "classes", *MEMBER_TABLES}
+    indexes = {
+        name
+        for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+    }
+    assert {"files_path", "classes_name", "methods_name"} <= indexes
+    assert connection.execute("PRAGMA foreign_key_check").fetchall() == []
+
+    files = connection.execute("SELECT path, package FROM files ORDER BY id")
+    assert files.fetchall() == [(path, path.rsplit(".", 2)[0]) for path, _ in results]
+    classes = connection.execute(
+        "SELECT files.path, classes.name, classes.comment FROM classes "
+        "JOIN files ON files.id = classes.file_id ORDER BY classes.id"
+    )
+    assert classes.fetchall() == [
+        (path, c["name"], c["comment"]) for path, info in results for c in info
+    ]
+    for table in MEMBER_TABLES:
+        rows = connection.execute(
+            f"SELECT files.path, classes.name, {table}.name, {table}.comment "
+            f"FROM {table} JOIN classes ON classes.id = {table}.class_id "
+            f"JOIN files ON files.id = classes.file_id ORDER BY {table}.id"
+        )
+        assert rows.fetchall() == [
+            (path, c["name"], member["name"], member["comment"])
+            for path, info in results
+            for c in info
+            for member in c.get(table, [])
+        ], table
+
+    (is_enum,) = connection.execute(
+        "SELECT is_enum FROM classes WHERE name = 'ProcessCloseConfirmation'"
+    ).fetchone()
+    assert is_enum == 1
+    connection.close()
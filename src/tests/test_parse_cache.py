@@ -0,0 +1,84 @@
+import os
+import pytest
+import parse_cache
+from parse_cache import ParseCache, content_hash
+
+CLASS_INFO = [
+    {"name": "Settings", "methods": [{"name": "load", "comment": "Lädt alles"}]}
+]
+
+
+@pytest.fixture
+def fingerprint(monkeypatch):
+    """Pin the parser fingerprint; set ``fingerprint.value`` to change it."""
+
+    class Fingerprint:
+        value = "v1"
+
+    monkeypatch.setattr(parse_cache, "parser_fingerprint", lambda _: Fingerprint.value)
+    return Fingerprint
+
+
+def entry_paths(cache_dir):
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(cache_dir)
+        for name in files
+    )
+
+
+def test_round_trip_by_content_hash(tmp_path, fingerprint):
+    cache = ParseCache(str(tmp_path))
+    key = content_hash(b"class Settings {}")
+
+    assert cache.get("java", key) is None
+    cache.put("java", key, CLASS_INFO)
+
+    assert cache.get("java", key) == CLASS_INFO
+    assert cache.get("java", content_hash(b"class Other {}")) is None
+    assert cache.get("kotlin", key) is None
+    assert entry_paths(tmp_path) == [
+        os.path.join(str(tmp_path), "java-antlr-v1", key[:2], f"{key}.json")
+    ]
+
+
+def test_engines_do_not_share_entries(tmp_path, fingerprint):
+    key = content_hash(b"class Settings {}")
+    ParseCache(str(tmp_path), engine="antlr").put("java", key, CLASS_INFO)
+
+    assert ParseCache(str(tmp_path), engine="tokens").get("java", key) is None
+    assert ParseCache(str(tmp_path), engine="antlr").get("java", key) == CLASS_INFO
+
+
+def test_new_parser_version_invalidates_entries(tmp_path, fingerprint):
+    cache = ParseCache(str(tmp_path))
+    key = content_hash(b"class Settings {}")
+    cache.put("java", key, CLASS_INFO)
+
+    fingerprint.value = "v2"
+    assert cache.get("java", key) is None
+    cache.put("java", key, [])
+
+    assert cache.prune() == 0
+    assert sorted(os.listdir(tmp_path)) == ["java-antlr-v2"]
+    assert cache.get("java", key) == []
+
+
+def test_prune_evicts_least_recently_used(tmp_path, fingerprint):
+    cache = ParseCache(str(tmp_path))
+    keys = [content_hash(bytes([i])) for i in range(4)]
+    for age, key in enumerate(keys):
+        cache.put("java", key, CLASS_INFO)
+        path = cache._entry_path("java", key)
+        os.utime(path, (1000 + age, 1000 + age))
+    entry_size = os.path.getsize(cache._entry_path("java", keys[0]))
+
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get("java", keys[0]) == CLASS_INFO
+    cache.max_bytes = 2 * entry_size
+
+    assert cache.prune() == 2
+    assert cache.get("java", keys[0]) == CLASS_INFO
+    assert cache.get("java", keys[3]) == CLASS_INFO
+    assert cache.get("java", keys[1]) is None
+    assert cache.get("java", keys[2]) is None
@@ -0,0 +1,55 @@
+from collections import Counter
+from pathlib import Path
+from directory_processor import _render_result
+from parsers.java.java_parser import parse_java_file
+from result_codec import decode_class_info, decode_results, encode_results
+
+JAVA_TEST_DATA = Path(__file__).parents[1] / "parsers" / "java" / "tests" / "test_data"
+
+KOTLIN_CLASS_INFO = [
+    {
+        "name": "Größe",
+        "constants": [{"name": "MAX", "comment": "Höchstwert → 📦"}],
+        "methods": [],
+        "companion_objects": [{"name": "Companion", "comment": "No Comment"}],
+        "properties": [{"name": "label", "comment": "名前"}],
+        "annotations": ["Serializable\n"],
+        "is_enum": False,
+        "is_interface": False,
+        "is_data_class": True,
+        "enum_values": [],
+        "comment": "Eine Klasse",
+    }
+]
+
+
+def worker_results():
+    """Per-file results as parse_file returns them."""
+    java = (JAVA_TEST_DATA / "AllInOne8.java").read_text(encoding="utf-8")
+    return [
+        ("AllInOne8.java", parse_java_file(java), "", Counter({"java.sll": 1})),
+        ("Größe.kt", KOTLIN_CLASS_INFO, "", Counter({"kotlin.ll_fallback": 1})),
+        ("Empty.java", [], "", Counter()),
+        ("Broken.kt", None, "unexpected token 'fun' ✗", Counter()),
+    ]
+
+
+def test_results_round_trip():
+    results = worker_results()
+
+    decoded = decode_results(encode_results(results))
+
+    assert [
+        (path, decode_class_info(encoded), error, stats)
+        for path, encoded, error, stats in decoded
+    ] == results
+
+
+def test_rendered_results_round_trip():
+    results = [
+        (path, _render_result(path, class_info), error, stats)
+        for path, class_info, error, stats in worker_results()
+    ]
+    assert results[0][1][0].startswith(b"\n## AllInOne8.java\n")
+
+    assert decode_results(encode_results(results, rendered=True)) == results
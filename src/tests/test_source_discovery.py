@@ -0,0 +1,44 @@
+import os
+from directory_processor import iter_source_files
+
+
+def walk_source_files(source_dir):
+    """Discovery as it was done before iter_source_files."""
+    return [
+        (os.path.join(root, file), source_dir)
+        for root, _, files in os.walk(source_dir)
+        for file in files
+        if file.endswith((".java", ".kt"))
+    ]
+
+
+def test_finds_the_same_files_as_os_walk(tmp_path):
+    for name in (
+        "Main.java",
+        "README.md",
+        "app/App.kt",
+        "app/build.gradle.kts",
+        "app/Old.java.bak",
+        "app/ui/View.kt",
+        "app/ui/View.java",
+        "lib/deep/er/Util.java",
+        "lib/notes.txt",
+        "empty/.keep",
+    ):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("class X {}\n", encoding="utf-8")
+    # Symlinked directories are not followed by either walk
+    os.symlink(tmp_path / "app", tmp_path / "link")
+    source_dir = str(tmp_path)
+
+    found = list(iter_source_files(source_dir))
+
+    assert found == walk_source_files(source_dir)
+    assert sorted(os.path.relpath(path, source_dir) for path, _ in found) == [
+        "Main.java",
+        os.path.join("app", "App.kt"),
+        os.path.join("app", "ui", "View.java"),
+        os.path.join("app", "ui", "View.kt"),
+        os.path.join("lib", "deep", "er", "Util.java"),
+    ]
@@ -0,0 +1,72 @@
+import pytest
+from output_writers import create_writers
+from result_codec import encode_class_info
+from symbol_search import find_names, search_symbols
+
+
+@pytest.fixture(scope="module")
+def index_dir(tmp_path_factory, test_data_results):
+    """Index the parser test data in every searchable format."""
+    output_dir = tmp_path_factory.mktemp("index")
+    writers = create_writers(("search", "names"), "symbols", str(output_dir))
+    for path, class_info in test_data_results:
+        if class_info:
+            for writer in writers:
+                writer.write_encoded_class_info(path, encode_class_info(class_info))
+    for writer in writers:
+        writer.close()
+    return output_dir
+
+
+def test_search_ranks_names_first(index_dir):
+    matches = search_symbols(str(index_dir / "symbols.search.db"), "settings")
+
+    assert matches[0]["kind"] == "class"
+    assert matches[0]["name"] == "GeneralSettings"
+    assert matches[0]["path"] == "kotlin.tests.test_data.GeneralSettings.kt"
+    # Its long comment must not rank it below a longer name
+    assert matches[1]["name"] == "GeneralSettingsState"
+
+
+def test_search_matches_every_word_by_prefix(index_dir):
+    index_path = str(index_dir / "symbols.search.db")
+
+    matches = search_symbols(index_path, "general sett")
+
+    assert {match["class"] for match in matches} <= {
+        "GeneralSettings",
+        "GeneralSettingsState",
+    }
+    assert matches
+    assert search_symbols(index_path, "settings zzzunknown") == []
+    assert search_symbols(index_path, "  ") == []
+
+
+def test_find_names_by_camel_humps(index_dir):
+    matches = find_names(str(index_dir / "symbols.names.db"), "GenSet")
+
+    assert [match["name"] for match in matches[:2]] == [
+        "GeneralSettings",
+        "GeneralSettingsState",
+    ]
+    assert matches[0]["score"] > matches[1]["score"]
+    assert matches[0]["locations"] == [
+        {
+            "kind": "class",
+            "path": "kotlin.tests.test_data.GeneralSettings.kt",
+            "class": "GeneralSettings",
+        }
+    ]
+
+
+def test_find_names_by_shared_trigrams(index_dir):
+    # Neither a prefix nor camel humps of the name, only similar
+    matches = find_names(str(index_dir / "symbols.names.db"), "GeneralSetings")
+
+    assert matches[0]["name"] == "GeneralSettings"
+    assert matches[0]["score"] < 1
+
+
+def test_find_names_miss(index_dir):
+    assert find_names(str(index_dir / "symbols.names.db"), "Zzqx") == []
+    assert find_names(str(index_dir / "symbols.names.db"), "--") == []
@@ -0,0 +1,99 @@
+import os
+import pytest
+from task_scheduler import plan_chunks, stream_chunks
+
+# Source sizes in bytes, in discovery order; 900 and 700 exceed CHUNK_BYTES
+SIZES = [120, 900, 40, 300, 80, 700, 150, 10, 260, 60, 200, 30]
+CHUNK_BYTES = 400
+
+
+@pytest.fixture
+def files(tmp_path):
+    tasks = []
+    for i, size in enumerate(SIZES):
+        path = tmp_path / f"File{i}.java"
+        path.write_bytes(b"x" * size)
+        tasks.append((str(path), str(tmp_path)))
+    return tasks
+
+
+def size(task):
+    return os.path.getsize(task[0])
+
+
+def assert_each_file_once(chunks, files):
+    planned = [task for chunk in chunks for task in chunk]
+    assert sorted(planned) == sorted(files)
+
+
+def assert_largest_first(chunks):
+    planned = [size(task) for chunk in chunks for task in chunk]
+    assert planned == sorted(planned, reverse=True)
+
+
+def test_size_policy(files):
+    chunks = plan_chunks(files, "size", chunk_bytes=CHUNK_BYTES)
+
+    assert_each_file_once(chunks, files)
+    assert_largest_first(chunks)
+    for chunk in chunks:
+        total = sum(size(task) for task in chunk)
+        # Only a single oversized file may exceed the target
+        assert total <= CHUNK_BYTES or len(chunk) == 1
+    assert [size(task) for task in chunks[0]] == [900]
+    assert [size(task) for task in chunks[1]] == [700]
+    assert len(chunks) < len(files)
+
+
+def test_size_policy_limits_files_per_chunk(files):
+    chunks = plan_chunks(files, "size", chunk_bytes=10**6, chunk_files=5)
+
+    assert_each_file_once(chunks, files)
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+
+
+def test_size_policy_shrinks_chunks_for_min_chunks(files):
+    chunks = plan_chunks(files, "size", chunk_bytes=10**6, min_chunks=4)
+
+    assert_each_file_once(chunks, files)
+    assert_largest_first(chunks)
+    assert len(chunks) >= 4
+
+
+def test_fixed_policy(files):
+    chunks = plan_chunks(files, "fixed", chunk_files=5)
+
+    assert_each_file_once(chunks, files)
+    assert_largest_first(chunks)
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+
+    chunks = plan_chunks(files, "fixed", min_chunks=6)
+    assert [len(chunk) for chunk in chunks] == [2] * 6
+
+
+def test_single_policy_keeps_discovery_order(files):
+    chunks = plan_chunks(files, "single")
+
+    assert chunks == [[task] for task in files]
+
+
+def test_unknown_policy(files):
+    with pytest.raises(ValueError):
+        plan_chunks(files, "random")
+
+
+@pytest.mark.parametrize("policy", ["size", "fixed", "single"])
+def test_stream_chunks_emits_every_file_once(tmp_path, policy):
+    # Enough files for a 256, a 512 and a partial last window
+    files = []
+    for i in range(1000):
+        path = tmp_path / f"File{i}.kt"
+        path.write_bytes(b"x" * (i % 37))
+        files.append((str(path), str(tmp_path)))
+
+    chunks = list(stream_chunks(iter(files), policy, chunk_bytes=200))
+
+    assert_each_file_once(chunks, files)
+    # Windows are planned in arrival order, so the first 256 files go first
+    first = [task for chunk in chunks for task in chunk][:256]
+    assert sorted(first) == sorted(files[:256])